@@ -0,0 +1,457 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Exportação em lote de dossiês, pela linha de comando.
+Lê os termos (CNPJs ou nomes) de um CSV ou JSONL, coleta cada empresa com o `SearchService`
+(com um número limitado de coletas em simultâneo) e corre o `DossieGenerator` num pool de
+processos. Os dossiês completos são gravados à medida que ficam prontos em `dossies.jsonl` e,
+em colunas, em ficheiros Parquet (ou Arrow IPC) por partes; os que vêm com secções em falta
+ficam em `parciais.jsonl`. Uma exportação interrompida retoma onde parou: os termos já em
+`dossies.jsonl` não são coletados de novo, e os que falharam (em `erros.jsonl`) ou ficaram
+parciais voltam a ser tentados.
+
+Uso:
+    python -m app.bulk_export empresas.csv --out exportacao/ --concurrency 16 --processes 4
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from app.dtos import DossieEmpresaDTO
+from app.services.analysis_strategy import DossieGenerator
+from app.services.normalization import normalize_term
+from app.services.scraper_strategy import ReclameAquiScraper
+from app.services.search_service import (SearchService, close_company_index, get_circuit_breakers,
+                                         get_company_index, get_upstream_scheduler)
+from app.services.session_pool import SessionPool
+
+DOSSIES_FILE = "dossies.jsonl"
+ERRORS_FILE = "erros.jsonl"
+PARTIALS_FILE = "parciais.jsonl"
+CHECKPOINT_FILE = "checkpoint.json"
+# Colunas (CSV) ou chaves (JSONL) aceites para o termo; sem nenhuma delas, usa-se a primeira coluna.
+TERM_COLUMNS = ("term", "termo", "cnpj")
+COLUMNAR_EXTENSIONS = {"parquet": "parquet", "arrow": "arrow"}
+
+# Uma instância por processo do pool de análise.
+_GENERATOR = DossieGenerator()
+
+
+# --- Leitura dos termos ---
+
+def read_terms(path: str) -> Iterator[str]:
+    """Os termos do ficheiro de entrada, pela ordem em que aparecem (sem repetidos)."""
+    seen: Set[str] = set()
+    for term in _read_jsonl_terms(path) if path.endswith((".jsonl", ".ndjson")) else _read_csv_terms(path):
+        key = normalize_term(term)
+        if key and key not in seen:
+            seen.add(key)
+            yield term
+
+
+def _read_jsonl_terms(path: str) -> Iterator[str]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            value = json.loads(line)
+            if isinstance(value, dict):
+                value = next((value[column] for column in TERM_COLUMNS if value.get(column)), None)
+            if value:
+                yield str(value)
+
+
+def _read_csv_terms(path: str) -> Iterator[str]:
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [column.strip().lower() for column in header]
+        index = next((columns.index(column) for column in TERM_COLUMNS if column in columns), None)
+        if index is None:
+            # Sem cabeçalho reconhecido: a primeira linha já é um termo.
+            index = 0
+            if header and header[0].strip():
+                yield header[0].strip()
+        for row in reader:
+            if len(row) > index and row[index].strip():
+                yield row[index].strip()
+
+
+# --- Análise (corre nos processos do pool) ---
+
+def _ignore_sigint() -> None:
+    # O Ctrl+C é tratado pelo processo principal, que fecha o pool de forma ordenada.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def analyze_batch(batch: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Optional[bytes], Optional[Dict], Optional[str]]]:
+    """Gera e serializa os dossiês de um lote de coletas. Devolve `(termo, json, linha, erro)` por termo."""
+    results = []
+    for term, raw_data in batch:
+        try:
+            initial_data = raw_data.pop("initialData")
+            dossie = _GENERATOR.generate(initial_data, raw_data)
+            results.append((term, _GENERATOR.serialize(dossie), dossie_row(term, dossie), None))
+        except Exception as e:
+            results.append((term, None, None, str(e) or type(e).__name__))
+    return results
+
+
+def _as_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def dossie_row(term: str, dossie: DossieEmpresaDTO) -> Dict[str, Any]:
+    """A linha do dossiê no formato em colunas: os campos mais usados em análise, mais o JSON completo."""
+    identificacao = dossie.identificacao
+    reputacao = (dossie.reputacao_por_periodo or {}).get("SIX_MONTHS")
+    return {
+        "term": term,
+        "idReclameAqui": identificacao.id_reclame_aqui,
+        "cnpj": identificacao.cnpj,
+        "razaoSocial": identificacao.razao_social,
+        "nomeFantasia": identificacao.nome_fantasia,
+        "segmentoPrincipal": dossie.operacional.segmento_principal if dossie.operacional else None,
+        "verificada": dossie.engajamento_plataforma.verificada if dossie.engajamento_plataforma else None,
+        "reputacao6Meses": reputacao.reputacao if reputacao else None,
+        "notaFinal6Meses": _as_float(reputacao.nota_final) if reputacao else None,
+        "totalReclamacoes6Meses": reputacao.total_reclamacoes if reputacao else None,
+        "percentualResolucao6Meses": _as_float(reputacao.percentual_resolucao) if reputacao else None,
+        "secoesEmFalta": list(dossie.secoes_em_falta),
+        "dossie": dossie.model_dump_json(by_alias=True),
+    }
+
+
+# --- Escrita em colunas ---
+
+class ColumnarWriter:
+    """
+    Grava as linhas em ficheiros Parquet ou Arrow IPC, uma parte a cada `rows_per_part` linhas.
+    As partes nunca são reabertas: retomar uma exportação só acrescenta partes novas.
+    """
+
+    def __init__(self, directory: str, fmt: str, rows_per_part: int):
+        try:
+            import pyarrow
+        except ImportError:
+            raise RuntimeError(f"O formato '{fmt}' precisa do pyarrow (pip install pyarrow), "
+                               f"ou use --columnar none.")
+        self._pa = pyarrow
+        self.directory = directory
+        self.fmt = fmt
+        self.rows_per_part = rows_per_part
+        self.rows: List[Dict[str, Any]] = []
+        self.schema = pyarrow.schema([
+            ("term", pyarrow.string()), ("idReclameAqui", pyarrow.string()), ("cnpj", pyarrow.string()),
+            ("razaoSocial", pyarrow.string()), ("nomeFantasia", pyarrow.string()),
+            ("segmentoPrincipal", pyarrow.string()), ("verificada", pyarrow.bool_()),
+            ("reputacao6Meses", pyarrow.string()), ("notaFinal6Meses", pyarrow.float64()),
+            ("totalReclamacoes6Meses", pyarrow.int64()), ("percentualResolucao6Meses", pyarrow.float64()),
+            ("secoesEmFalta", pyarrow.list_(pyarrow.string())), ("dossie", pyarrow.string()),
+        ])
+
+    def part_path(self, part: int) -> str:
+        return os.path.join(self.directory, f"dossies-{part:05d}.{COLUMNAR_EXTENSIONS[self.fmt]}")
+
+    def existing_parts(self) -> List[int]:
+        prefix, suffix = "dossies-", "." + COLUMNAR_EXTENSIONS[self.fmt]
+        return sorted(int(name[len(prefix):-len(suffix)]) for name in os.listdir(self.directory)
+                      if name.startswith(prefix) and name.endswith(suffix) and name[len(prefix):-len(suffix)].isdigit())
+
+    def add(self, row: Dict[str, Any]) -> bool:
+        """Acrescenta uma linha; devolve True quando já há linhas para uma parte completa."""
+        self.rows.append(row)
+        return len(self.rows) >= self.rows_per_part
+
+    def write_part(self, part: int) -> None:
+        table = self._pa.Table.from_pylist(self.rows, schema=self.schema)
+        path = self.part_path(part)
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(table, path + ".tmp", compression="zstd")
+        else:
+            with self._pa.OSFile(path + ".tmp", "wb") as sink, self._pa.ipc.new_file(sink, self.schema) as writer:
+                writer.write_table(table)
+        # A parte só aparece com o nome final depois de escrita por completo.
+        os.replace(path + ".tmp", path)
+        self.rows = []
+
+
+# --- Exportação ---
+
+class BulkExporter:
+    """
+    Coleta (em threads, com no máximo `concurrency` coletas em curso), analisa (num pool de processos,
+    por lotes) e grava os dossiês de uma lista de termos, com checkpoints para retomar.
+    O ficheiro `dossies.jsonl` é a fonte de verdade do progresso; `checkpoint.json` regista até
+    que byte dele as linhas já estão nas partes em colunas.
+    """
+
+    def __init__(self, service: SearchService, out_dir: str, concurrency: int = 16, processes: int = 0,
+                 analysis_batch: int = 32, columnar: str = "parquet", rows_per_part: int = 5000):
+        self.service = service
+        self.out_dir = out_dir
+        self.concurrency = concurrency
+        self.processes = processes or os.cpu_count() or 1
+        self.analysis_batch = analysis_batch
+        os.makedirs(out_dir, exist_ok=True)
+        self.columnar = ColumnarWriter(out_dir, columnar, rows_per_part) if columnar != "none" else None
+        self.done: Set[str] = set()
+        self.parts = 0
+        self.stats: Dict[str, int] = {"exported": 0, "partial": 0, "failed": 0, "skipped": 0}
+        self._resume()
+        self._dossies = open(os.path.join(out_dir, DOSSIES_FILE), "ab")
+        self._errors = open(os.path.join(out_dir, ERRORS_FILE), "a", encoding="utf-8")
+        self._partials = open(os.path.join(out_dir, PARTIALS_FILE), "ab")
+
+    def run(self, terms: Iterator[str]) -> Dict[str, int]:
+        started = time.perf_counter()
+        last_report = started
+        scraping: Dict[Future, str] = {}
+        analyzing: Set[Future] = set()
+        batch: List[Tuple[str, Dict[str, Any]]] = []
+        # Limita as coletas já feitas à espera de análise, para a memória não crescer se a CPU não acompanhar.
+        max_buffered = max(self.concurrency, self.analysis_batch) * 4
+        io_pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="export-io")
+        # "spawn": os processos do pool não herdam as threads nem as sessões HTTP do processo principal.
+        cpu_pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_ignore_sigint)
+
+        def fill() -> None:
+            while len(scraping) < self.concurrency and len(batch) + len(analyzing) * self.analysis_batch < max_buffered:
+                term = next(terms, None)
+                if term is None:
+                    return
+                if normalize_term(term) in self.done:
+                    self.stats["skipped"] += 1
+                    continue
+                scraping[io_pool.submit(self.service.collect, term)] = term
+
+        try:
+            fill()
+            while scraping or analyzing or batch:
+                # Um lote segue para a análise quando está cheio, ou logo que haja um processo livre.
+                if batch and (len(batch) >= self.analysis_batch or len(analyzing) < self.processes or not scraping):
+                    analyzing.add(cpu_pool.submit(analyze_batch, batch))
+                    batch = []
+                done, _ = wait(set(scraping) | analyzing, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in scraping:
+                        term = scraping.pop(future)
+                        try:
+                            batch.append((term, future.result()))
+                        except Exception as e:
+                            self._record_error(term, str(e) or type(e).__name__)
+                    else:
+                        analyzing.discard(future)
+                        for term, dossie_json, row, error in future.result():
+                            if error is None:
+                                self._record_dossie(term, dossie_json, row)
+                            else:
+                                self._record_error(term, error)
+                fill()
+                now = time.perf_counter()
+                if now - last_report >= 10:
+                    last_report = now
+                    self._report(now - started)
+        except KeyboardInterrupt:
+            print("WARN:     Exportação interrompida; corra o mesmo comando para retomar.")
+        finally:
+            io_pool.shutdown(wait=False, cancel_futures=True)
+            cpu_pool.shutdown(wait=True, cancel_futures=True)
+            self.close()
+        self._report(time.perf_counter() - started)
+        return self.stats
+
+    def close(self) -> None:
+        """Grava as linhas em colunas ainda em memória e o checkpoint final, e compacta as listas de repetição."""
+        if self._dossies.closed:
+            return
+        if self.columnar is not None and self.columnar.rows:
+            self._write_part()
+        self._dossies.close()
+        self._errors.close()
+        self._partials.close()
+        self._compact_retries()
+
+    # --- Internos ---
+
+    def _record_dossie(self, term: str, dossie_json: bytes, row: Optional[Dict[str, Any]]) -> None:
+        line = b'{"term":' + json.dumps(term).encode() + b',"dossie":' + dossie_json + b'}\n'
+        if row["secoesEmFalta"]:
+            # Um dossiê parcial não conta como exportado: fica à parte e o termo volta a ser tentado.
+            self._partials.write(line)
+            self.stats["partial"] += 1
+            return
+        self._dossies.write(line)
+        self.done.add(normalize_term(term))
+        self.stats["exported"] += 1
+        if self.columnar is not None and self.columnar.add(row):
+            self._write_part()
+
+    def _record_error(self, term: str, error: str) -> None:
+        self._errors.write(json.dumps({"term": term, "error": error}) + "\n")
+        self.stats["failed"] += 1
+
+    def _write_part(self) -> None:
+        # As linhas têm de estar no disco antes de o checkpoint dizer que já estão numa parte.
+        self._dossies.flush()
+        os.fsync(self._dossies.fileno())
+        self.columnar.write_part(self.parts)
+        self.parts += 1
+        self._save_checkpoint(self._dossies.tell())
+
+    def _save_checkpoint(self, jsonl_bytes: int) -> None:
+        path = os.path.join(self.out_dir, CHECKPOINT_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"jsonlBytes": jsonl_bytes, "parts": self.parts, "updatedAt": time.time()}, f)
+        os.replace(path + ".tmp", path)
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.out_dir, CHECKPOINT_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _compact_retries(self) -> None:
+        """
+        Reescreve `erros.jsonl` e `parciais.jsonl` só com a última linha de cada termo que ainda não foi
+        exportado: os erros e os dossiês parciais de termos que entretanto correram bem desaparecem.
+        """
+        for name in (ERRORS_FILE, PARTIALS_FILE):
+            path = os.path.join(self.out_dir, name)
+            if not os.path.exists(path):
+                continue
+            latest: Dict[str, bytes] = {}
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        term = json.loads(line)["term"] if line.endswith(b"\n") else None
+                    except (ValueError, KeyError, TypeError):
+                        term = None
+                    key = normalize_term(term) if term else None
+                    if key and key not in self.done:
+                        latest.pop(key, None)
+                        latest[key] = line
+            with open(path + ".tmp", "wb") as f:
+                f.writelines(latest.values())
+            os.replace(path + ".tmp", path)
+
+    def _resume(self) -> None:
+        """
+        Lê o `dossies.jsonl` de uma execução anterior: os termos já exportados são saltados, uma
+        última linha incompleta é cortada, e as linhas que ainda não chegaram a nenhuma parte em
+        colunas voltam à memória para entrarem na próxima. Os erros e os dossiês parciais antigos
+        de termos já exportados são descartados.
+        """
+        path = os.path.join(self.out_dir, DOSSIES_FILE)
+        if not os.path.exists(path):
+            self._compact_retries()
+            return
+        checkpoint = self._load_checkpoint()
+        covered = checkpoint.get("jsonlBytes", 0) if self.columnar is not None else 0
+        self.parts = checkpoint.get("parts", 0) if self.columnar is not None else 0
+        valid_bytes = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line) if line.endswith(b"\n") else None
+                except ValueError:
+                    record = None
+                if record is None:
+                    break
+                self.done.add(normalize_term(record["term"]))
+                if self.columnar is not None and valid_bytes >= covered:
+                    dossie = DossieEmpresaDTO.model_validate(record["dossie"])
+                    self.columnar.add(dossie_row(record["term"], dossie))
+                valid_bytes += len(line)
+        if valid_bytes < os.path.getsize(path):
+            print(f"WARN:     A última linha de {DOSSIES_FILE} estava incompleta e foi descartada.")
+            with open(path, "r+b") as f:
+                f.truncate(valid_bytes)
+        if self.columnar is not None:
+            # Partes escritas depois do último checkpoint: as suas linhas voltaram à memória, pelo que são refeitas.
+            for part in self.columnar.existing_parts():
+                if part >= self.parts:
+                    os.remove(self.columnar.part_path(part))
+        self._compact_retries()
+        print(f"INFO:     A retomar a exportação: {len(self.done)} termos já exportados.")
+
+    def _report(self, elapsed: float) -> None:
+        stats = self.stats
+        rate = stats["exported"] / elapsed if elapsed > 0 else 0.0
+        print(f"INFO:     {stats['exported']} exportados, {stats['partial']} parciais, {stats['failed']} falhas, "
+              f"{stats['skipped']} já feitos "
+              f"({rate:.1f} dossiês/s)")
+
+
+def build_search_service(concurrency: int) -> SearchService:
+    """Um `SearchService` com uma sessão HTTP por coleta em simultâneo, e o escalonador e índice partilhados."""
+    company_index = get_company_index()
+    scraper = ReclameAquiScraper(session_pool=SessionPool(max_size=concurrency), company_index=company_index,
+                                 scheduler=get_upstream_scheduler(), circuit_breakers=get_circuit_breakers())
+    return SearchService(scraper, DossieGenerator(), company_index=company_index)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="ficheiro CSV (coluna term, termo ou cnpj; ou a primeira) ou JSONL")
+    parser.add_argument("--out", required=True, help="pasta de saída (reutilize-a para retomar)")
+    parser.add_argument("--concurrency", type=int, default=16, help="coletas em simultâneo")
+    parser.add_argument("--processes", type=int, default=0, help="processos de análise (por omissão, um por CPU)")
+    parser.add_argument("--analysis-batch", type=int, default=32, help="dossiês por tarefa enviada a um processo")
+    parser.add_argument("--columnar", choices=["parquet", "arrow", "none"], default="parquet",
+                        help="formato em colunas, além do JSONL")
+    parser.add_argument("--rows-per-part", type=int, default=5000, help="linhas por ficheiro em colunas")
+    args = parser.parse_args()
+
+    service = build_search_service(args.concurrency)
+    try:
+        exporter = BulkExporter(service, args.out, concurrency=args.concurrency, processes=args.processes,
+                                analysis_batch=args.analysis_batch, columnar=args.columnar,
+                                rows_per_part=args.rows_per_part)
+        stats = exporter.run(read_terms(args.input))
+    except RuntimeError as e:
+        print(f"ERROR:     {e}")
+        sys.exit(2)
+    finally:
+        service.close()
+        close_company_index()
+    sys.exit(1 if stats["failed"] or stats["partial"] else 0)
+
+
+if __name__ == "__main__":
+    main()
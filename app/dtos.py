@@ -26,6 +26,7 @@ deserialização dos dados entre as APIs externas e a nossa aplicação.
 
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional, Dict, Any
+from typing_extensions import TypedDict
 
 
 # --- DTOs para a busca inicial ---
@@ -112,8 +113,150 @@ class DossieEmpresaDTO(BaseModel):
     principais_problemas_historico: Optional[List[ProblemInfoDTO]] = Field(None, alias='principaisProblemasHistorico')
     principais_problemas_6_meses: Optional[List[ProblemInfoDTO]] = Field(None, alias='principaisProblemas6Meses')
     evolucao_mensal_detalhada: Optional[Any] = Field(None, alias='evolucaoMensalDetalhada')
+    # Secções do upstream que falharam nesta coleta, e as que vêm da cache já depois do seu TTL.
+    secoes_em_falta: List[str] = Field([], alias='secoesEmFalta')
+    secoes_desatualizadas: List[str] = Field([], alias='secoesDesatualizadas')
 
     model_config = ConfigDict(
         populate_by_name=True,
         by_alias=True  # Garante que o JSON de saída use os aliases em camelCase
-    )
\ No newline at end of file
+    )
+
+
+# --- Dados brutos devolvidos pelos coletores ---
+
+# Chave com a lista das secções que falharam (erro, timeout ou disjuntor aberto). Uma secção
+# ausente que não esteja nesta lista não existe no upstream (ex: o perfil de uma empresa não verificada).
+MISSING_SECTIONS = "missingSections"
+
+
+# --- Formato das respostas brutas das APIs de problemas ---
+# Só descrevemos o caminho até à lista de problemas, que é lida diretamente dos bytes. Os itens
+# ficam por validar: o analisador só valida como `ProblemInfoDTO` os que usa, e um item
+# malformado fora desses não deita fora a secção.
+
+class ComplainsPayload(TypedDict, total=False):
+    problems: List[Any]
+
+
+class ComplainResultPayload(TypedDict, total=False):
+    complains: ComplainsPayload
+
+
+class ProblemsPayload(TypedDict, total=False):
+    complainResult: ComplainResultPayload
+
+
+# --- Formato da resposta bruta do indexEvolution (só os campos guardados no histórico) ---
+
+class EvolutionSnapshotPayload(TypedDict, total=False):
+    year: int
+    month: int
+    totalIndexable: int
+    totalSolved: int
+    totalEvaluations: int
+    totalDealAgain: int
+    status: Optional[str]
+
+
+class EvolutionPayload(TypedDict, total=False):
+    snapshots: List[EvolutionSnapshotPayload]
+
+
+# --- DTOs para a busca em lote ---
+
+class BatchSearchRequestDTO(BaseModel):
+    """Pedido de busca em lote: uma lista de termos (CNPJs ou nomes) e o grau de paralelismo desejado."""
+    terms: List[str] = Field(..., min_length=1)
+    concurrency: int = Field(8, ge=1, le=64)
+    # Mesma seleção de campos do parâmetro `fields` de `/search/{term}`.
+    fields: Optional[str] = None
+
+
+# --- DTOs para a lista de vigilância ---
+
+class WatchlistAddRequestDTO(BaseModel):
+    """Pedido para vigiar uma empresa: o termo que a identifica e o intervalo entre atualizações."""
+    term: str = Field(..., min_length=1)
+    intervalo_segundos: float = Field(3600, alias='intervaloSegundos', ge=60)
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class WatchlistEntryDTO(BaseModel):
+    """Uma empresa vigiada e o estado da sua última atualização."""
+    id_reclame_aqui: str = Field(..., alias='idReclameAqui')
+    shortname: str
+    intervalo_segundos: float = Field(..., alias='intervaloSegundos')
+    adicionada_em: float = Field(..., alias='adicionadaEm')
+    ultima_atualizacao: Optional[float] = Field(None, alias='ultimaAtualizacao')
+    proxima_atualizacao: float = Field(..., alias='proximaAtualizacao')
+    ultimo_erro: Optional[str] = Field(None, alias='ultimoErro')
+    popularidade: float = 0.0
+    model_config = ConfigDict(populate_by_name=True, by_alias=True)
+
+
+# --- DTOs para os rankings e agregados do índice de dossiês ---
+
+class RankingEmpresaDTO(BaseModel):
+    """Uma empresa num ranking de segmento, com todas as métricas do período."""
+    posicao: int
+    id_reclame_aqui: str = Field(..., alias='idReclameAqui')
+    nome_fantasia: str = Field(..., alias='nomeFantasia')
+    valor: float
+    reputacao: Optional[str] = None
+    nota_final: Optional[float] = Field(None, alias='notaFinal')
+    percentual_resolucao: Optional[float] = Field(None, alias='percentualResolucao')
+    percentual_voltaria_fazer_negocio: Optional[float] = Field(None, alias='percentualVoltariaFazerNegocio')
+    total_reclamacoes: Optional[float] = Field(None, alias='totalReclamacoes')
+    model_config = ConfigDict(populate_by_name=True, by_alias=True)
+
+
+class RankingSegmentoDTO(BaseModel):
+    """O ranking das empresas de um segmento por uma métrica de um período de reputação."""
+    segmento: str
+    periodo: str
+    metrica: str
+    ordem: str
+    total_empresas: int = Field(..., alias='totalEmpresas')
+    empresas: List[RankingEmpresaDTO]
+    model_config = ConfigDict(populate_by_name=True, by_alias=True)
+
+
+class ProblemaAgregadoDTO(BaseModel):
+    """Um problema, somado sobre todas as empresas indexadas (ou as de um segmento)."""
+    nome: str
+    quantidade: int
+    empresas: int
+    model_config = ConfigDict(populate_by_name=True, by_alias=True)
+
+
+# --- DTOs para as tendências do histórico de reputação ---
+
+class TendenciaMensalDTO(BaseModel):
+    """Um mês do histórico de uma empresa, com as taxas do mês, as da janela móvel e as variações."""
+    mes: str
+    status: Optional[str] = None
+    total_reclamacoes: int = Field(..., alias='totalReclamacoes')
+    total_resolvidas: int = Field(..., alias='totalResolvidas')
+    total_avaliacoes: int = Field(..., alias='totalAvaliacoes')
+    total_voltaria_fazer_negocio: int = Field(..., alias='totalVoltariaFazerNegocio')
+    # Percentagens (0-100); ausentes quando o denominador é zero.
+    taxa_resolucao: Optional[float] = Field(None, alias='taxaResolucao')
+    taxa_voltaria_fazer_negocio: Optional[float] = Field(None, alias='taxaVoltariaFazerNegocio')
+    taxa_resolucao_movel: Optional[float] = Field(None, alias='taxaResolucaoMovel')
+    taxa_voltaria_fazer_negocio_movel: Optional[float] = Field(None, alias='taxaVoltariaFazerNegocioMovel')
+    # Em relação ao mês anterior (só quando existe): pontos percentuais e variação percentual das reclamações.
+    variacao_taxa_resolucao: Optional[float] = Field(None, alias='variacaoTaxaResolucao')
+    variacao_taxa_voltaria_fazer_negocio: Optional[float] = Field(None, alias='variacaoTaxaVoltariaFazerNegocio')
+    variacao_reclamacoes: Optional[float] = Field(None, alias='variacaoReclamacoes')
+    # Inclinação da taxa de resolução na janela móvel, em pontos percentuais por mês.
+    tendencia_resolucao: Optional[float] = Field(None, alias='tendenciaResolucao')
+    model_config = ConfigDict(populate_by_name=True, by_alias=True)
+
+
+class TendenciasEmpresaDTO(BaseModel):
+    """O histórico mensal de reputação de uma empresa, do mês mais antigo para o mais recente."""
+    id_reclame_aqui: str = Field(..., alias='idReclameAqui')
+    janela_meses: int = Field(..., alias='janelaMeses')
+    meses: List[TendenciaMensalDTO]
+    model_config = ConfigDict(populate_by_name=True, by_alias=True)
@@ -0,0 +1,44 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+
+"""
+Importação preguiçosa das dependências pesadas (NumPy, curl_cffi).
+Num arranque a frio (escalar a partir de zero), cada milissegundo antes do primeiro pedido conta:
+os módulos que as usam ficam com um `LazyModule` no lugar do módulo verdadeiro, que só é
+importado no primeiro acesso a um atributo (ou antes, pelo aquecimento em segundo plano).
+"""
+
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Representa um módulo ainda por importar; o primeiro atributo pedido importa-o e copia-lhe o conteúdo."""
+
+    def __getattr__(self, name: str):
+        return getattr(self.load(), name)
+
+    def load(self) -> types.ModuleType:
+        """Importa já o módulo (para o aquecimento fora do caminho dos pedidos)."""
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return module
@@ -24,31 +24,281 @@ Define os endpoints, recebe as requisições HTTP e as delega para a camada de s
 Inclui um "starter" para facilitar a execução em modo de desenvolvimento.
 """
 
-import uvicorn # Importamos o uvicorn para o podermos iniciar a partir do código
-from fastapi import FastAPI, Depends, HTTPException
-from app.services.search_service import SearchService, get_search_service
-from app.dtos import DossieEmpresaDTO
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, Depends, Header, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from app.services.search_service import (AsyncSearchService, get_async_search_service, init_async_search_service,
+                                         close_async_search_service, close_search_service,
+                                         get_company_index, close_company_index, get_circuit_breakers,
+                                         get_upstream_scheduler, init_watchlist_refresher,
+                                         close_watchlist_refresher, get_watchlist_refresher, get_snapshot_store,
+                                         close_snapshot_store, get_dossie_index)
+from app.services.company_index import CompanyIndex
+from app.services.field_selection import FIELD_SECTIONS, FieldSelection
+from app.services.watchlist import WatchlistEntry, WatchlistRefresher
+from app.services.snapshot_store import SnapshotStore, month_label
+from app.services.dossie_index import METRICS, PROBLEM_LISTS, DossieIndex
+from app.services.admission import DeadlineExceeded, Overloaded
+from app.services.response_encoding import etag_matches
+from app.dtos import (DossieEmpresaDTO, BatchSearchRequestDTO, CompanyDTO, WatchlistAddRequestDTO, WatchlistEntryDTO,
+                      TendenciaMensalDTO, TendenciasEmpresaDTO, RankingSegmentoDTO, RankingEmpresaDTO,
+                      ProblemaAgregadoDTO)
+from app.metrics import REGISTRY, MetricsMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Criamos o serviço (e o seu pool de sessões) uma única vez, no arranque.
+    service = await init_async_search_service()
+    # As empresas vigiadas começam a ser atualizadas em segundo plano logo no arranque.
+    await init_watchlist_refresher()
+    # O servidor aceita pedidos já a seguir; o histórico e a primeira sessão aquecem em segundo plano.
+    warm_up = asyncio.create_task(service.warm_up())
+    yield
+    warm_up.cancel()
+    await close_watchlist_refresher()
+    await close_async_search_service()
+    # O serviço síncrono só existe se algum script o tiver pedido neste processo.
+    close_search_service()
+    close_company_index()
+    close_snapshot_store()
+
 
 app = FastAPI(
     title="ExposeAqui",
     description="API para scraping e análise de reputação de empresas no ExposeAqui Aqui.",
-    version="2.0.0-FINAL"
+    version="2.0.0-FINAL",
+    lifespan=lifespan
 )
+# Mede todas as requisições e acrescenta o cabeçalho Server-Timing com as etapas de cada uma.
+app.add_middleware(MetricsMiddleware)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[FieldSelection]:
+    try:
+        return FieldSelection.parse(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 @app.get(
     "/search/{term}",
     response_model=DossieEmpresaDTO,
     response_model_by_alias=True,
     summary="Busca e analisa uma empresa",
-    description="Recebe um CNPJ ou nome de empresa, realiza o scraping completo e retorna um dossiê 360°."
+    description="Recebe um CNPJ ou nome de empresa, realiza o scraping completo e retorna um dossiê 360°. "
+                "A resposta traz uma ETag do conteúdo: com `If-None-Match`, um dossiê que não mudou devolve 304. "
+                "O corpo vem comprimido conforme o `Accept-Encoding` (gzip, br ou zstd). "
+                "Em sobrecarga, as buscas que precisam de uma nova coleta são recusadas com 503 e `Retry-After`.",
+    responses={304: {"description": "O dossiê não mudou desde a ETag indicada em `If-None-Match`."},
+               503: {"description": "Servidor sobrecarregado; tente de novo após `Retry-After` segundos."},
+               504: {"description": "A coleta não terminou dentro de `X-Request-Timeout`; só continua se outra "
+                                    "busca ainda esperar por ela."}}
 )
-def search(term: str, service: SearchService = Depends(get_search_service)):
+async def search(term: str,
+                 fields: Optional[str] = Query(None, description="Campos do dossiê a devolver, separados por vírgulas "
+                                                                 f"({', '.join(FIELD_SECTIONS)}). Só são chamadas "
+                                                                 "as APIs de que esses campos precisam."),
+                 request_timeout: Optional[float] = Header(None, alias="X-Request-Timeout", gt=0,
+                                                           description="Segundos que o cliente está disposto a "
+                                                                       "esperar pelo dossiê."),
+                 if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+                 accept_encoding: Optional[str] = Header(None, alias="Accept-Encoding", include_in_schema=False),
+                 service: AsyncSearchService = Depends(get_async_search_service)):
+    selection = parse_fields(fields)
+    deadline_at = time.monotonic() + request_timeout if request_timeout is not None else None
     try:
-        return service.search_company(term)
+        representation = await service.search_company_representation(term, selection, deadline_at)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         print(f"Erro na rota de busca: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    headers = {"ETag": representation.etag, "Vary": "Accept-Encoding"}
+    if etag_matches(if_none_match, representation.etag):
+        return Response(status_code=304, headers=headers)
+    encoding = representation.encoding_for(accept_encoding)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    # Devolvemos os bytes já serializados (e comprimidos): o `response_model` fica só para a documentação,
+    # e o FastAPI não volta a validar nem a serializar o dossiê.
+    return Response(content=representation.body(encoding), media_type="application/json", headers=headers)
+
+@app.post(
+    "/search/batch",
+    summary="Busca e analisa várias empresas",
+    description="Recebe uma lista de termos e devolve um dossiê por linha (NDJSON), pela ordem em que ficam prontos. "
+                "Cada linha tem o termo e, conforme o caso, o dossiê ou o erro."
+)
+async def search_batch(request: BatchSearchRequestDTO,
+                       service: AsyncSearchService = Depends(get_async_search_service)):
+    selection = parse_fields(request.fields)
+
+    async def ndjson_lines():
+        async for term, dossie_json, error in service.search_many(request.terms, request.concurrency, as_json=True,
+                                                                  fields=selection):
+            if error is None:
+                # O JSON do dossiê, já serializado, é embutido tal como está na linha.
+                yield b'{"term":' + json.dumps(term).encode() + b',"dossie":' + dossie_json + b'}\n'
+            else:
+                yield json.dumps({"term": term, "error": str(error)}) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+@app.get(
+    "/companies/suggest",
+    response_model=List[CompanyDTO],
+    summary="Autocompletar de empresas",
+    description="Sugere empresas já conhecidas cujo CNPJ, shortname ou nome começa pelo texto indicado. "
+                "Responde apenas com o índice local, sem chamar o ReclameAqui."
+)
+async def suggest_companies(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50),
+                            index: CompanyIndex = Depends(get_company_index)):
+    # Antes do aquecimento, a primeira sugestão ainda lê o índice do disco: numa thread, fora do event loop.
+    return await asyncio.to_thread(index.suggest, q, limit)
+
+@app.get(
+    "/companies/{company_id}/trends",
+    response_model=TendenciasEmpresaDTO,
+    response_model_by_alias=True,
+    summary="Tendências do histórico de reputação de uma empresa",
+    description="Taxas de resolução e de 'voltaria a fazer negócio' por mês e na janela móvel, variações mês a mês "
+                "e inclinação da taxa de resolução, a partir do histórico acumulado das coletas (sem chamar o "
+                "ReclameAqui)."
+)
+async def company_trends(company_id: str, window: int = Query(6, ge=1, le=36, description="Meses da janela móvel"),
+                         store: SnapshotStore = Depends(get_snapshot_store)):
+    # Antes do aquecimento, isto importa o NumPy e lê o histórico todo: numa thread, fora do event loop.
+    trends = await asyncio.to_thread(store.trends, [company_id], window)
+    if not len(trends["month"]):
+        raise HTTPException(status_code=404, detail="Sem histórico para esta empresa.")
+
+    def rounded(values) -> list:
+        # NaN (sem dados) passa a None no JSON.
+        return [None if value != value else round(value, 2) for value in values.tolist()]
+
+    columns = {name: rounded(trends[name]) for name in (
+        "resolution_rate", "deal_again_rate", "rolling_resolution_rate", "rolling_deal_again_rate",
+        "resolution_rate_delta", "deal_again_rate_delta", "complaints_change", "resolution_slope")}
+    meses = [TendenciaMensalDTO(
+        mes=month_label(month), status=store.status(status), total_reclamacoes=indexable, total_resolvidas=solved,
+        total_avaliacoes=evaluations, total_voltaria_fazer_negocio=deal_again,
+        taxa_resolucao=columns["resolution_rate"][i], taxa_voltaria_fazer_negocio=columns["deal_again_rate"][i],
+        taxa_resolucao_movel=columns["rolling_resolution_rate"][i],
+        taxa_voltaria_fazer_negocio_movel=columns["rolling_deal_again_rate"][i],
+        variacao_taxa_resolucao=columns["resolution_rate_delta"][i],
+        variacao_taxa_voltaria_fazer_negocio=columns["deal_again_rate_delta"][i],
+        variacao_reclamacoes=columns["complaints_change"][i], tendencia_resolucao=columns["resolution_slope"][i])
+        for i, (month, status, indexable, solved, evaluations, deal_again) in enumerate(zip(
+            trends["month"].tolist(), trends["status"].tolist(), trends["indexable"].tolist(),
+            trends["solved"].tolist(), trends["evaluations"].tolist(), trends["deal_again"].tolist()))]
+    return TendenciasEmpresaDTO(id_reclame_aqui=company_id, janela_meses=window, meses=meses)
+
+@app.get(
+    "/segments/{name}/ranking",
+    response_model=RankingSegmentoDTO,
+    response_model_by_alias=True,
+    summary="Ranking das empresas de um segmento",
+    description="Ordena as empresas de um segmento (principal ou secundário) por uma métrica de um período de "
+                "reputação. Usa apenas os dossiês já produzidos por este servidor, sem chamar o ReclameAqui."
+)
+async def segment_ranking(name: str, period: str = Query("SIX_MONTHS", description="Período de reputação"),
+                          metric: str = Query("solvedPercentual", description=f"Uma de: {', '.join(METRICS)}"),
+                          order: str = Query("asc", pattern="^(asc|desc)$",
+                                             description="asc: os valores mais baixos primeiro"),
+                          limit: int = Query(100, ge=1, le=1000),
+                          index: DossieIndex = Depends(get_dossie_index)):
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"Métrica desconhecida. Métricas válidas: {', '.join(METRICS)}.")
+    segment, total, rows = index.ranking(name, period, metric, order == "asc", limit)
+    if segment is None:
+        raise HTTPException(status_code=404, detail="Segmento sem empresas indexadas.")
+    return RankingSegmentoDTO(segmento=segment, periodo=period, metrica=metric, ordem=order, total_empresas=total,
+                              empresas=[RankingEmpresaDTO(**row) for row in rows])
+
+@app.get(
+    "/problems/top",
+    response_model=List[ProblemaAgregadoDTO],
+    response_model_by_alias=True,
+    summary="Problemas mais frequentes",
+    description="Soma as reclamações por problema em todos os dossiês já produzidos (ou só nos de um segmento), "
+                "sem chamar o ReclameAqui."
+)
+async def top_problems(kind: str = Query("6meses", pattern=f"^({'|'.join(PROBLEM_LISTS)})$",
+                                         description="Lista de problemas: 6meses ou historico"),
+                       segment: Optional[str] = Query(None, description="Só as empresas deste segmento"),
+                       limit: int = Query(10, ge=1, le=100),
+                       index: DossieIndex = Depends(get_dossie_index)):
+    return [ProblemaAgregadoDTO(nome=name, quantidade=total, empresas=companies)
+            for name, total, companies in index.top_problems(kind, segment, limit)]
+
+@app.get("/cache/stats", summary="Contadores da cache de dossiês")
+async def cache_stats(service: AsyncSearchService = Depends(get_async_search_service)):
+    if service.cache is None:
+        return {}
+    return service.cache.stats
+
+@app.get("/upstream/stats", summary="Estado do escalonador, dos disjuntores e da admissão das coletas")
+async def upstream_stats(service: AsyncSearchService = Depends(get_async_search_service)):
+    stats = {"hosts": get_upstream_scheduler().snapshot(), "circuits": get_circuit_breakers().snapshot()}
+    if service.admission is not None:
+        stats["admission"] = service.admission.snapshot()
+    return stats
+
+def watchlist_entry_dto(entry: WatchlistEntry, refresher: WatchlistRefresher) -> WatchlistEntryDTO:
+    return WatchlistEntryDTO(
+        id_reclame_aqui=entry.company_id, shortname=entry.shortname, intervalo_segundos=entry.interval,
+        adicionada_em=entry.added_at, ultima_atualizacao=entry.last_refreshed_at, proxima_atualizacao=entry.next_due,
+        ultimo_erro=entry.last_error, popularidade=refresher.watchlist.popularity(entry.company_id))
+
+@app.get("/admin/watchlist", summary="Empresas vigiadas e estado da atualização em segundo plano")
+async def list_watchlist(refresher: WatchlistRefresher = Depends(get_watchlist_refresher)):
+    entries = sorted(refresher.watchlist.entries(), key=lambda entry: entry.next_due)
+    return {"stats": refresher.snapshot(),
+            "entries": [watchlist_entry_dto(entry, refresher).model_dump(by_alias=True) for entry in entries]}
+
+@app.post(
+    "/admin/watchlist",
+    response_model=WatchlistEntryDTO,
+    summary="Vigia uma empresa",
+    description="Resolve o termo (CNPJ, shortname ou nome) para uma empresa e acrescenta-a à lista de vigilância: "
+                "o seu dossiê passa a ser atualizado em segundo plano a cada `intervaloSegundos`."
+)
+async def add_to_watchlist(request: WatchlistAddRequestDTO,
+                           service: AsyncSearchService = Depends(get_async_search_service),
+                           refresher: WatchlistRefresher = Depends(get_watchlist_refresher)):
+    try:
+        company = await service.resolve_company(request.term)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=f"Empresa não encontrada para o termo '{request.term}': {e}")
+    entry = await asyncio.to_thread(refresher.watchlist.add, company.id, company.shortname, request.intervalo_segundos)
+    refresher.schedule(entry)
+    return watchlist_entry_dto(entry, refresher)
+
+@app.get("/admin/watchlist/{company_id}", response_model=WatchlistEntryDTO, summary="Estado de uma empresa vigiada")
+async def get_watchlist_entry(company_id: str, refresher: WatchlistRefresher = Depends(get_watchlist_refresher)):
+    entry = refresher.watchlist.get(company_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Empresa não vigiada.")
+    return watchlist_entry_dto(entry, refresher)
+
+@app.delete("/admin/watchlist/{company_id}", status_code=204, summary="Deixa de vigiar uma empresa")
+async def remove_from_watchlist(company_id: str, refresher: WatchlistRefresher = Depends(get_watchlist_refresher)):
+    if await asyncio.to_thread(refresher.watchlist.remove, company_id) is None:
+        raise HTTPException(status_code=404, detail="Empresa não vigiada.")
+    return Response(status_code=204)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/", include_in_schema=False)
 def root():
     return {"message": "ExposeAqui está no ar!"}
@@ -60,6 +310,8 @@ def root():
 # Este bloco só é executado quando você roda o ficheiro diretamente com:
 # python3 app/main.py
 if __name__ == "__main__":
+    # Importado só aqui: em produção é o próprio uvicorn que carrega a aplicação.
+    import uvicorn
     print(">>> A iniciar a aplicação em modo de desenvolvimento...")
     uvicorn.run(
         "app.main:app", # O caminho para a sua instância do FastAPI
@@ -0,0 +1,290 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Instrumentação da aplicação.
+Métricas em memória (contadores, gauges e histogramas) expostas no formato de texto
+do Prometheus em `/metrics`, e a discriminação por etapas de cada requisição, devolvida
+no cabeçalho `Server-Timing`. Tudo é feito com operações O(1) por medição, para que a
+instrumentação possa ficar ligada em produção.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(ABC):
+    TYPE = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"] + self._samples()
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        pass
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, values)} {value:g}" for values, value in items]
+
+
+class Gauge(Counter):
+    TYPE = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    @contextmanager
+    def track(self, *label_values: str) -> Iterator[None]:
+        """Incrementa o gauge durante o bloco `with` (ex: requisições em curso)."""
+        self.inc(*label_values)
+        try:
+            yield
+        finally:
+            self.dec(*label_values)
+
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # Por combinação de labels: contagem por bucket (não cumulativa, a última é o +Inf), soma e total.
+        self._series: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(values, list(series[0]), series[1], series[2]) for values, series in self._series.items()]
+        lines = []
+        for values, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {count}")
+        return lines
+
+
+class Registry:
+    """Conjunto das métricas do processo, mais coletores que geram linhas sob demanda (ex: a cache)."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def register_collector(self, collector: Callable[[], List[str]]) -> None:
+        self._collectors.append(collector)
+
+    def unregister_collector(self, collector: Callable[[], List[str]]) -> None:
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collector in list(self._collectors):
+            lines += collector()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- Métricas da aplicação ---
+
+HTTP_REQUEST_SECONDS = Histogram("exposeaqui_http_request_duration_seconds",
+                                 "Duração das requisições HTTP, por rota.", ["route"])
+HTTP_RESPONSES = Counter("exposeaqui_http_responses_total", "Respostas HTTP, por rota e código.", ["route", "status"])
+HTTP_IN_FLIGHT = Gauge("exposeaqui_http_requests_in_flight", "Requisições HTTP em curso.")
+STAGE_SECONDS = Histogram("exposeaqui_stage_duration_seconds",
+                          "Duração de cada etapa de uma busca (análise, serialização, ...).", ["stage"])
+UPSTREAM_SECONDS = Histogram("exposeaqui_upstream_duration_seconds",
+                             "Duração das chamadas ao ReclameAqui, por endpoint.", ["endpoint"])
+UPSTREAM_RESPONSES = Counter("exposeaqui_upstream_responses_total",
+                             "Respostas do ReclameAqui, por endpoint e código HTTP.", ["endpoint", "status"])
+UPSTREAM_FAILURES = Counter("exposeaqui_upstream_failures_total",
+                            "Chamadas ao ReclameAqui falhadas, por endpoint e motivo (http, timeout, error, deadline, circuit_open).",
+                            ["endpoint", "reason"])
+UPSTREAM_IN_FLIGHT = Gauge("exposeaqui_upstream_requests_in_flight",
+                           "Chamadas ao ReclameAqui em curso, por endpoint.", ["endpoint"])
+SEARCHES_IN_FLIGHT = Gauge("exposeaqui_searches_in_flight", "Coletas (scrapes) em curso.")
+
+# --- Server-Timing ---
+
+# Etapas medidas durante a requisição atual. As tasks criadas a partir da requisição herdam
+# o contexto, e por isso acrescentam as suas medições à mesma lista.
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_timings", default=None)
+
+
+def _record_timing(name: str, seconds: float) -> None:
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """Mede uma etapa interna: alimenta o histograma `exposeaqui_stage_duration_seconds` e o Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage)
+        _record_timing(stage, elapsed)
+
+
+class UpstreamCall:
+    """
+    Mede uma chamada ao ReclameAqui, usado como `with UpstreamCall("profile") as call:`.
+    O código chamador regista o código HTTP com `call.status(...)`; exceções são contadas como falhas.
+    """
+    __slots__ = ("endpoint", "_status", "_start")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self._status: Optional[int] = None
+
+    def __enter__(self) -> "UpstreamCall":
+        UPSTREAM_IN_FLIGHT.inc(self.endpoint)
+        self._start = time.perf_counter()
+        return self
+
+    def status(self, status_code: int) -> None:
+        self._status = status_code
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed = time.perf_counter() - self._start
+        UPSTREAM_IN_FLIGHT.dec(self.endpoint)
+        UPSTREAM_SECONDS.observe(elapsed, self.endpoint)
+        _record_timing(self.endpoint, elapsed)
+        if self._status is not None:
+            UPSTREAM_RESPONSES.inc(self.endpoint, str(self._status))
+        if exc_type is not None:
+            UPSTREAM_FAILURES.inc(self.endpoint, _failure_reason(exc_type))
+        elif self._status is not None and self._status >= 400:
+            UPSTREAM_FAILURES.inc(self.endpoint, "http")
+
+
+def _failure_reason(exc_type: type) -> str:
+    name = exc_type.__name__
+    if name == "CancelledError":
+        return "deadline"
+    if "Timeout" in name:
+        return "timeout"
+    if name == "HTTPError":
+        return "http"
+    return "error"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede cada requisição HTTP e acrescenta o cabeçalho `Server-Timing`
+    com as etapas registadas até ao início da resposta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: List[Tuple[str, float]] = []
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings]
+                entries.append(f"total;dur={(time.perf_counter() - start) * 1000:.2f}")
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", ", ".join(entries).encode("latin-1"))]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            _request_timings.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", "desconhecida")
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, route_path)
+            HTTP_RESPONSES.inc(route_path, str(status_code))
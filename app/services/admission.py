@@ -0,0 +1,225 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Controlo de admissão das buscas que precisam de ir ao upstream.
+No máximo `max_active` coletas correm ao mesmo tempo; as seguintes esperam numa fila limitada,
+ordenada por prioridade (as buscas interativas passam à frente dos lotes). Quando a fila está
+cheia, ou quando já não há tempo para a busca caber no prazo do cliente, a busca é recusada de
+imediato com `Overloaded`, em vez de ficar a ocupar recursos e chamadas ao upstream até o cliente
+desistir. As buscas servidas pela cache (ou que se juntam a uma coleta já em curso) não passam por aqui;
+as que se juntam a uma coleta ainda na fila podem, no entanto, subir-lhe a prioridade.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import AsyncIterator, Dict, List, Optional
+
+
+class Priority(IntEnum):
+    """Prioridade na fila de admissão: os valores mais baixos são servidos primeiro."""
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+class Overloaded(Exception):
+    """Busca recusada pelo controlo de admissão. `retry_after` é a espera sugerida ao cliente, em segundos."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(TimeoutError):
+    """O prazo do cliente terminou antes da coleta; a coleta só continua se outra busca esperar por ela."""
+
+
+class AdmissionTicket:
+    """
+    O pedido de vaga de uma coleta. Uma coleta partilhada (single-flight) tem um único bilhete:
+    quem se junta a ela enquanto ainda está na fila sobe-lhe a prioridade com `promote`.
+    """
+    __slots__ = ("priority", "entry")
+
+    def __init__(self, priority: Priority = Priority.INTERACTIVE):
+        self.priority = priority
+        # A entrada na fila (`[prioridade, ordem de chegada, future]`), enquanto espera.
+        self.entry: Optional[list] = None
+
+
+class AdmissionController:
+    """Limita as coletas em curso e a fila de espera. Usado apenas dentro do event loop do servidor."""
+
+    def __init__(self, max_active: int = 32, max_queue: int = 64, min_budget: float = 2.0,
+                 max_wait: float = 10.0, max_retry_after: int = 30):
+        """
+        :param max_active: coletas em curso ao mesmo tempo.
+        :param max_queue: buscas à espera de vez; acima disto, a busca é recusada (ou, se for
+            interativa, toma o lugar do último lote da fila, que é recusado no seu lugar).
+        :param min_budget: tempo mínimo (em segundos) que tem de sobrar do prazo quando uma coleta que
+            esperou na fila começa. Uma busca que não possa começar a tempo é recusada logo, sem esperar.
+        :param max_wait: espera máxima na fila de uma busca sem prazo.
+        :param max_retry_after: teto do `Retry-After` sugerido.
+        """
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.min_budget = min_budget
+        self.max_wait = max_wait
+        self.max_retry_after = max_retry_after
+        self._active = 0
+        # Heap de [prioridade, ordem de chegada, future]: o future recebe a vez ou o `Overloaded`.
+        self._queue: List[list] = []
+        self._sequence = itertools.count()
+        # Média móvel da duração de uma coleta, para estimar o `Retry-After`.
+        self._service_time = 1.0
+        self._stats: Dict[str, int] = {
+            "admitted": 0, "queued": 0, "bypassed": 0, "rejected_queue_full": 0, "rejected_deadline": 0,
+            "rejected_timeout": 0, "evicted": 0}
+
+    @asynccontextmanager
+    async def admit(self, priority: Priority = Priority.INTERACTIVE, deadline_at: Optional[float] = None,
+                    ticket: Optional[AdmissionTicket] = None) -> AsyncIterator[None]:
+        """
+        Reserva uma vaga de coleta durante o bloco `async with`, esperando na fila se for preciso.
+        Com `ticket`, a prioridade é a do bilhete, que pode subir enquanto espera (ver `promote`).
+        Lança `Overloaded` se a fila estiver cheia ou se a vaga não chegar a tempo de a busca
+        caber no prazo `deadline_at` (em `time.monotonic()`).
+        """
+        await self._acquire(ticket or AdmissionTicket(priority), deadline_at)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._service_time += 0.2 * (time.monotonic() - started - self._service_time)
+            self._release()
+
+    def promote(self, ticket: AdmissionTicket, priority: Priority) -> None:
+        """Sobe a prioridade de um bilhete, reposicionando-o na fila se ainda estiver à espera."""
+        if priority >= ticket.priority:
+            return
+        ticket.priority = priority
+        if ticket.entry is not None and not ticket.entry[2].done():
+            ticket.entry[0] = int(priority)
+            heapq.heapify(self._queue)
+
+    def check_deadline(self, deadline_at: Optional[float]) -> None:
+        """Recusa já (`Overloaded`) uma busca que teria de esperar por vaga sem tempo para isso no seu prazo."""
+        if deadline_at is not None and (self._active >= self.max_active or self._queue) and \
+                deadline_at - time.monotonic() < self.min_budget:
+            self._reject("rejected_deadline", "Sem tempo no prazo do pedido para esperar por uma vaga.")
+
+    def bypass(self) -> None:
+        """Conta uma busca servida sem passar pela fila (cache ou coleta já em curso)."""
+        self._stats["bypassed"] += 1
+
+    def retry_after(self) -> int:
+        """Espera sugerida (segundos inteiros): o tempo que a fila atual leva a escoar, pelo menos 1 s."""
+        drain = self._service_time * (len(self._queue) + 1) / self.max_active
+        return max(1, min(self.max_retry_after, math.ceil(drain)))
+
+    def snapshot(self) -> Dict[str, float]:
+        return {"active": self._active, "queue": len(self._queue), "maxActive": self.max_active,
+                "maxQueue": self.max_queue, "serviceTimeSeconds": round(self._service_time, 3), **self._stats}
+
+    def render_metrics(self) -> List[str]:
+        """O estado da admissão no formato de texto do Prometheus (ver `app.metrics.Registry`)."""
+        outcomes = ("admitted", "bypassed", "rejected_queue_full", "rejected_deadline", "rejected_timeout",
+                    "evicted")
+        return [
+            "# HELP exposeaqui_admission_active Coletas admitidas em curso.",
+            "# TYPE exposeaqui_admission_active gauge",
+            f"exposeaqui_admission_active {self._active}",
+            "# HELP exposeaqui_admission_queue Buscas à espera de vez para coletar.",
+            "# TYPE exposeaqui_admission_queue gauge",
+            f"exposeaqui_admission_queue {len(self._queue)}",
+            "# HELP exposeaqui_admission_total Decisões do controlo de admissão, por resultado.",
+            "# TYPE exposeaqui_admission_total counter",
+            *(f'exposeaqui_admission_total{{outcome="{outcome}"}} {self._stats[outcome]}' for outcome in outcomes),
+        ]
+
+    # --- Internos ---
+
+    async def _acquire(self, ticket: AdmissionTicket, deadline_at: Optional[float]) -> None:
+        if self._active < self.max_active and not self._queue:
+            self._active += 1
+            self._stats["admitted"] += 1
+            return
+        self.check_deadline(deadline_at)
+        if len(self._queue) >= self.max_queue:
+            self._evict_for(ticket.priority)
+
+        future = asyncio.get_running_loop().create_future()
+        item = ticket.entry = [int(ticket.priority), next(self._sequence), future]
+        heapq.heappush(self._queue, item)
+        self._stats["queued"] += 1
+        wait = self.max_wait if deadline_at is None else deadline_at - time.monotonic() - self.min_budget
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=wait)
+        except asyncio.TimeoutError:
+            if self._discard(item):
+                self._reject("rejected_timeout", "Sem vaga para coletar dentro do prazo do pedido.")
+        except asyncio.CancelledError:
+            # O cliente desistiu: sai da fila, ou devolve a vaga se ela chegou entretanto.
+            if not self._discard(item) and future.done() and future.exception() is None:
+                self._release()
+            raise
+        finally:
+            ticket.entry = None
+        # A vaga pode ter chegado no limite do prazo; o `Overloaded` de uma expulsão sobe daqui.
+        future.result()
+        self._stats["admitted"] += 1
+
+    def _evict_for(self, priority: Priority) -> None:
+        """Fila cheia: recusa a busca nova, a menos que haja na fila uma de prioridade mais baixa."""
+        # Com `max_queue=0` a fila está sempre cheia e vazia: não há ninguém a quem tirar o lugar.
+        worst = max(self._queue) if self._queue else None
+        if worst is None or worst[0] <= priority:
+            self._reject("rejected_queue_full", "Fila de buscas cheia.")
+        self._queue.remove(worst)
+        heapq.heapify(self._queue)
+        self._stats["evicted"] += 1
+        worst[2].set_exception(Overloaded("Busca de menor prioridade retirada da fila.", self.retry_after()))
+
+    def _discard(self, item: list) -> bool:
+        """Retira da fila uma busca que ainda não recebeu a vaga. Devolve False se já a recebeu (ou foi expulsa)."""
+        if item[2].done():
+            return False
+        self._queue.remove(item)
+        heapq.heapify(self._queue)
+        return True
+
+    def _release(self) -> None:
+        # A vaga passa diretamente à próxima busca da fila, sem voltar a ficar livre.
+        while self._queue:
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def _reject(self, outcome: str, message: str) -> None:
+        self._stats[outcome] += 1
+        raise Overloaded(message, self.retry_after())
@@ -25,17 +25,36 @@ transforma no Dossiê 360° final, aplicando as regras de negócio.
 """
 
 from abc import ABC, abstractmethod
+from typing import Optional, Union
+from pydantic import TypeAdapter
 from app.dtos import *
-import json
+from .field_selection import FieldSelection
+
+# Os dados brutos chegam como os bytes da resposta HTTP (ou como texto, vindos de fontes mais antigas).
+RawSection = Union[str, bytes]
+# A empresa da busca inicial já vem validada do Scraper; o JSON só aparece quando vem de outra fonte.
+InitialData = Union[CompanyDTO, RawSection]
+
+# Validadores compilados uma única vez, no carregamento do módulo.
+_OBJECT_ADAPTER = TypeAdapter(Dict[str, Any])
+_PROBLEMS_ADAPTER = TypeAdapter(ProblemsPayload)
+_PROBLEM_LIST_ADAPTER = TypeAdapter(List[ProblemInfoDTO])
+_SECTIONS_ADAPTER = TypeAdapter(List[str])
+_DOSSIE_ADAPTER = TypeAdapter(DossieEmpresaDTO)
 
 
 class AnalysisStrategy(ABC):
     """Interface que define o contrato para qualquer analisador de dados."""
 
     @abstractmethod
-    def generate(self, initial_data_json: str, raw_data: Dict[str, str]) -> DossieEmpresaDTO:
+    def generate(self, initial_data: InitialData, raw_data: Dict[str, RawSection],
+                 fields: Optional[FieldSelection] = None) -> DossieEmpresaDTO:
         pass
 
+    def serialize(self, dossie: DossieEmpresaDTO, fields: Optional[FieldSelection] = None) -> bytes:
+        """Serializa o dossiê para o JSON final da API (com os aliases em camelCase), só com os campos pedidos."""
+        return _DOSSIE_ADAPTER.dump_json(dossie, by_alias=True, include=fields.include if fields else None)
+
 
 class DossieGenerator(AnalysisStrategy):
     """
@@ -43,26 +62,46 @@ class DossieGenerator(AnalysisStrategy):
     do ExposeAqui e transformá-los num dossiê estruturado e de alto valor.
     """
 
-    def generate(self, initial_data_json: str, raw_data: Dict[str, str]) -> DossieEmpresaDTO:
+    def generate(self, initial_data: InitialData, raw_data: Dict[str, RawSection],
+                 fields: Optional[FieldSelection] = None) -> DossieEmpresaDTO:
         """
         Método público que recebe os dados brutos, converte-os e chama a
-        lógica de análise principal.
+        lógica de análise principal. Cada secção é lida uma única vez, diretamente
+        dos bytes, pelos validadores pré-compilados. As secções listadas em
+        `MISSING_SECTIONS` ficam assinaladas em `secoesEmFalta`.
+        Com `fields`, só são lidas as secções (e montados os campos) que a seleção usa.
         """
-        initial_data = CompanyDTO.model_validate_json(initial_data_json)
-        profile = json.loads(raw_data.get("profile")) if "profile" in raw_data else None
-        main_problems = json.loads(raw_data.get("mainProblems")) if "mainProblems" in raw_data else None
-        problems_6_months = json.loads(raw_data.get("problems6Months")) if "problems6Months" in raw_data else None
-        evolution = json.loads(raw_data.get("indexEvolution")) if "indexEvolution" in raw_data else None
-        return self._generate_dossie(initial_data, profile, main_problems, problems_6_months, evolution)
-
-    def _generate_dossie(self, initial_data: CompanyDTO, profile: Dict, main_problems: Dict, problems_6_months: Dict,
-                         evolution: Dict) -> DossieEmpresaDTO:
+        if not isinstance(initial_data, CompanyDTO):
+            initial_data = CompanyDTO.model_validate_json(initial_data)
+        # A lista vem do Scraper; relida da cache em disco, chega como JSON.
+        missing = raw_data.get(MISSING_SECTIONS)
+        if missing and not isinstance(missing, list):
+            missing = _SECTIONS_ADAPTER.validate_json(missing)
+        if fields is not None:
+            has_profile = "profile" in raw_data
+            required = fields.required_sections(has_profile)
+            raw_data = {key: value for key, value in raw_data.items() if key in required}
+            missing = fields.relevant(missing or (), has_profile)
+        profile = _OBJECT_ADAPTER.validate_json(raw_data["profile"]) if "profile" in raw_data else None
+        main_problems = _PROBLEMS_ADAPTER.validate_json(raw_data["mainProblems"]) if "mainProblems" in raw_data else None
+        problems_6_months = (_PROBLEMS_ADAPTER.validate_json(raw_data["problems6Months"])
+                             if "problems6Months" in raw_data else None)
+        evolution = _OBJECT_ADAPTER.validate_json(raw_data["indexEvolution"]) if "indexEvolution" in raw_data else None
+        dossie = self._generate_dossie(initial_data, profile, main_problems, problems_6_months, evolution, fields)
+        if missing:
+            dossie.secoes_em_falta = list(missing)
+        return dossie
+
+    def _generate_dossie(self, initial_data: CompanyDTO, profile: Dict, main_problems: ProblemsPayload,
+                         problems_6_months: ProblemsPayload, evolution: Dict,
+                         fields: Optional[FieldSelection] = None) -> DossieEmpresaDTO:
         """
         O coração da lógica de negócio. Constrói o dossiê final de forma
         adaptativa, tratando os diferentes tipos de empresa (verificada vs. não verificada).
         """
         identificacao: IdentificacaoDTO
         dossie: DossieEmpresaDTO
+        wants = fields.wants if fields is not None else lambda field: True
 
         if profile:
             # --- Lógica para empresas com API de perfil (geralmente as verificadas) ---
@@ -77,32 +116,35 @@ class DossieGenerator(AnalysisStrategy):
             identificacao = IdentificacaoDTO.model_validate(ident_data)
             dossie = DossieEmpresaDTO(identificacao=identificacao)
 
-            operacional_data = {
-                "sitePrincipal": profile.get("urlSite"),
-                "segmentoPrincipal": profile.get("mainSegment", {}).get("title"),
-                "segmentosSecundarios": [seg.get("title") for seg in profile.get("secondarySegments", [])],
-                "principaisProdutosAtendimento": [opt.get("value") for opt in
-                                                  profile.get("additionalFields", [{}])[0].get("options",
-                                                                                               [])] if profile.get(
-                    "additionalFields") else []
-            }
-            dossie.operacional = OperacionalDTO.model_validate(operacional_data)
-
-            company_flags = profile.get("companyPageFlags") or {}
-            engajamento_data = {
-                "statusConta": profile.get("status"),
-                "verificada": company_flags.get("hasVerificada"),
-                "tipoPlano": company_flags.get("configurationType")
-            }
-            dossie.engajamento_plataforma = EngajamentoDTO.model_validate(engajamento_data)
-
-            reputacao_map = {}
-            for panel in profile.get("panels", []):
-                index = panel.get("index", {})
-                tipo = index.get("type")
-                if tipo:
-                    reputacao_map[tipo] = ReputacaoPeriodoDTO.model_validate(index)
-            dossie.reputacao_por_periodo = reputacao_map
+            if wants("operacional"):
+                operacional_data = {
+                    "sitePrincipal": profile.get("urlSite"),
+                    "segmentoPrincipal": profile.get("mainSegment", {}).get("title"),
+                    "segmentosSecundarios": [seg.get("title") for seg in profile.get("secondarySegments", [])],
+                    "principaisProdutosAtendimento": [opt.get("value") for opt in
+                                                      profile.get("additionalFields", [{}])[0].get("options",
+                                                                                                   [])] if profile.get(
+                        "additionalFields") else []
+                }
+                dossie.operacional = OperacionalDTO.model_validate(operacional_data)
+
+            if wants("engajamentoPlataforma"):
+                company_flags = profile.get("companyPageFlags") or {}
+                engajamento_data = {
+                    "statusConta": profile.get("status"),
+                    "verificada": company_flags.get("hasVerificada"),
+                    "tipoPlano": company_flags.get("configurationType")
+                }
+                dossie.engajamento_plataforma = EngajamentoDTO.model_validate(engajamento_data)
+
+            if wants("reputacaoPorPeriodo"):
+                reputacao_map = {}
+                for panel in profile.get("panels", []):
+                    index = panel.get("index", {})
+                    tipo = index.get("type")
+                    if tipo:
+                        reputacao_map[tipo] = ReputacaoPeriodoDTO.model_validate(index)
+                dossie.reputacao_por_periodo = reputacao_map
         else:
             # --- Lógica de fallback para empresas não verificadas ---
             ident_data = {
@@ -114,7 +156,7 @@ class DossieGenerator(AnalysisStrategy):
             identificacao = IdentificacaoDTO.model_validate(ident_data)
             dossie = DossieEmpresaDTO(identificacao=identificacao)
 
-            if evolution:
+            if evolution and wants("reputacaoPorPeriodo"):
                 reputacao_map = {}
                 snapshot = evolution.get("snapshots", [{}])[0]
                 if snapshot:
@@ -122,15 +164,16 @@ class DossieGenerator(AnalysisStrategy):
                 dossie.reputacao_por_periodo = reputacao_map
 
         # --- Preenchimento dos dados comuns, que vêm de outras APIs ---
+        # Só os itens usados são validados como `ProblemInfoDTO` (ver `ProblemsPayload`).
         if main_problems:
             problemas = main_problems.get("complainResult", {}).get("complains", {}).get("problems", [])
-            dossie.principais_problemas_historico = [ProblemInfoDTO.model_validate(p) for p in problemas[:5]]
+            dossie.principais_problemas_historico = _PROBLEM_LIST_ADAPTER.validate_python(problemas[:5])
 
         if problems_6_months:
             problemas = problems_6_months.get("complainResult", {}).get("complains", {}).get("problems", [])
-            dossie.principais_problemas_6_meses = [ProblemInfoDTO.model_validate(p) for p in problemas]
+            dossie.principais_problemas_6_meses = _PROBLEM_LIST_ADAPTER.validate_python(problemas)
 
-        if evolution:
+        if evolution and wants("evolucaoMensalDetalhada"):
             dossie.evolucao_mensal_detalhada = evolution.get("snapshots")
 
         return dossie
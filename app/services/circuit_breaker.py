@@ -0,0 +1,182 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Disjuntores (circuit breakers) por API de perfil.
+Quando uma API do ReclameAqui se degrada (ex: `problems6Months` a pendurar), as buscas
+deixam de esperar por ela: depois de algumas falhas seguidas o disjuntor abre e a chamada
+é saltada, e o dossiê segue sem essa secção. Passado um tempo de espera, uma única chamada
+de teste volta a ser feita; se falhar, a espera seguinte duplica. Cada disjuntor também
+acompanha a latência da sua API e propõe um prazo por chamada, para que uma API pendurada
+seja detetada em segundos e não só ao fim do prazo da busca.
+"""
+
+import threading
+import time
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Disjuntor thread-safe de uma API. `allow` diz se a chamada pode ser feita; o resultado é registado depois."""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 5.0,
+                 max_reset_timeout: float = 120.0, min_call_timeout: float = 1.0):
+        """
+        :param failure_threshold: falhas (ou timeouts) seguidas que abrem o disjuntor.
+        :param reset_timeout: espera inicial até à primeira chamada de teste.
+        :param max_reset_timeout: teto da espera, que duplica a cada teste falhado.
+        :param min_call_timeout: piso do prazo proposto por `call_timeout`.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.min_call_timeout = min_call_timeout
+        self._latency: Optional[float] = None
+        self._deviation = 0.0
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._backoff = reset_timeout
+        self._open_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.stats = {"failures": 0, "opened": 0, "skipped": 0}
+
+    @property
+    def state(self) -> CircuitState:
+        return self._state
+
+    def is_open(self) -> bool:
+        """Indica se o disjuntor está aberto; uma chamada que já passou por `allow` e ainda espera pela vez desiste."""
+        return self._state is CircuitState.OPEN
+
+    def allow(self) -> bool:
+        """Indica se a chamada pode ser feita agora. Com o disjuntor meio-aberto só passa uma chamada de teste."""
+        with self._lock:
+            if self._state is CircuitState.CLOSED:
+                return True
+            if self._state is CircuitState.OPEN and time.monotonic() >= self._open_until:
+                self._state = CircuitState.HALF_OPEN
+            if self._state is CircuitState.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.stats["skipped"] += 1
+            return False
+
+    def call_timeout(self, limit: Optional[float]) -> Optional[float]:
+        """
+        Prazo para a próxima chamada. Tal como o RTO do TCP, é a latência média mais quatro vezes o
+        seu desvio médio, nunca abaixo de `min_call_timeout` nem acima de `limit`.
+        """
+        if self._latency is None:
+            return limit
+        timeout = max(self._latency + 4 * self._deviation, self.min_call_timeout)
+        return min(timeout, limit) if limit else timeout
+
+    def record_success(self, latency: Optional[float] = None) -> None:
+        with self._lock:
+            if latency is not None:
+                if self._latency is None:
+                    self._latency, self._deviation = latency, latency / 2
+                else:
+                    self._deviation = 0.75 * self._deviation + 0.25 * abs(latency - self._latency)
+                    self._latency = 0.875 * self._latency + 0.125 * latency
+            if self._state is not CircuitState.CLOSED:
+                print(f"INFO:     API {self.name} recuperou; disjuntor fechado.")
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+            self._backoff = self.reset_timeout
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.stats["failures"] += 1
+            if self._state is CircuitState.HALF_OPEN:
+                # O teste falhou: volta a abrir, com o dobro da espera.
+                self._backoff = min(self._backoff * 2, self.max_reset_timeout)
+                self._open()
+            elif self._state is CircuitState.CLOSED:
+                self._failures += 1
+                if self._failures >= self.failure_threshold:
+                    self._open()
+
+    def record_abandoned(self) -> None:
+        """A chamada foi interrompida pelo prazo do pedido, e não por culpa da API: não conta como falha."""
+        with self._lock:
+            # Se era a chamada de teste, a próxima pode testar de novo.
+            self._probing = False
+
+    def _open(self) -> None:
+        # Chamado com o lock adquirido.
+        self._state = CircuitState.OPEN
+        self._open_until = time.monotonic() + self._backoff
+        self._probing = False
+        self.stats["opened"] += 1
+        print(f"WARN:     API {self.name} com falhas seguidas; disjuntor aberto durante {self._backoff:.0f}s.")
+
+
+class CircuitBreakers:
+    """Os disjuntores de um processo, um por chave de API (`profile`, `mainProblems`, ...), criados sob demanda."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 5.0, max_reset_timeout: float = 120.0,
+                 min_call_timeout: float = 1.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.min_call_timeout = min_call_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(name, CircuitBreaker(
+                    name, self.failure_threshold, self.reset_timeout, self.max_reset_timeout, self.min_call_timeout))
+        return breaker
+
+    def open_names(self) -> List[str]:
+        """As APIs cujo disjuntor não está fechado."""
+        return [name for name, breaker in self._breakers.items() if breaker.state is not CircuitState.CLOSED]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: {"state": breaker.state.value, "call_timeout": breaker.call_timeout(None), **breaker.stats}
+                for name, breaker in list(self._breakers.items())}
+
+    def render_metrics(self) -> List[str]:
+        """Estado de cada disjuntor no formato do Prometheus (0 = fechado, 1 = meio-aberto, 2 = aberto)."""
+        levels = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+        breakers = list(self._breakers.items())
+        lines = ["# HELP exposeaqui_circuit_state Estado do disjuntor de cada API (0 fechado, 1 meio-aberto, 2 aberto).",
+                 "# TYPE exposeaqui_circuit_state gauge"]
+        lines += [f'exposeaqui_circuit_state{{section="{name}"}} {levels[breaker.state]}' for name, breaker in breakers]
+        lines += ["# HELP exposeaqui_circuit_skipped_total Chamadas saltadas com o disjuntor aberto.",
+                  "# TYPE exposeaqui_circuit_skipped_total counter"]
+        lines += [f'exposeaqui_circuit_skipped_total{{section="{name}"}} {breaker.stats["skipped"]}'
+                  for name, breaker in breakers]
+        return lines
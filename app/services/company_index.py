@@ -0,0 +1,229 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Índice local de resolução de empresas.
+Guarda cada `CompanyDTO` devolvido pela busca do ReclameAqui e indexa-o pelos seus
+documentos, shortname e nomes (normalizados). Assim, um termo já conhecido é resolvido
+sem a chamada a `modern-search`, e o mesmo índice serve o autocompletar local.
+Uma chave partilhada por várias empresas (ex: o CNPJ de uma matriz e das filiais) é ambígua:
+só resolve o termo exato que já foi buscado, para a empresa que a busca escolheu (a última busca
+desse termo). Uma empresa atualizada deixa de ser encontrada pelas chaves que já não tem.
+As chaves ficam num array ordenado, o que permite buscas por prefixo com `bisect`.
+A base persistente só é lida no primeiro uso (ou em `load`, no aquecimento do serviço).
+"""
+
+import bisect
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+from app.dtos import CompanyDTO
+from .normalization import normalize_term
+
+
+class CompanyIndex:
+    """Índice thread-safe `chave -> empresa`, em memória, com persistência opcional em SQLite."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self._companies: Dict[str, CompanyDTO] = {}
+        # Chave -> ids das empresas com essa chave, pela ordem em que foram vistas.
+        self._keys: Dict[str, List[str]] = {}
+        # Termo buscado -> id da empresa que a busca escolheu (a primeira do resultado).
+        self._terms: Dict[str, str] = {}
+        self._sorted_keys: List[str] = []
+        # As chaves novas são acrescentadas ao fim do array e só ordenadas no próximo `suggest`.
+        self._unsorted = False
+        # Empresas que, depois de uma busca, responderam 404 no perfil (não verificadas). Só em memória.
+        self._without_profile: Set[str] = set()
+        self._lock = threading.Lock()
+        self._loaded = not db_path
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS companies (id TEXT PRIMARY KEY, body TEXT NOT NULL)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, company_id TEXT NOT NULL)")
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._companies)
+
+    def load(self) -> None:
+        """Lê (e valida) as empresas guardadas já, em vez de o fazer no primeiro uso."""
+        with self._lock:
+            self._ensure_loaded()
+
+    @staticmethod
+    def keys_for(company: CompanyDTO) -> List[str]:
+        """As chaves pelas quais uma empresa pode ser encontrada."""
+        keys = [normalize_term(document) for document in company.documents]
+        keys += [normalize_term(company.shortname), normalize_term(company.company_name),
+                 normalize_term(company.fantasy_name)]
+        return [key for key in keys if key]
+
+    def add_many(self, companies: Iterable[CompanyDTO], term: Optional[str] = None) -> None:
+        """
+        Acrescenta (ou atualiza) empresas ao índice e à base persistente. Com `term`, as empresas
+        são o resultado da busca desse termo, e o termo fica associado à primeira (a escolhida).
+        """
+        companies = list(companies)
+        if not companies:
+            return
+        term_key = normalize_term(term) if term else ""
+        with self._lock:
+            self._ensure_loaded()
+            for company in companies:
+                self._index(company)
+            new_term = bool(term_key) and self._terms.get(term_key) != companies[0].id
+            if new_term:
+                self._terms[term_key] = companies[0].id
+            if self._db is not None:
+                self._db.execute("BEGIN")
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO companies (id, body) VALUES (?, ?)",
+                    [(company.id, company.model_dump_json(by_alias=True)) for company in companies])
+                if new_term:
+                    self._db.execute("INSERT OR REPLACE INTO terms (term, company_id) VALUES (?, ?)",
+                                     (term_key, companies[0].id))
+                self._db.execute("COMMIT")
+
+    def forget(self, company_id: str) -> None:
+        """
+        Retira uma empresa do índice e da base persistente, com as suas chaves e os termos que a
+        escolheram (ex: o perfil deixou de existir com o shortname guardado). A próxima busca volta a
+        `modern-search`.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            company = self._companies.pop(company_id, None)
+            if company is None:
+                return
+            for key in self.keys_for(company):
+                self._unindex(key, company_id)
+            self._terms = {term: chosen for term, chosen in self._terms.items() if chosen != company_id}
+            self._without_profile.discard(company_id)
+            if self._db is not None:
+                self._db.execute("BEGIN")
+                self._db.execute("DELETE FROM companies WHERE id = ?", (company_id,))
+                self._db.execute("DELETE FROM terms WHERE company_id = ?", (company_id,))
+                self._db.execute("COMMIT")
+
+    def record_profile(self, company_id: str, found: bool) -> None:
+        """Regista se o perfil de uma empresa existe (um 404 de uma empresa não verificada é esperado)."""
+        # Um `set` só em memória: add e discard são atómicos, sem precisar do lock.
+        if found:
+            self._without_profile.discard(company_id)
+        else:
+            self._without_profile.add(company_id)
+
+    def known_without_profile(self, company_id: str) -> bool:
+        return company_id in self._without_profile
+
+    def lookup(self, term: str) -> Optional[CompanyDTO]:
+        """
+        Busca exata por documento, shortname ou nome. Um termo já buscado dá a empresa que essa busca
+        escolheu; uma chave de várias empresas, nunca buscada, é ambígua e conta como falha.
+        """
+        key = normalize_term(term)
+        with self._lock:
+            self._ensure_loaded()
+            company_id = self._terms.get(key)
+            if company_id is None:
+                company_ids = self._keys.get(key)
+                if not company_ids or len(company_ids) > 1:
+                    return None
+                company_id = company_ids[0]
+            return self._companies.get(company_id)
+
+    def get(self, company_id: str) -> Optional[CompanyDTO]:
+        with self._lock:
+            self._ensure_loaded()
+            return self._companies.get(company_id)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[CompanyDTO]:
+        """Empresas com alguma chave a começar por `prefix`, por ordem alfabética da chave."""
+        prefix = normalize_term(prefix)
+        if not prefix:
+            return []
+        results: Dict[str, CompanyDTO] = {}
+        with self._lock:
+            self._ensure_loaded()
+            if self._unsorted:
+                # O Timsort junta as chaves novas ao array já ordenado sem o reordenar todo.
+                self._sorted_keys.sort()
+                self._unsorted = False
+            position = bisect.bisect_left(self._sorted_keys, prefix)
+            while position < len(self._sorted_keys) and len(results) < limit:
+                key = self._sorted_keys[position]
+                if not key.startswith(prefix):
+                    break
+                for company_id in self._keys[key]:
+                    results.setdefault(company_id, self._companies[company_id])
+                position += 1
+        return list(results.values())[:limit]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # --- Internos (chamados com o lock adquirido) ---
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if self._db is not None:
+            for (body,) in self._db.execute("SELECT body FROM companies"):
+                self._index(CompanyDTO.model_validate_json(body))
+            self._terms = dict(self._db.execute("SELECT term, company_id FROM terms"))
+            self._sorted_keys.sort()
+            self._unsorted = False
+
+    def _index(self, company: CompanyDTO) -> None:
+        """Regista a empresa; as chaves que ainda não existiam vão para o fim do array (ver `_unsorted`)."""
+        previous = self._companies.get(company.id)
+        self._companies[company.id] = company
+        keys = self.keys_for(company)
+        if previous is not None:
+            # Uma empresa que mudou de nome ou de shortname deixa de ser encontrada pelas chaves antigas.
+            for key in set(self.keys_for(previous)).difference(keys):
+                self._unindex(key, company.id)
+        for key in keys:
+            company_ids = self._keys.get(key)
+            if company_ids is None:
+                self._keys[key] = [company.id]
+                self._sorted_keys.append(key)
+                self._unsorted = True
+            elif company.id not in company_ids:
+                company_ids.append(company.id)
+
+    def _unindex(self, key: str, company_id: str) -> None:
+        company_ids = self._keys.get(key)
+        if company_ids is None or company_id not in company_ids:
+            return
+        company_ids.remove(company_id)
+        if not company_ids:
+            del self._keys[key]
+            self._sorted_keys.remove(key)
@@ -0,0 +1,340 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Cache de dossiês em dois níveis.
+1. Memória: um LRU com as respostas brutas mais usadas e o dossiê já montado.
+2. Disco: uma base SQLite local que sobrevive a reinícios do processo.
+As entradas são indexadas pelo id da empresa no ReclameAqui; os termos de busca
+(normalizados) apontam para esse id. Cada secção bruta tem o seu próprio TTL, e uma
+entrada vencida ainda pode ser servida durante a janela de stale-while-revalidate
+enquanto é atualizada em segundo plano.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.dtos import MISSING_SECTIONS, CompanyDTO, DossieEmpresaDTO
+from .normalization import normalize_term
+
+# TTL (em segundos) de cada secção bruta devolvida pelo Scraper.
+DEFAULT_SECTION_TTLS: Dict[str, float] = {
+    "initialData": 24 * 3600,
+    "profile": 6 * 3600,
+    "mainProblems": 6 * 3600,
+    "problems6Months": 3 * 3600,
+    "indexEvolution": 12 * 3600,
+}
+
+
+class Freshness(str, Enum):
+    FRESH = "fresh"
+    STALE = "stale"
+    EXPIRED = "expired"
+
+
+@dataclass
+class CachedDossie:
+    """Os dados brutos de uma empresa, com a data de coleta de cada secção."""
+    company_id: str
+    # "initialData" é um `CompanyDTO` (ou o seu JSON, quando lido do disco); as restantes secções são bytes,
+    # exceto `MISSING_SECTIONS`, a lista das secções em falta (também em JSON, quando lida do disco).
+    raw_data: Dict[str, Any]
+    # Inclui também as secções que falharam na coleta (sem entrada em `raw_data`).
+    fetched_at: Dict[str, float]
+    # Dossiê montado a partir de `raw_data`, o seu JSON final, a ETag desse JSON e as suas versões
+    # comprimidas (por codificação); só existem no nível de memória.
+    dossie: Optional[DossieEmpresaDTO] = field(default=None, compare=False)
+    dossie_json: Optional[bytes] = field(default=None, compare=False)
+    dossie_etag: Optional[str] = field(default=None, compare=False)
+    dossie_encoded: Dict[str, bytes] = field(default_factory=dict, compare=False)
+
+
+class DossieCache:
+    """Cache thread-safe de dados brutos por empresa, com um LRU em memória à frente de uma base SQLite."""
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = 2048,
+                 section_ttls: Optional[Dict[str, float]] = None, stale_while_revalidate: float = 24 * 3600):
+        """
+        :param db_path: ficheiro SQLite do nível persistente. Se omitido, a cache fica só em memória.
+        :param max_entries: número máximo de empresas no LRU em memória.
+        :param section_ttls: TTL de cada secção bruta. Por omissão, `DEFAULT_SECTION_TTLS`.
+        :param stale_while_revalidate: tempo, após o TTL, durante o qual uma secção ainda pode
+            ser servida enquanto é atualizada em segundo plano.
+        """
+        self.max_entries = max_entries
+        self.section_ttls = dict(section_ttls or DEFAULT_SECTION_TTLS)
+        self.stale_while_revalidate = stale_while_revalidate
+        self._entries: "OrderedDict[str, CachedDossie]" = OrderedDict()
+        self._terms: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS dossie_sections (
+                    company_id TEXT NOT NULL,
+                    section TEXT NOT NULL,
+                    body TEXT,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (company_id, section)
+                )""")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS term_index (
+                    term TEXT PRIMARY KEY,
+                    company_id TEXT NOT NULL
+                )""")
+        self.stats: Dict[str, int] = {
+            "memory_hits": 0, "disk_hits": 0, "stale_hits": 0, "misses": 0,
+            "evictions": 0, "refreshes": 0,
+        }
+
+    # --- Leitura ---
+
+    def lookup(self, term: str, sections: Optional[Iterable[str]] = None) -> Tuple[Optional[CachedDossie], Freshness]:
+        """
+        Procura a entrada de um termo (ou diretamente de um id de empresa) e classifica a sua frescura,
+        só em relação a `sections`, se indicadas. Atualiza os contadores de acertos e falhas.
+        """
+        key = normalize_term(term)
+        with self._lock:
+            company_id = self._terms.get(key)
+            if company_id is not None:
+                self._terms.move_to_end(key)
+            entry = self._entries.get(company_id or key)
+            if entry is not None:
+                self._entries.move_to_end(entry.company_id)
+                tier = "memory_hits"
+            else:
+                entry = self._load_from_disk(key, company_id)
+                tier = "disk_hits"
+
+            freshness = self.freshness(entry, sections) if entry is not None else Freshness.EXPIRED
+            if freshness is Freshness.EXPIRED:
+                self.stats["misses"] += 1
+                return None, freshness
+            self.stats[tier] += 1
+            if freshness is Freshness.STALE:
+                self.stats["stale_hits"] += 1
+            return entry, freshness
+
+    def in_memory(self, term: str) -> bool:
+        """Indica se a entrada de um termo está no nível de memória (se está, `lookup` não lê a base)."""
+        key = normalize_term(term)
+        with self._lock:
+            return (self._terms.get(key) or key) in self._entries
+
+    def resolve_company_id(self, term: str) -> Optional[str]:
+        """Devolve o id da empresa já associado a um termo, sem olhar para a frescura nem contar acertos."""
+        key = normalize_term(term)
+        with self._lock:
+            company_id = self._terms.get(key)
+            if company_id is None and self._db is not None:
+                row = self._db.execute("SELECT company_id FROM term_index WHERE term = ?", (key,)).fetchone()
+                company_id = row[0] if row else None
+            return company_id
+
+    def freshness(self, entry: CachedDossie, sections: Optional[Iterable[str]] = None) -> Freshness:
+        """
+        A frescura de uma entrada é a da sua secção mais antiga em relação ao respetivo TTL.
+        Com `sections`, só contam essas secções (e a busca inicial).
+        """
+        now = time.time()
+        result = Freshness.FRESH
+        for section, ttl in self._section_ttls(sections):
+            fetched_at = entry.fetched_at.get(section)
+            if fetched_at is None:
+                return Freshness.EXPIRED
+            age = now - fetched_at
+            if age > ttl + self.stale_while_revalidate:
+                return Freshness.EXPIRED
+            if age > ttl:
+                result = Freshness.STALE
+        return result
+
+    def stale_sections(self, entry: CachedDossie, sections: Optional[Iterable[str]] = None) -> List[str]:
+        """As secções presentes na entrada que já passaram do seu TTL (são servidas, mas estão desatualizadas)."""
+        now = time.time()
+        return [section for section, ttl in self._section_ttls(sections)
+                if section in entry.raw_data and now - entry.fetched_at.get(section, 0) > ttl]
+
+    @staticmethod
+    def missing_sections(entry: CachedDossie) -> List[str]:
+        """As secções que falharam na última coleta e não tinham uma versão anterior para as substituir."""
+        missing = entry.raw_data.get(MISSING_SECTIONS)
+        if isinstance(missing, (bytes, str)):
+            missing = json.loads(missing)
+        return missing or []
+
+    # --- Escrita ---
+
+    def store(self, term: str, raw_data: Dict[str, Any],
+              attempted_sections: Optional[Iterable[str]] = None) -> CachedDossie:
+        """
+        Guarda os dados brutos de uma coleta nos dois níveis e associa o termo ao id da empresa.
+        `attempted_sections` são as secções que o Scraper tentou obter; por omissão, todas as
+        secções com TTL. As que não vieram em `raw_data` ficam registadas como ausentes, e as que
+        não foram tentadas (numa coleta com seleção de campos) mantêm-se da entrada anterior.
+        Se `raw_data` trouxer a lista `MISSING_SECTIONS`, só essas contam como falhas, e cada uma
+        é substituída pela versão anterior da cache, se ainda houver uma dentro da janela de
+        stale-while-revalidate.
+        """
+        initial_data = raw_data["initialData"]
+        if not isinstance(initial_data, CompanyDTO):
+            initial_data = CompanyDTO.model_validate_json(initial_data)
+        company_id = initial_data.id
+        now = time.time()
+        sections = self.section_ttls.keys() if attempted_sections is None else set(attempted_sections)
+        partial = attempted_sections is not None and not sections >= self.section_ttls.keys()
+        raw_data = dict(raw_data)
+        missing = raw_data.pop(MISSING_SECTIONS, None)
+        key = normalize_term(term)
+        with self._lock:
+            previous = self._entries.get(company_id) if missing or partial else None
+            if (missing or partial) and previous is None:
+                previous = self._load_from_disk(company_id, company_id)
+            fetched_at = {}
+            still_missing = []
+            if partial and previous is not None:
+                previous_missing = self.missing_sections(previous)
+                for section, ttl in self.section_ttls.items():
+                    previous_fetched_at = previous.fetched_at.get(section)
+                    if section in sections or previous_fetched_at is None or \
+                            now - previous_fetched_at > ttl + self.stale_while_revalidate:
+                        continue
+                    if section in previous.raw_data:
+                        raw_data[section] = previous.raw_data[section]
+                    fetched_at[section] = previous_fetched_at
+                    if section in previous_missing:
+                        still_missing.append(section)
+                if previous_missing and missing is None:
+                    missing = []
+            for section in sections:
+                ttl = self.section_ttls.get(section, 0)
+                if section in raw_data or (missing is not None and section not in missing):
+                    fetched_at[section] = now
+                elif previous is not None and section in previous.raw_data and \
+                        now - previous.fetched_at.get(section, 0) <= ttl + self.stale_while_revalidate:
+                    raw_data[section] = previous.raw_data[section]
+                    fetched_at[section] = previous.fetched_at[section]
+                else:
+                    # Uma secção que falhou nasce já vencida: é servida como está, mas a próxima leitura
+                    # dispara uma atualização em segundo plano em vez de esperar pelo TTL completo.
+                    fetched_at[section] = now - ttl
+                    still_missing.append(section)
+            fetched_at["initialData"] = now
+            if missing is not None:
+                raw_data[MISSING_SECTIONS] = still_missing
+                fetched_at[MISSING_SECTIONS] = now
+            entry = CachedDossie(company_id=company_id, raw_data=raw_data, fetched_at=fetched_at)
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute("BEGIN")
+                self._db.execute("DELETE FROM dossie_sections WHERE company_id = ?", (company_id,))
+                self._db.executemany(
+                    "INSERT INTO dossie_sections (company_id, section, body, fetched_at) VALUES (?, ?, ?, ?)",
+                    [(company_id, section, self._to_blob(entry.raw_data.get(section)), fetched_at)
+                     for section, fetched_at in entry.fetched_at.items()])
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO term_index (term, company_id) VALUES (?, ?)",
+                    [(key, company_id), (company_id, company_id)])
+                self._db.execute("COMMIT")
+        return entry
+
+    def record_refresh(self) -> None:
+        with self._lock:
+            self.stats["refreshes"] += 1
+
+    def render_metrics(self) -> List[str]:
+        """Os contadores da cache no formato de texto do Prometheus (ver `app.metrics.Registry`)."""
+        with self._lock:
+            stats = dict(self.stats)
+            entries = len(self._entries)
+        lines = ["# HELP exposeaqui_cache_events_total Eventos da cache de dossiês.",
+                 "# TYPE exposeaqui_cache_events_total counter"]
+        lines += [f'exposeaqui_cache_events_total{{event="{event}"}} {count}' for event, count in stats.items()]
+        lines += ["# HELP exposeaqui_cache_entries Empresas no nível de memória da cache.",
+                  "# TYPE exposeaqui_cache_entries gauge",
+                  f"exposeaqui_cache_entries {entries}"]
+        return lines
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # --- Internos (chamados com o lock adquirido) ---
+
+    def _section_ttls(self, sections: Optional[Iterable[str]]) -> Iterable[Tuple[str, float]]:
+        if sections is None:
+            return self.section_ttls.items()
+        wanted = {"initialData", *sections}
+        return [(section, ttl) for section, ttl in self.section_ttls.items() if section in wanted]
+
+    def _remember(self, key: str, entry: CachedDossie) -> None:
+        self._terms[key] = entry.company_id
+        self._terms[entry.company_id] = entry.company_id
+        self._terms.move_to_end(key)
+        self._entries[entry.company_id] = entry
+        self._entries.move_to_end(entry.company_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        # O índice de termos é barato, mas também não pode crescer sem limite.
+        while len(self._terms) > self.max_entries * 4:
+            self._terms.popitem(last=False)
+
+    @staticmethod
+    def _to_blob(value: Any) -> Optional[bytes]:
+        if isinstance(value, CompanyDTO):
+            return value.model_dump_json(by_alias=True).encode()
+        if isinstance(value, list):
+            return json.dumps(value).encode()
+        return value
+
+    def _load_from_disk(self, key: str, company_id: Optional[str]) -> Optional[CachedDossie]:
+        if self._db is None:
+            return None
+        if company_id is None:
+            row = self._db.execute("SELECT company_id FROM term_index WHERE term = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            company_id = row[0]
+        rows = self._db.execute(
+            "SELECT section, body, fetched_at FROM dossie_sections WHERE company_id = ?", (company_id,)).fetchall()
+        if not rows:
+            return None
+        entry = CachedDossie(company_id=company_id,
+                             raw_data={section: body for section, body, _ in rows if body is not None},
+                             fetched_at={section: fetched_at for section, _, fetched_at in rows})
+        if "initialData" not in entry.raw_data:
+            return None
+        # Promovemos a entrada para o nível de memória.
+        self._remember(key, entry)
+        return entry
@@ -0,0 +1,268 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Índice analítico, em processo, dos dossiês já produzidos pelo serviço.
+Cada empresa ocupa uma linha; para cada período de reputação (SIX_MONTHS, TWELVE_MONTHS, ...)
+há um array por métrica, com NaN onde a empresa não tem esse painel. Índices invertidos por
+segmento e por nome de problema dão as linhas relevantes de cada consulta, pelo que os rankings
+e agregados respondem em milissegundos e nunca chamam o ReclameAqui.
+"""
+
+from __future__ import annotations
+
+import heapq
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+from app.lazy_imports import LazyModule
+from app.dtos import DossieEmpresaDTO, ProblemInfoDTO
+from .normalization import normalize_term
+
+# Só importado quando o primeiro dossiê é indexado (ou no aquecimento do arranque).
+np = LazyModule("numpy")
+
+# Métricas de cada período: nome público (o alias do `ReputacaoPeriodoDTO`) -> atributo.
+METRICS: Dict[str, str] = {
+    "finalScore": "nota_final",
+    "solvedPercentual": "percentual_resolucao",
+    "dealAgainPercentual": "percentual_voltaria_fazer_negocio",
+    "totalComplains": "total_reclamacoes",
+}
+# Listas de problemas do dossiê indexadas: nome público -> atributo.
+PROBLEM_LISTS: Dict[str, str] = {
+    "6meses": "principais_problemas_6_meses",
+    "historico": "principais_problemas_historico",
+}
+# Secção do upstream de onde vem cada lista de problemas.
+PROBLEM_SECTIONS: Dict[str, str] = {
+    "6meses": "problems6Months",
+    "historico": "mainProblems",
+}
+
+
+def _as_float(value: Any) -> float:
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class _PeriodColumns:
+    """Os arrays das métricas de um período, com capacidade a crescer para o dobro quando enche."""
+
+    def __init__(self, capacity: int):
+        self.values: Dict[str, np.ndarray] = {metric: np.full(capacity, np.nan) for metric in METRICS}
+        self.statuses: List[Optional[str]] = [None] * capacity
+
+    def grow(self, capacity: int) -> None:
+        for metric, column in self.values.items():
+            grown = np.full(capacity, np.nan)
+            grown[:len(column)] = column
+            self.values[metric] = grown
+        self.statuses += [None] * (capacity - len(self.statuses))
+
+    def clear(self, row: int) -> None:
+        for column in self.values.values():
+            column[row] = np.nan
+        self.statuses[row] = None
+
+
+class DossieIndex:
+    """Índice thread-safe, só em memória; cada dossiê novo de uma empresa substitui o anterior."""
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._lock = threading.Lock()
+        self._capacity = initial_capacity
+        self._rows: Dict[str, int] = {}
+        self._company_ids: List[str] = []
+        self._names: List[str] = []
+        self._periods: Dict[str, _PeriodColumns] = {}
+        # Segmento normalizado -> (nome tal como veio do upstream, linhas); e os segmentos de cada linha.
+        self._segments: Dict[str, Tuple[str, Set[int]]] = {}
+        self._row_segments: Dict[int, List[str]] = {}
+        # Por lista de problemas: nome normalizado -> {linha: quantidade}, o total e o nome original.
+        self._problems: Dict[str, Dict[str, Dict[int, int]]] = {kind: {} for kind in PROBLEM_LISTS}
+        self._problem_totals: Dict[str, Dict[str, int]] = {kind: {} for kind in PROBLEM_LISTS}
+        self._problem_names: Dict[str, str] = {}
+        self._row_problems: Dict[str, Dict[int, List[Tuple[str, int]]]] = {kind: {} for kind in PROBLEM_LISTS}
+        # Linhas de cada segmento já em array (invalidado quando o segmento muda).
+        self._segment_rows_cache: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, dossie: DossieEmpresaDTO) -> None:
+        """
+        Indexa (ou reindexa) o dossiê de uma empresa. Os campos que dependem de secções em falta
+        (`secoesEmFalta`) mantêm o que já estava indexado: uma coleta degradada não tira a empresa
+        dos rankings do seu segmento nem apaga a sua reputação.
+        """
+        identificacao = dossie.identificacao
+        missing = set(dossie.secoes_em_falta)
+        # Sem o perfil, os segmentos ficam por saber e a reputação é, no máximo, a de recurso (indexEvolution).
+        keep_profile = "profile" in missing
+        keep_reputation = keep_profile or ("indexEvolution" in missing and not dossie.reputacao_por_periodo)
+        with self._lock:
+            row = self._row(identificacao.id_reclame_aqui)
+            self._names[row] = identificacao.nome_fantasia or identificacao.razao_social
+            if not keep_reputation:
+                for columns in self._periods.values():
+                    columns.clear(row)
+                for period, reputacao in (dossie.reputacao_por_periodo or {}).items():
+                    columns = self._periods.get(period)
+                    if columns is None:
+                        columns = self._periods[period] = _PeriodColumns(self._capacity)
+                    for metric, attribute in METRICS.items():
+                        columns.values[metric][row] = _as_float(getattr(reputacao, attribute))
+                    columns.statuses[row] = reputacao.reputacao
+            if not keep_profile:
+                operacional = dossie.operacional
+                segments = [operacional.segmento_principal, *operacional.segmentos_secundarios] if operacional else []
+                self._set_segments(row, [segment for segment in segments if segment])
+            for kind, attribute in PROBLEM_LISTS.items():
+                if PROBLEM_SECTIONS[kind] not in missing:
+                    self._set_problems(kind, row, getattr(dossie, attribute) or [])
+
+    def ranking(self, segment: str, period: str = "SIX_MONTHS", metric: str = "solvedPercentual",
+                ascending: bool = True, limit: int = 100) -> Tuple[Optional[str], int, List[Dict[str, Any]]]:
+        """
+        As `limit` empresas de um segmento ordenadas por uma métrica de um período (ascendente: as piores
+        primeiro, exceto em `totalComplains`). Devolve o nome do segmento, o número de empresas com essa
+        métrica e as linhas do ranking. As empresas sem a métrica ficam de fora.
+        """
+        with self._lock:
+            key = normalize_term(segment)
+            if key not in self._segments:
+                return None, 0, []
+            rows = self._segment_rows(key)
+            columns = self._periods.get(period)
+            if columns is None:
+                return self._segments[key][0], 0, []
+            values = columns.values[metric][rows]
+            present = ~np.isnan(values)
+            rows, values = rows[present], values[present]
+            # argpartition escolhe os `limit` primeiros sem ordenar o segmento todo; só esses são ordenados.
+            signed = values if ascending else -values
+            if limit < len(values):
+                top = np.argpartition(signed, limit)[:limit]
+                top = top[np.lexsort((rows[top], signed[top]))]
+            else:
+                top = np.lexsort((rows, signed))
+            result = []
+            for position, index in enumerate(top.tolist(), start=1):
+                row = int(rows[index])
+                # As chaves são os campos do `RankingEmpresaDTO`.
+                result.append({
+                    "posicao": position,
+                    "id_reclame_aqui": self._company_ids[row],
+                    "nome_fantasia": self._names[row],
+                    "valor": float(values[index]),
+                    "reputacao": columns.statuses[row],
+                    **{METRICS[name]: self._json_float(column[row]) for name, column in columns.values.items()},
+                })
+            return self._segments[key][0], int(len(values)), result
+
+    def top_problems(self, kind: str = "6meses", segment: Optional[str] = None,
+                     limit: int = 10) -> List[Tuple[str, int, int]]:
+        """Os problemas mais frequentes (`(nome, quantidade total, empresas)`), em todas as empresas ou num segmento."""
+        with self._lock:
+            problems = self._problems[kind]
+            if segment is None:
+                totals = self._problem_totals[kind]
+                top = heapq.nlargest(limit, totals.items(), key=lambda item: (item[1], item[0]))
+                return [(self._problem_names[name], total, len(problems[name])) for name, total in top]
+            key = normalize_term(segment)
+            if key not in self._segments:
+                return []
+            totals: Dict[str, int] = {}
+            companies: Dict[str, int] = {}
+            for row in self._segments[key][1]:
+                for name, count in self._row_problems[kind].get(row, ()):
+                    totals[name] = totals.get(name, 0) + count
+                    companies[name] = companies.get(name, 0) + 1
+            top = heapq.nlargest(limit, totals.items(), key=lambda item: (item[1], item[0]))
+            return [(self._problem_names[name], total, companies[name]) for name, total in top]
+
+    def segments(self) -> List[Tuple[str, int]]:
+        """Os segmentos conhecidos e o número de empresas em cada um."""
+        with self._lock:
+            return sorted(((name, len(rows)) for name, rows in self._segments.values()), key=lambda item: -item[1])
+
+    # --- Internos (chamados com o lock adquirido) ---
+
+    @staticmethod
+    def _json_float(value: float) -> Optional[float]:
+        return None if np.isnan(value) else float(value)
+
+    def _row(self, company_id: str) -> int:
+        row = self._rows.get(company_id)
+        if row is not None:
+            return row
+        row = self._rows[company_id] = len(self._company_ids)
+        self._company_ids.append(company_id)
+        self._names.append("")
+        if row >= self._capacity:
+            self._capacity *= 2
+            for columns in self._periods.values():
+                columns.grow(self._capacity)
+        return row
+
+    def _segment_rows(self, key: str) -> np.ndarray:
+        rows = self._segment_rows_cache.get(key)
+        if rows is None:
+            rows = self._segment_rows_cache[key] = np.fromiter(sorted(self._segments[key][1]), dtype=np.int64)
+        return rows
+
+    def _set_segments(self, row: int, segments: List[str]) -> None:
+        for key in self._row_segments.pop(row, ()):
+            name, rows = self._segments[key]
+            rows.discard(row)
+            self._segment_rows_cache.pop(key, None)
+            if not rows:
+                del self._segments[key]
+        keys = []
+        for segment in segments:
+            key = normalize_term(segment)
+            if key in keys:
+                continue
+            keys.append(key)
+            self._segments.setdefault(key, (segment, set()))[1].add(row)
+            self._segment_rows_cache.pop(key, None)
+        if keys:
+            self._row_segments[row] = keys
+
+    def _set_problems(self, kind: str, row: int, problems: List[ProblemInfoDTO]) -> None:
+        index, totals = self._problems[kind], self._problem_totals[kind]
+        for key, count in self._row_problems[kind].pop(row, ()):
+            del index[key][row]
+            totals[key] -= count
+            if not index[key]:
+                del index[key], totals[key]
+        merged: Dict[str, int] = {}
+        for problem in problems:
+            key = normalize_term(problem.nome)
+            self._problem_names.setdefault(key, problem.nome)
+            merged[key] = merged.get(key, 0) + problem.quantidade
+        for key, count in merged.items():
+            index.setdefault(key, {})[row] = count
+            totals[key] = totals.get(key, 0) + count
+        if merged:
+            self._row_problems[kind][row] = list(merged.items())
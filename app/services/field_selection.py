@@ -0,0 +1,101 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Seleção de campos do dossiê (`?fields=`).
+Cada campo do dossiê depende de um subconjunto das APIs de perfil; pedir só alguns campos
+permite ao Scraper saltar as restantes chamadas e ao Analisador saltar as secções
+correspondentes. A identificação vem sempre na resposta: sem o perfil, é montada a partir
+da busca inicial.
+"""
+
+from typing import AbstractSet, Any, Dict, FrozenSet, Iterable, List, Optional, Set
+from app.dtos import MISSING_SECTIONS, DossieEmpresaDTO
+
+# Secções do upstream necessárias para cada campo (pelo alias usado no JSON).
+FIELD_SECTIONS: Dict[str, FrozenSet[str]] = {
+    "identificacao": frozenset({"profile"}),
+    "operacional": frozenset({"profile"}),
+    "engajamentoPlataforma": frozenset({"profile"}),
+    "reputacaoPorPeriodo": frozenset({"profile"}),
+    "principaisProblemasHistorico": frozenset({"mainProblems"}),
+    "principaisProblemas6Meses": frozenset({"problems6Months"}),
+    "evolucaoMensalDetalhada": frozenset({"indexEvolution"}),
+}
+# Numa empresa sem perfil (não verificada), a reputação é calculada a partir do indexEvolution.
+FIELD_SECTIONS_WITHOUT_PROFILE: Dict[str, FrozenSet[str]] = {
+    "reputacaoPorPeriodo": frozenset({"indexEvolution"}),
+}
+# Campos que vêm sempre na resposta, pedidos ou não.
+ALWAYS_INCLUDED = ("identificacao", "secoesEmFalta", "secoesDesatualizadas")
+
+_FIELD_NAMES = {info.alias or name: name for name, info in DossieEmpresaDTO.model_fields.items()}
+
+
+class FieldSelection:
+    """Um subconjunto dos campos do dossiê e as secções do upstream de que eles precisam."""
+    __slots__ = ("fields", "sections", "sections_without_profile", "key", "include")
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields: FrozenSet[str] = frozenset(fields)
+        self.sections: FrozenSet[str] = frozenset().union(*(FIELD_SECTIONS[field] for field in self.fields))
+        self.sections_without_profile: FrozenSet[str] = frozenset().union(
+            *(FIELD_SECTIONS_WITHOUT_PROFILE.get(field, ()) for field in self.fields))
+        # Identifica a seleção (ex: na deduplicação de buscas simultâneas).
+        self.key = ",".join(sorted(self.fields))
+        # Nomes dos atributos do `DossieEmpresaDTO` a serializar.
+        self.include: Set[str] = {_FIELD_NAMES[field] for field in self.fields.union(ALWAYS_INCLUDED)}
+
+    @classmethod
+    def parse(cls, value: Optional[str]) -> Optional["FieldSelection"]:
+        """
+        Interpreta o parâmetro `fields` (nomes separados por vírgulas). Devolve None quando não há
+        seleção (parâmetro vazio ou com todos os campos). Lança `ValueError` com campos desconhecidos.
+        """
+        if not value or not value.strip():
+            return None
+        fields = {field.strip() for field in value.split(",") if field.strip()}
+        unknown = fields - FIELD_SECTIONS.keys()
+        if unknown:
+            raise ValueError(f"Campos desconhecidos: {', '.join(sorted(unknown))}. "
+                             f"Campos válidos: {', '.join(FIELD_SECTIONS)}.")
+        if fields >= FIELD_SECTIONS.keys():
+            return None
+        return cls(fields)
+
+    def wants(self, field: str) -> bool:
+        return field in self.fields or field in ALWAYS_INCLUDED
+
+    def required_sections(self, has_profile: bool) -> FrozenSet[str]:
+        """As secções necessárias, sabendo se a empresa tem perfil."""
+        return self.sections if has_profile else self.sections | self.sections_without_profile
+
+    def attempted_sections(self, raw_data: Dict[str, Any]) -> FrozenSet[str]:
+        """As secções que o Scraper tentou obter numa coleta com esta seleção (ver `ReclameAquiEndpoints`)."""
+        missing = raw_data.get(MISSING_SECTIONS) or ()
+        if "profile" in self.sections and "profile" not in raw_data and "profile" not in missing:
+            return self.sections | self.sections_without_profile
+        return self.sections
+
+    def relevant(self, sections: Iterable[str], has_profile: bool) -> List[str]:
+        """Filtra uma lista de secções (em falta, desatualizadas) pelas que esta seleção usa."""
+        required: AbstractSet[str] = self.required_sections(has_profile)
+        return [section for section in sections if section in required]
@@ -0,0 +1,47 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Normalização dos termos de busca.
+Dois termos que o ReclameAqui resolve para a mesma empresa (ex: um CNPJ com e sem
+pontuação, ou um nome em maiúsculas e minúsculas) devem dar origem à mesma chave
+de cache e de deduplicação.
+"""
+
+import re
+import unicodedata
+
+_DOCUMENT_PUNCTUATION = re.compile(r"[\s./-]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_term(term: str) -> str:
+    """
+    Devolve a forma canónica de um termo de busca:
+    - CNPJ/CPF (com ou sem pontuação) ficam apenas com os dígitos;
+    - nomes ficam em minúsculas, sem acentos e com os espaços colapsados.
+    """
+    stripped = term.strip()
+    digits = _DOCUMENT_PUNCTUATION.sub("", stripped)
+    if digits.isdigit():
+        return digits
+    without_accents = unicodedata.normalize("NFKD", stripped).encode("ascii", "ignore").decode("ascii")
+    return _WHITESPACE.sub(" ", without_accents).lower()
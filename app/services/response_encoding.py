@@ -0,0 +1,135 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Representação HTTP do JSON de um dossiê: uma ETag calculada a partir do conteúdo, a resposta
+aos pedidos condicionais (`If-None-Match`) e o corpo comprimido na codificação pedida pelo
+`Accept-Encoding`. O gzip vem da biblioteca padrão; o brotli e o zstd só são oferecidos se os
+pacotes `brotli` e `zstandard` estiverem instalados.
+"""
+
+import gzip
+import hashlib
+from typing import Callable, Dict, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Abaixo disto, a compressão poupa menos do que custa.
+MIN_COMPRESS_SIZE = 1024
+
+
+def _compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    # Por ordem de preferência, quando o cliente aceita várias com o mesmo peso. Os níveis ficam abaixo
+    # dos máximos: a compressão corre no event loop, uma vez por dossiê e por codificação.
+    compressors: Dict[str, Callable[[bytes], bytes]] = {}
+    if brotli is not None:
+        compressors["br"] = lambda body: brotli.compress(body, quality=5)
+    if zstandard is not None:
+        compressors["zstd"] = lambda body: zstandard.ZstdCompressor(level=10).compress(body)
+    compressors["gzip"] = lambda body: gzip.compress(body, compresslevel=9, mtime=0)
+    return compressors
+
+
+COMPRESSORS = _compressors()
+
+
+def content_etag(body: bytes) -> str:
+    """
+    ETag fraca a partir do hash do JSON: o mesmo conteúdo tem sempre a mesma ETag, seja qual for
+    a coleta que o produziu, e as várias codificações do mesmo JSON partilham-na.
+    """
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara o `If-None-Match` do pedido com a ETag atual (comparação fraca, como manda o RFC 9110)."""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Escolhe, pelo `Accept-Encoding`, a codificação com o maior peso `q` entre as disponíveis
+    (com empate, a da ordem de `COMPRESSORS`). Devolve None para enviar o JSON sem compressão.
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in COMPRESSORS:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class DossieRepresentation:
+    """
+    O JSON final de um dossiê, com a sua ETag e as versões comprimidas já calculadas.
+    Para um dossiê completo em cache, `encoded` é o dicionário memorizado na própria entrada:
+    cada codificação é comprimida uma única vez e servida aos pedidos seguintes tal como está.
+    """
+    __slots__ = ("json", "etag", "encoded")
+
+    def __init__(self, json: bytes, etag: Optional[str] = None, encoded: Optional[Dict[str, bytes]] = None):
+        self.json = json
+        self.etag = etag or content_etag(json)
+        self.encoded = encoded if encoded is not None else {}
+
+    def body(self, encoding: Optional[str]) -> bytes:
+        """Os bytes a enviar na codificação escolhida (None: o JSON tal como está)."""
+        if encoding is None:
+            return self.json
+        body = self.encoded.get(encoding)
+        if body is None:
+            body = self.encoded[encoding] = COMPRESSORS[encoding](self.json)
+        return body
+
+    def encoding_for(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """A codificação a usar para este pedido; os JSON pequenos seguem sem compressão."""
+        if len(self.json) < MIN_COMPRESS_SIZE:
+            return None
+        return negotiate_encoding(accept_encoding)
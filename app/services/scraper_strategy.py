@@ -24,95 +24,620 @@ Esta é a camada responsável por toda a comunicação de rede e pela imitação
 de um navegador para contornar proteções como o Cloudflare.
 """
 
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any
-from curl_cffi import requests
-from app.dtos import CompanyDTO
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Any, List, Optional, Tuple
+from app.lazy_imports import LazyModule
+from app.dtos import MISSING_SECTIONS, CompanyDTO
+from app.metrics import SEARCHES_IN_FLIGHT, UPSTREAM_FAILURES, UpstreamCall
+from .session_pool import AsyncSessionPool, PooledSession, SessionPool
+from .company_index import CompanyIndex
+from .upstream_scheduler import Permit, UpstreamScheduler
+from .circuit_breaker import CircuitBreaker, CircuitBreakers
+from .field_selection import FieldSelection
+
+requests = LazyModule("curl_cffi.requests")
 
 
 class ScraperStrategy(ABC):
     """Interface que define o contrato para qualquer coletor de dados."""
 
     @abstractmethod
-    def scrape_company_data(self, term: str) -> Dict[str, Any]:
+    def scrape_company_data(self, term: str, fields: Optional[FieldSelection] = None,
+                            deadline_at: Optional[float] = None) -> Dict[str, Any]:
+        pass
+
+    def close(self) -> None:
+        """Liberta os recursos (sessões, threads) do coletor. Por omissão não faz nada."""
+        pass
+
+
+class AsyncScraperStrategy(ABC):
+    """Variante asyncio do `ScraperStrategy`, para coletores que não bloqueiam o event loop."""
+
+    @abstractmethod
+    async def scrape_company_data(self, term: str, fields: Optional[FieldSelection] = None,
+                                  deadline_at: Optional[float] = None) -> Dict[str, Any]:
+        pass
+
+    async def warm_up(self) -> None:
+        """Prepara o coletor para a primeira busca (ex: aquece uma sessão). Por omissão não faz nada."""
+        pass
+
+    async def close(self) -> None:
+        """Liberta os recursos (sessões) do coletor. Por omissão não faz nada."""
         pass
 
 
-class ReclameAquiScraper(ScraperStrategy):
+class ReclameAquiEndpoints:
     """
-    Implementação da estratégia de scraping para o site ExposeAqui Aqui.
-    Utiliza um cliente HTTP com capacidade de imitar um navegador (curl_cffi)
-    para fazer as chamadas de API diretamente, sem a necessidade de um navegador.
+    Conhecimento partilhado pelos coletores síncrono e assíncrono: os URLs das APIs,
+    os cabeçalhos que imitam o navegador e a interpretação da resposta da busca.
     """
     BASE_URL = "https://www.reclameaqui.com.br"
     API_SEARCH_URL = "https://iosearch.reclameaqui.com.br/raichu-io-site-search-v1"
     API_SITE_URL = "https://iosite.reclameaqui.com.br/raichu-io-site-v1"
+    HEADERS = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36",
+        "Accept": "application/json, text/plain, */*",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Origin": "https://www.reclameaqui.com.br",
+        "Referer": "https://www.reclameaqui.com.br/",
+    }
+
+    company_index: Optional[CompanyIndex] = None
+    # Quantas vezes uma chamada recusada com 429 é repetida dentro do prazo.
+    THROTTLE_RETRIES = 2
+
+    circuit_breakers: CircuitBreakers
+    section_timeout: Optional[float] = None
+    deadline: float = 30.0
+
+    def _configure_endpoints(self, base_url: Optional[str] = None, api_search_url: Optional[str] = None,
+                             api_site_url: Optional[str] = None) -> None:
+        """
+        Define os URLs usados por esta instância. Por ordem de prioridade: os argumentos, as variáveis
+        de ambiente `EXPOSEAQUI_BASE_URL`, `EXPOSEAQUI_API_SEARCH_URL` e `EXPOSEAQUI_API_SITE_URL`
+        e, por fim, os URLs reais do ReclameAqui. Permite apontar o coletor para um servidor local
+        (ex: o dos benchmarks).
+        """
+        self.BASE_URL = base_url or os.environ.get("EXPOSEAQUI_BASE_URL") or type(self).BASE_URL
+        self.API_SEARCH_URL = api_search_url or os.environ.get("EXPOSEAQUI_API_SEARCH_URL") or type(self).API_SEARCH_URL
+        self.API_SITE_URL = api_site_url or os.environ.get("EXPOSEAQUI_API_SITE_URL") or type(self).API_SITE_URL
+
+    def _search_url(self, term: str) -> str:
+        return f"{self.API_SEARCH_URL}/companies/modern-search/{term}"
+
+    def _resolve_from_index(self, term: str) -> Optional[CompanyDTO]:
+        """Resolve o termo no índice local, se existir, evitando a chamada a `modern-search`."""
+        if self.company_index is None:
+            return None
+        company = self.company_index.lookup(term)
+        if company is not None:
+            print(f"INFO:     Empresa resolvida localmente: {company.fantasy_name} (ID: {company.id})")
+        return company
+
+    def _parse_search_response(self, search_data: Dict[str, Any], term: str) -> CompanyDTO:
+        """Valida a resposta da busca, alimenta o índice local e devolve a primeira empresa encontrada."""
+        if not search_data.get("companies"):
+            raise ValueError(f"WARN:     Nenhuma empresa encontrada para o termo: {term}")
+
+        if self.company_index is not None:
+            companies = [CompanyDTO.model_validate(company) for company in search_data["companies"]]
+            self.company_index.add_many(companies, term)
+            first_company = companies[0]
+        else:
+            first_company = CompanyDTO.model_validate(search_data["companies"][0])
+        print(f"INFO:     Empresa encontrada: {first_company.fantasy_name} (ID: {first_company.id})")
+        return first_company
+
+    def _deadline_at(self, deadline_at: Optional[float]) -> float:
+        """O prazo de uma coleta: o do pedido (em `time.monotonic()`), se existir, mas nunca além de `deadline`."""
+        own = time.monotonic() + self.deadline
+        return own if deadline_at is None else min(own, deadline_at)
+
+    def _should_retry(self, permit: Permit, attempt: int, deadline_at: float) -> bool:
+        """
+        Uma chamada recusada por excesso de pedidos (429) volta à fila do escalonador, que entretanto
+        pausou o host, desde que a pausa pedida pelo upstream ainda caiba no prazo da busca.
+        """
+        if not permit.throttled or attempt >= self.THROTTLE_RETRIES:
+            return False
+        return time.monotonic() + (permit.retry_after or 0.0) < deadline_at
+
+    @staticmethod
+    def _call_timeout(deadline_at: float, limit: Optional[float] = None) -> float:
+        # O curl interpreta 0 como "sem timeout"; uma chamada que recebe a vez no limite do prazo
+        # fica com um timeout mínimo em vez disso.
+        remaining = deadline_at - time.monotonic()
+        return max(min(remaining, limit) if limit else remaining, 0.01)
+
+    @staticmethod
+    def _section_result(key: str, breaker: CircuitBreaker, resp: requests.Response) -> Tuple[Optional[bytes], bool]:
+        """
+        Regista a resposta de uma API de perfil no seu disjuntor e devolve `(bytes, falhou)`.
+        Só 429 e 5xx contam como falha; um 404 é uma resposta normal do upstream.
+        """
+        if resp.ok:
+            # print(f"--- Sucesso ao obter dados de {key}")
+            breaker.record_success(resp.elapsed.total_seconds())
+            return resp.content, False
+        print(f"WARN:     Falha ao obter dados de {key}. Status: {resp.status_code}")
+        if resp.status_code == 429 or resp.status_code >= 500:
+            breaker.record_failure()
+            return None, True
+        breaker.record_success(resp.elapsed.total_seconds())
+        return None, False
+
+    @staticmethod
+    def _record_interrupted(breaker: CircuitBreaker, deadline_at: float) -> None:
+        """
+        Regista no disjuntor uma chamada que não terminou. Se o prazo da busca (que pode vir do cliente)
+        já passou, foi ele que a interrompeu, e a falha não é atribuída à API.
+        """
+        if time.monotonic() >= deadline_at:
+            breaker.record_abandoned()
+        else:
+            breaker.record_failure()
+
+    @staticmethod
+    def _skipped(key: str) -> Tuple[None, bool]:
+        UPSTREAM_FAILURES.inc(key, "circuit_open")
+        return None, True
 
-    def __init__(self):
-        """Inicializa a sessão de requisições, configurando-a para imitar um navegador."""
-        self.session = requests.Session(impersonate="chrome110", timeout=30)
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36",
-            "Accept": "application/json, text/plain, */*",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Origin": "https://www.reclameaqui.com.br",
-            "Referer": "https://www.reclameaqui.com.br/",
+    def _build_api_calls(self, company: CompanyDTO, fields: Optional[FieldSelection] = None) -> Dict[str, str]:
+        """Monta o mapa `chave -> URL` das APIs de perfil de uma empresa (só as que `fields` precisa)."""
+        company_id = company.id
+        shortname = company.shortname
+        api_calls = {
+            "profile": f"{self.API_SITE_URL}/company/shortname/{shortname}",
+            "mainProblems": f"{self.API_SEARCH_URL}/query/companyMainProblems/{company_id}",
+            "problems6Months": f"{self.API_SEARCH_URL}/query/companyPerformanceProblems6Months/{company_id}",
+            "indexEvolution": f"{self.API_SITE_URL}/company/indexevolution/{company_id}"
         }
+        if fields is None:
+            return api_calls
+        return {key: url for key, url in api_calls.items() if key in fields.sections}
+
+    def _stale_in_index(self, company: CompanyDTO, api_calls: Dict[str, str], sections: Dict[str, bytes],
+                        missing: List[str]) -> bool:
+        """
+        Numa empresa resolvida pelo índice local, um perfil 404 pode querer dizer que o shortname guardado
+        (que vai no URL do perfil) mudou, a menos que uma busca já tenha mostrado que ela não tem perfil.
+        """
+        return "profile" in api_calls and "profile" not in sections and "profile" not in missing and \
+            not self.company_index.known_without_profile(company.id)
+
+    def _record_profile(self, company: CompanyDTO, api_calls: Dict[str, str], sections: Dict[str, bytes],
+                        missing: List[str]) -> None:
+        if self.company_index is not None and "profile" in api_calls and "profile" not in missing:
+            self.company_index.record_profile(company.id, "profile" in sections)
+
+    def _fallback_calls(self, company: CompanyDTO, fields: Optional[FieldSelection], api_calls: Dict[str, str],
+                        sections: Dict[str, bytes], missing: List[str]) -> Dict[str, str]:
+        """
+        Com uma seleção de campos, as APIs que só são precisas quando a empresa não tem perfil
+        (não verificada), e que por isso só são chamadas depois de o perfil responder 404.
+        """
+        if fields is None or "profile" not in api_calls or "profile" in sections or "profile" in missing:
+            return {}
+        all_calls = self._build_api_calls(company)
+        return {key: all_calls[key] for key in fields.sections_without_profile if key not in api_calls}
+
+
+class ReclameAquiScraper(ReclameAquiEndpoints, ScraperStrategy):
+    """
+    Implementação da estratégia de scraping para o site ExposeAqui Aqui.
+    Utiliza um cliente HTTP com capacidade de imitar um navegador (curl_cffi)
+    para fazer as chamadas de API diretamente, sem a necessidade de um navegador.
+    """
+    FANOUT_WORKERS_PER_SESSION = 4
+
+    def __init__(self, concurrent_fanout: bool = True, deadline: float = 30.0,
+                 session_pool: Optional[SessionPool] = None, company_index: Optional[CompanyIndex] = None,
+                 base_url: Optional[str] = None, api_search_url: Optional[str] = None,
+                 api_site_url: Optional[str] = None, scheduler: Optional[UpstreamScheduler] = None,
+                 circuit_breakers: Optional[CircuitBreakers] = None, section_timeout: Optional[float] = 5.0):
+        """
+        Inicializa o coletor, configurando as sessões para imitar um navegador.
+
+        :param concurrent_fanout: se verdadeiro, as APIs de perfil são chamadas em paralelo.
+        :param deadline: prazo total (em segundos) de uma chamada a `scrape_company_data`.
+            No modo paralelo, as APIs que não terminarem dentro do prazo são descartadas.
+        :param session_pool: pool de sessões partilhado pelo processo. Se omitido, o coletor
+            cria um pool privado com uma única sessão (útil em scripts).
+        :param company_index: índice local de empresas já vistas; um termo conhecido salta a busca inicial.
+        :param base_url, api_search_url, api_site_url: substituem os URLs do ReclameAqui (ver `_configure_endpoints`).
+        :param scheduler: escalonador das chamadas ao upstream, partilhado pelo processo. Se omitido,
+            o coletor usa um escalonador privado.
+        :param circuit_breakers: disjuntores das APIs de perfil, partilhados pelo processo. Se omitidos,
+            o coletor usa disjuntores privados.
+        :param section_timeout: prazo de cada API de perfil, para que uma API pendurada não prenda a
+            busca até ao prazo total.
+        """
+        self._configure_endpoints(base_url, api_search_url, api_site_url)
+        self.scheduler = scheduler or UpstreamScheduler()
+        self.circuit_breakers = circuit_breakers or CircuitBreakers()
+        self.section_timeout = section_timeout
+        self.concurrent_fanout = concurrent_fanout
+        self.company_index = company_index
+        self.deadline = deadline
+        self._owns_pool = session_pool is None
+        self.session_pool = session_pool or SessionPool(max_size=1)
+        # Threads persistentes: cada uma mantém o seu handle curl (e as conexões abertas) entre buscas.
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.session_pool.max_size * self.FANOUT_WORKERS_PER_SESSION,
+            thread_name_prefix="scraper-fanout") if concurrent_fanout else None
+        self.headers = dict(self.HEADERS)
         print("INFO:     ExposedAqui iniciado.")
 
-    def scrape_company_data(self, term: str) -> Dict[str, Any]:
+    def scrape_company_data(self, term: str, fields: Optional[FieldSelection] = None,
+                            deadline_at: Optional[float] = None) -> Dict[str, Any]:
         """
         Executa o fluxo completo de scraping:
-        1. Estabelece uma sessão válida para passar pelo Cloudflare.
+        1. Obtém uma sessão do pool e aquece-a, se os cookies de desafio não estiverem frescos.
         2. Realiza a busca inicial para encontrar a empresa.
-        3. Chama as APIs de perfil para coletar os dados detalhados.
+        3. Chama as APIs de perfil para coletar os dados detalhados (só as que `fields` precisa).
         Retorna um dicionário com os dados brutos de cada API capturada.
+        Com `deadline_at` (o prazo do pedido, em `time.monotonic()`), a coleta termina no mais curto
+        dos dois prazos: as APIs que já não caibam nele não são chamadas e ficam em falta.
         """
+        deadline_at = self._deadline_at(deadline_at)
+        with SEARCHES_IN_FLIGHT.track(), self.session_pool.session() as pooled:
+            try:
+                raw_data_responses = self._scrape_with_session(pooled, term, fields, self.scheduler.new_flow(),
+                                                               deadline_at)
+                pooled.record_success()
+                return raw_data_responses
+            except requests.exceptions.RequestException:
+                # Falhas de rede ou HTTP na busca indicam uma sessão possivelmente "queimada".
+                pooled.record_error()
+                raise
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._owns_pool:
+            self.session_pool.close()
+
+    def _scrape_with_session(self, pooled: PooledSession, term: str, fields: Optional[FieldSelection], flow: int,
+                             deadline_at: float, company: Optional[CompanyDTO] = None) -> Dict[str, Any]:
+        """Com `company`, a empresa já vem da busca inicial, e o índice local não é consultado."""
+        session = pooled.session
         try:
             # Etapa 1: Estabelecer sessão e obter cookies de desafio, se necessário
-            # print(f">>> A estabelecer sessão com {self.BASE_URL}...")
-            self.session.get(self.BASE_URL, headers=self.headers)
-            # print(">>> Sessão estabelecida com sucesso.")
+            if pooled.needs_warmup(self.session_pool.warmup_ttl):
+                # print(f">>> A estabelecer sessão com {self.BASE_URL}...")
+                self._get(session, "warmup", self.BASE_URL, flow, deadline_at)
+                pooled.mark_warmed()
+                # print(">>> Sessão estabelecida com sucesso.")
 
-            # Etapa 2: Fazer a busca inicial pela API
-            # print(f">>> A procurar pelo termo: {term}")
-            search_url = f"{self.API_SEARCH_URL}/companies/modern-search/{term}"
-            response = self.session.get(search_url, headers=self.headers)
-            response.raise_for_status()
+            # Etapa 2: Fazer a busca inicial pela API (se o termo não estiver no índice local)
+            first_company = company or self._resolve_from_index(term)
+            resolved_locally = company is None and first_company is not None
+            if first_company is None:
+                # print(f">>> A procurar pelo termo: {term}")
+                first_company = self._search(session, term, flow, deadline_at)
 
-            search_data = response.json()
-            if not search_data.get("companies"):
-                raise ValueError(f"WARN:     Nenhuma empresa encontrada para o termo: {term}")
+            # Etapa 3: Chamar as APIs de perfil diretamente
+            # A empresa segue já validada; as secções seguem como os bytes das respostas, sem decodificação.
+            raw_data_responses = {"initialData": first_company}
+            api_calls = self._build_api_calls(first_company, fields)
+            sections, missing = self._fetch_sections(session, api_calls, flow, deadline_at)
+            fallback_calls = self._fallback_calls(first_company, fields, api_calls, sections, missing)
+            if fallback_calls:
+                fallback_sections, fallback_missing = self._fetch_sections(session, fallback_calls, flow, deadline_at)
+                sections.update(fallback_sections)
+                missing += fallback_missing
+            if resolved_locally and self._stale_in_index(first_company, api_calls, sections, missing):
+                print(f"WARN:     Perfil de {first_company.shortname} não encontrado: entrada do índice local descartada.")
+                self.company_index.forget(first_company.id)
+                found = self._search(session, term, flow, deadline_at)
+                if (found.id, found.shortname) != (first_company.id, first_company.shortname):
+                    return self._scrape_with_session(pooled, term, fields, flow, deadline_at, company=found)
+            self._record_profile(first_company, api_calls, sections, missing)
+            raw_data_responses.update(sections)
+            raw_data_responses[MISSING_SECTIONS] = missing
+            return raw_data_responses
 
-            first_company = CompanyDTO.model_validate(search_data["companies"][0])
-            company_id = first_company.id
-            shortname = first_company.shortname
-            print(f"INFO:     Empresa encontrada: {first_company.fantasy_name} (ID: {company_id})")
+        except Exception as e:
+            print(f"ERROR:     Erro fatal durante o scraping: {e}")
+            raise e
 
-            # Etapa 3: Chamar as APIs de perfil diretamente
-            raw_data_responses = {"initialData": first_company.model_dump_json(by_alias=True)}
+    def _search(self, session: requests.Session, term: str, flow: int, deadline_at: float) -> CompanyDTO:
+        """A busca inicial (`modern-search`), que também alimenta o índice local."""
+        response = self._get(session, "search", self._search_url(term), flow, deadline_at)
+        response.raise_for_status()
+        return self._parse_search_response(response.json(), term)
+
+    def _get(self, session: requests.Session, endpoint: str, url: str, flow: int, deadline_at: float,
+             timeout: Optional[float] = None, breaker: Optional[CircuitBreaker] = None) -> Optional[requests.Response]:
+        """
+        Faz um GET ao upstream quando o escalonador der a vez, com o tempo que ainda resta do prazo
+        (ou `timeout`, se for menor). Devolve None, sem chamar o upstream, se o disjuntor `breaker`
+        tiver aberto enquanto a chamada esperava pela vez.
+        """
+        for attempt in range(self.THROTTLE_RETRIES + 1):
+            with self.scheduler.slot(url, flow, deadline_at) as permit:
+                if breaker is not None and breaker.is_open():
+                    return None
+                with UpstreamCall(endpoint) as call:
+                    resp = session.get(url, headers=self.headers, timeout=self._call_timeout(deadline_at, timeout))
+                    call.status(resp.status_code)
+                    permit.observe(resp)
+            if not self._should_retry(permit, attempt, deadline_at):
+                break
+        return resp
+
+    def _fetch_sections(self, session: requests.Session, api_calls: Dict[str, str], flow: int,
+                        deadline_at: float) -> Tuple[Dict[str, bytes], List[str]]:
+        """Chama as APIs de `api_calls`, em paralelo ou uma a uma. Devolve as respostas e as secções em falta."""
+        if self.concurrent_fanout:
+            return self._fetch_apis_concurrently(session, api_calls, flow, deadline_at)
+        sections, missing = {}, []
+        for key, url in api_calls.items():
+            if time.monotonic() >= deadline_at:
+                # O pedido já desistiu: as APIs que faltam não são chamadas.
+                print(f"WARN:     Prazo esgotado antes de chamar a API {key}.")
+                missing.append(key)
+                continue
+            body, failed = self._fetch_api(session, key, url, flow, deadline_at)
+            if body is not None:
+                sections[key] = body
+            elif failed:
+                missing.append(key)
+        return sections, missing
+
+    def _fetch_api(self, session: requests.Session, key: str, url: str, flow: int,
+                   deadline_at: float) -> Tuple[Optional[bytes], bool]:
+        """
+        Chama uma API de perfil, se o seu disjuntor o permitir. Retorna `(bytes, falhou)`: os bytes
+        são None se a API não respondeu com sucesso, e `falhou` distingue uma falha (erro, timeout,
+        429/5xx ou disjuntor aberto) de uma ausência normal (ex: 404).
+        """
+        breaker = self.circuit_breakers.get(key)
+        if not breaker.allow():
+            return self._skipped(key)
+        try:
+            # print(f">>> A chamar API: {key}")
+            resp = self._get(session, key, url, flow, deadline_at, breaker.call_timeout(self.section_timeout), breaker)
+        except Exception as e:
+            self._record_interrupted(breaker, deadline_at)
+            print(f"WARN:     Erro ao chamar a API {key}: {e}")
+            return None, True
+        if resp is None:
+            return self._skipped(key)
+        return self._section_result(key, breaker, resp)
+
+    def _fetch_apis_concurrently(self, session: requests.Session, api_calls: Dict[str, str], flow: int,
+                                 deadline_at: float) -> Tuple[Dict[str, bytes], List[str]]:
+        """
+        Dispara todas as APIs de perfil em paralelo e espera, no máximo, até ao prazo.
+        Devolve as respostas bem-sucedidas que chegaram a tempo, na ordem de `api_calls`, e a lista
+        das chamadas que falharam ou que não terminaram.
+        """
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            print("WARN:     Prazo esgotado antes de chamar as APIs de perfil.")
+            return {}, list(api_calls)
+
+        # A sessão do curl_cffi usa um handle por thread, pelo que pode ser partilhada aqui.
+        # Não esperamos pelas chamadas atrasadas: o timeout passado ao curl termina-as no prazo.
+        # Cada thread corre numa cópia do contexto atual, para as medições chegarem ao Server-Timing.
+        futures = {key: self._executor.submit(contextvars.copy_context().run,
+                                              self._fetch_api, session, key, url, flow, deadline_at)
+                   for key, url in api_calls.items()}
+        wait(futures.values(), timeout=remaining)
 
-            api_calls = {
-                "profile": f"{self.API_SITE_URL}/company/shortname/{shortname}",
-                "mainProblems": f"{self.API_SEARCH_URL}/query/companyMainProblems/{company_id}",
-                "problems6Months": f"{self.API_SEARCH_URL}/query/companyPerformanceProblems6Months/{company_id}",
-                "indexEvolution": f"{self.API_SITE_URL}/company/indexevolution/{company_id}"
-            }
+        results, missing = {}, []
+        for key, future in futures.items():
+            if not future.done():
+                # A thread termina com o timeout do curl, já depois do prazo (ver `_record_interrupted`).
+                print(f"WARN:     Prazo esgotado ao chamar a API {key}.")
+                missing.append(key)
+                continue
+            body, failed = future.result()
+            if body is not None:
+                results[key] = body
+            elif failed:
+                missing.append(key)
+        return results, missing
 
-            for key, url in api_calls.items():
+
+class AsyncReclameAquiScraper(ReclameAquiEndpoints, AsyncScraperStrategy):
+    """
+    Versão asyncio do `ReclameAquiScraper`, baseada na `AsyncSession` do curl_cffi.
+    Enquanto espera pelo upstream, uma busca não ocupa nenhuma thread, pelo que um único
+    worker consegue manter centenas de buscas em curso.
+    """
+
+    def __init__(self, deadline: float = 30.0, session_pool: Optional[AsyncSessionPool] = None,
+                 company_index: Optional[CompanyIndex] = None, base_url: Optional[str] = None,
+                 api_search_url: Optional[str] = None, api_site_url: Optional[str] = None,
+                 scheduler: Optional[UpstreamScheduler] = None, circuit_breakers: Optional[CircuitBreakers] = None,
+                 section_timeout: Optional[float] = 5.0):
+        """
+        :param deadline: prazo total (em segundos) de uma chamada a `scrape_company_data`.
+            As APIs de perfil que não terminarem dentro do prazo são descartadas.
+        :param session_pool: pool de sessões assíncronas partilhado pelo processo.
+        :param company_index: índice local de empresas já vistas; um termo conhecido salta a busca inicial.
+        :param base_url, api_search_url, api_site_url: substituem os URLs do ReclameAqui (ver `_configure_endpoints`).
+        :param scheduler: escalonador das chamadas ao upstream, partilhado pelo processo.
+        :param circuit_breakers: disjuntores das APIs de perfil, partilhados pelo processo.
+        :param section_timeout: prazo de cada API de perfil (ver `ReclameAquiScraper`).
+        """
+        self._configure_endpoints(base_url, api_search_url, api_site_url)
+        self.scheduler = scheduler or UpstreamScheduler()
+        self.circuit_breakers = circuit_breakers or CircuitBreakers()
+        self.section_timeout = section_timeout
+        self.deadline = deadline
+        self.company_index = company_index
+        self._owns_pool = session_pool is None
+        self.session_pool = session_pool or AsyncSessionPool(max_size=1)
+        self.headers = dict(self.HEADERS)
+        print("INFO:     ExposedAqui (async) iniciado.")
+
+    async def scrape_company_data(self, term: str, fields: Optional[FieldSelection] = None,
+                                  deadline_at: Optional[float] = None) -> Dict[str, Any]:
+        """Mesmo fluxo do `ReclameAquiScraper.scrape_company_data`, sem bloquear o event loop."""
+        deadline_at = self._deadline_at(deadline_at)
+        with SEARCHES_IN_FLIGHT.track():
+            async with self.session_pool.session() as pooled:
                 try:
-                    # print(f">>> A chamar API: {key}")
-                    resp = self.session.get(url, headers=self.headers)
-                    if resp.ok:
-                        raw_data_responses[key] = resp.text
-                        # print(f"--- Sucesso ao obter dados de {key}")
-                    else:
-                        print(f"WARN:     Falha ao obter dados de {key}. Status: {resp.status_code}")
-                except Exception as e:
-                    print(f"WARN:     Erro ao chamar a API {key}: {e}")
+                    raw_data_responses = await self._scrape_with_session(pooled, term, fields,
+                                                                         self.scheduler.new_flow(), deadline_at)
+                    pooled.record_success()
+                    return raw_data_responses
+                except requests.exceptions.RequestException:
+                    pooled.record_error()
+                    raise
+
+    async def warm_up(self) -> None:
+        """Visita a página inicial com uma sessão nova do pool, para que a primeira busca já a encontre aquecida."""
+        async def warm(pooled: PooledSession) -> None:
+            try:
+                await self._get(pooled.session, "warmup", self.BASE_URL, self.scheduler.new_flow(),
+                                self._deadline_at(None))
+                pooled.mark_warmed()
+            except requests.exceptions.RequestException as e:
+                pooled.record_error()
+                print(f"WARN:     Falha ao aquecer a sessão no arranque: {e}")
 
+        # O curl_cffi é importado numa thread, para não bloquear o event loop que já serve pedidos.
+        await asyncio.to_thread(requests.load)
+        await self.session_pool.prewarm(warm)
+        if self.company_index is not None:
+            # O índice local também é lido e validado numa thread, depois de a sessão estar pronta.
+            await asyncio.to_thread(self.company_index.load)
+
+    async def close(self) -> None:
+        if self._owns_pool:
+            await self.session_pool.close()
+
+    async def _scrape_with_session(self, pooled: PooledSession, term: str, fields: Optional[FieldSelection],
+                                   flow: int, deadline_at: float, company: Optional[CompanyDTO] = None
+                                   ) -> Dict[str, Any]:
+        """Com `company`, a empresa já vem da busca inicial, e o índice local não é consultado."""
+        session = pooled.session
+        try:
+            # Etapa 1: Estabelecer sessão e obter cookies de desafio, se necessário
+            if pooled.needs_warmup(self.session_pool.warmup_ttl):
+                await self._get(session, "warmup", self.BASE_URL, flow, deadline_at)
+                pooled.mark_warmed()
+
+            # Etapa 2: Fazer a busca inicial pela API (se o termo não estiver no índice local)
+            # O índice pode ainda estar a ser lido do disco, ou a gravar um lote: numa thread, fora do event loop.
+            first_company = company or await asyncio.to_thread(self._resolve_from_index, term)
+            resolved_locally = company is None and first_company is not None
+            if first_company is None:
+                first_company = await self._search(session, term, flow, deadline_at)
+
+            # Etapa 3: Chamar as APIs de perfil em paralelo, dentro do prazo
+            # A empresa segue já validada; as secções seguem como os bytes das respostas, sem decodificação.
+            raw_data_responses = {"initialData": first_company}
+            api_calls = self._build_api_calls(first_company, fields)
+            sections, missing = await self._fetch_apis_concurrently(session, api_calls, flow, deadline_at)
+            fallback_calls = self._fallback_calls(first_company, fields, api_calls, sections, missing)
+            if fallback_calls:
+                fallback_sections, fallback_missing = await self._fetch_apis_concurrently(
+                    session, fallback_calls, flow, deadline_at)
+                sections.update(fallback_sections)
+                missing += fallback_missing
+            if resolved_locally and self._stale_in_index(first_company, api_calls, sections, missing):
+                print(f"WARN:     Perfil de {first_company.shortname} não encontrado: entrada do índice local descartada.")
+                await asyncio.to_thread(self.company_index.forget, first_company.id)
+                found = await self._search(session, term, flow, deadline_at)
+                if (found.id, found.shortname) != (first_company.id, first_company.shortname):
+                    return await self._scrape_with_session(pooled, term, fields, flow, deadline_at, company=found)
+            self._record_profile(first_company, api_calls, sections, missing)
+            raw_data_responses.update(sections)
+            raw_data_responses[MISSING_SECTIONS] = missing
             return raw_data_responses
 
         except Exception as e:
             print(f"ERROR:     Erro fatal durante o scraping: {e}")
-            raise e
\ No newline at end of file
+            raise e
+
+    async def _search(self, session: requests.AsyncSession, term: str, flow: int, deadline_at: float) -> CompanyDTO:
+        """Equivalente assíncrono de `ReclameAquiScraper._search`."""
+        response = await self._get(session, "search", self._search_url(term), flow, deadline_at)
+        response.raise_for_status()
+        # Alimentar o índice local escreve em SQLite: numa thread, fora do event loop.
+        return await asyncio.to_thread(self._parse_search_response, response.json(), term)
+
+    async def _get(self, session: requests.AsyncSession, endpoint: str, url: str, flow: int, deadline_at: float,
+                   timeout: Optional[float] = None, breaker: Optional[CircuitBreaker] = None
+                   ) -> Optional[requests.Response]:
+        """Equivalente assíncrono de `ReclameAquiScraper._get`."""
+        for attempt in range(self.THROTTLE_RETRIES + 1):
+            async with self.scheduler.aslot(url, flow, deadline_at) as permit:
+                if breaker is not None and breaker.is_open():
+                    return None
+                with UpstreamCall(endpoint) as call:
+                    resp = await session.get(url, headers=self.headers,
+                                             timeout=self._call_timeout(deadline_at, timeout))
+                    call.status(resp.status_code)
+                    permit.observe(resp)
+            if not self._should_retry(permit, attempt, deadline_at):
+                break
+        return resp
+
+    async def _fetch_api(self, session: requests.AsyncSession, key: str, url: str, flow: int,
+                         deadline_at: float) -> Tuple[Optional[bytes], bool]:
+        """Equivalente assíncrono de `ReclameAquiScraper._fetch_api`."""
+        breaker = self.circuit_breakers.get(key)
+        if not breaker.allow():
+            return self._skipped(key)
+        try:
+            resp = await self._get(session, key, url, flow, deadline_at, breaker.call_timeout(self.section_timeout),
+                                   breaker)
+        except asyncio.CancelledError:
+            # Cancelada no fim do prazo da busca: não é uma falha da API.
+            breaker.record_abandoned()
+            raise
+        except Exception as e:
+            self._record_interrupted(breaker, deadline_at)
+            print(f"WARN:     Erro ao chamar a API {key}: {e}")
+            return None, True
+        if resp is None:
+            return self._skipped(key)
+        return self._section_result(key, breaker, resp)
+
+    async def _fetch_apis_concurrently(self, session: requests.AsyncSession, api_calls: Dict[str, str],
+                                       flow: int, deadline_at: float) -> Tuple[Dict[str, bytes], List[str]]:
+        """Equivalente assíncrono de `ReclameAquiScraper._fetch_apis_concurrently`."""
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            print("WARN:     Prazo esgotado antes de chamar as APIs de perfil.")
+            return {}, list(api_calls)
+
+        tasks = {key: asyncio.ensure_future(self._fetch_api(session, key, url, flow, deadline_at))
+                 for key, url in api_calls.items()}
+        try:
+            await asyncio.wait(tasks.values(), timeout=remaining)
+        except asyncio.CancelledError:
+            # A busca foi cancelada (ex: todos os clientes desistiram): as chamadas em curso também.
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        results, missing = {}, []
+        for key, task in tasks.items():
+            if not task.done():
+                # Ao contrário das threads, aqui podemos cancelar a chamada atrasada.
+                task.cancel()
+                print(f"WARN:     Prazo esgotado ao chamar a API {key}.")
+                missing.append(key)
+                continue
+            body, failed = task.result()
+            if body is not None:
+                results[key] = body
+            elif failed:
+                missing.append(key)
+        return results, missing
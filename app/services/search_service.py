@@ -24,29 +24,603 @@ Este serviço coordena o trabalho entre o Coletor de Dados (Scraper) e o
 Analisador de Dados (Generator) para executar a busca completa.
 """
 
-from .scraper_strategy import ScraperStrategy, ReclameAquiScraper
+import asyncio
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set, Tuple, Union
+from .scraper_strategy import ScraperStrategy, ReclameAquiScraper, AsyncScraperStrategy, AsyncReclameAquiScraper
 from .analysis_strategy import AnalysisStrategy, DossieGenerator
-from app.dtos import DossieEmpresaDTO
+from .session_pool import SessionPool, AsyncSessionPool
+from .dossie_cache import CachedDossie, DossieCache, Freshness
+from .normalization import normalize_term
+from .single_flight import AsyncSingleFlight, SingleFlight
+from .company_index import CompanyIndex
+from .upstream_scheduler import HostLimits, UpstreamScheduler
+from .circuit_breaker import CircuitBreakers
+from .field_selection import FieldSelection
+from .watchlist import Watchlist, WatchlistRefresher
+from .snapshot_store import SnapshotStore
+from .dossie_index import DossieIndex
+from .admission import AdmissionController, AdmissionTicket, DeadlineExceeded, Overloaded, Priority
+from .response_encoding import COMPRESSORS, DossieRepresentation, content_etag
+from app.dtos import CompanyDTO, DossieEmpresaDTO
+from app.metrics import REGISTRY, timed_stage
 
 
 class SearchService:
-    def __init__(self, scraper: ScraperStrategy, analyzer: AnalysisStrategy):
+    def __init__(self, scraper: ScraperStrategy, analyzer: AnalysisStrategy,
+                 company_index: Optional[CompanyIndex] = None):
         self.scraper = scraper
         self.analyzer = analyzer
+        # Índice local de empresas (o mesmo do Scraper): resolve o termo para a chave do single-flight.
+        self.company_index = company_index
+        self._flight = SingleFlight()
 
-    def search_company(self, term: str) -> DossieEmpresaDTO:
+    def search_company(self, term: str, fields: Optional[FieldSelection] = None) -> DossieEmpresaDTO:
         """
         Executa o fluxo completo de busca e análise.
-        1. Chama o Scraper para coletar os dados brutos.
+        1. Chama o Scraper para coletar os dados brutos (só as APIs de que `fields` precisa).
         2. Passa os dados brutos para o Analisador para gerar o dossiê.
         3. Retorna o dossiê final.
+        Buscas simultâneas pela mesma empresa e pelos mesmos campos partilham uma única execução.
         """
-        raw_data = self.scraper.scrape_company_data(term)
-        initial_data_json = raw_data.pop("initialData")
-        return self.analyzer.generate(initial_data_json, raw_data)
+        return self._flight.do(self._flight_key(term, fields), lambda: self._search_company(term, fields))
 
-# Injeção de dependência "manual" para o FastAPI, instanciando as nossas implementações
+    def collect(self, term: str, fields: Optional[FieldSelection] = None) -> Dict[str, Any]:
+        """
+        Só a coleta: devolve os dados brutos do Scraper, sem os analisar (ex: para que a análise,
+        que é CPU-bound, corra noutro processo). Coletas simultâneas do mesmo termo são partilhadas.
+        """
+        key = f"raw:{self._flight_key(term, fields)}"
+        return dict(self._flight.do(key, lambda: self.scraper.scrape_company_data(term, fields)))
+
+    def _flight_key(self, term: str, fields: Optional[FieldSelection] = None) -> str:
+        """
+        Chave de deduplicação: o id da empresa, se o índice local já resolver o termo (ex: o CNPJ e o
+        shortname da mesma empresa); caso contrário, o próprio termo normalizado. Como no `AsyncSearchService`.
+        """
+        company = self.company_index.lookup(term) if self.company_index is not None else None
+        key = f"id:{company.id}" if company is not None else f"term:{normalize_term(term)}"
+        return key if fields is None else f"{key}|{fields.key}"
+
+    def _search_company(self, term: str, fields: Optional[FieldSelection]) -> DossieEmpresaDTO:
+        raw_data = self.scraper.scrape_company_data(term, fields)
+        initial_data = raw_data.pop("initialData")
+        with timed_stage("analysis"):
+            return self.analyzer.generate(initial_data, raw_data, fields)
+
+    def close(self) -> None:
+        """Liberta os recursos do Scraper (sessões e threads)."""
+        self.scraper.close()
+
+
+class AsyncSearchService:
+    """Versão asyncio do `SearchService`, usada pela API para não ocupar threads enquanto espera pelo upstream."""
+
+    def __init__(self, scraper: AsyncScraperStrategy, analyzer: AnalysisStrategy,
+                 cache: Optional[DossieCache] = None, snapshots: Optional[SnapshotStore] = None,
+                 dossie_index: Optional[DossieIndex] = None, admission: Optional[AdmissionController] = None):
+        self.scraper = scraper
+        self.analyzer = analyzer
+        self.cache = cache
+        # Histórico mensal de reputação: cada coleta nova funde nele os snapshots do indexEvolution.
+        self.snapshots = snapshots
+        # Índice analítico de todos os dossiês completos montados por este serviço (rankings, agregados).
+        self.dossie_index = dossie_index
+        # Limita as coletas em curso e a fila de espera; as buscas servidas pela cache não passam por ele.
+        self.admission = admission
+        if cache is not None:
+            REGISTRY.register_collector(cache.render_metrics)
+        if admission is not None:
+            REGISTRY.register_collector(admission.render_metrics)
+        self._flight = AsyncSingleFlight()
+        # Bilhete de admissão de cada coleta partilhada que ainda espera por vaga (por chave do single-flight).
+        self._tickets: Dict[str, AdmissionTicket] = {}
+        # Atualizações em segundo plano em curso (guardamos a referência das tasks).
+        self._refreshing: Set[asyncio.Task] = set()
+        # Lista de vigilância, se existir: os pedidos servidos contam para a popularidade de cada empresa.
+        self.watchlist: Optional[Watchlist] = None
+
+    async def search_company(self, term: str, fields: Optional[FieldSelection] = None,
+                             deadline_at: Optional[float] = None,
+                             priority: Priority = Priority.INTERACTIVE) -> DossieEmpresaDTO:
+        """
+        Mesmo fluxo do `SearchService.search_company`, com a coleta feita de forma assíncrona.
+        Com cache, uma entrada fresca é devolvida de imediato; uma entrada vencida, mas ainda
+        dentro da janela de stale-while-revalidate, também é devolvida, e é atualizada em segundo plano.
+        Com `fields`, a frescura só é avaliada nas secções que esses campos usam.
+        Buscas simultâneas pela mesma empresa partilham uma única coleta e análise.
+        Uma coleta nova passa pelo controlo de admissão (com a maior prioridade entre as buscas que
+        esperam por ela) e corre com o prazo do próprio serviço, nunca com o de um cliente. Cada busca
+        espera por ela, no máximo, até ao seu `deadline_at` (em `time.monotonic()`); se todas desistirem,
+        a coleta é cancelada, sem chegar à cache.
+        Lança `Overloaded` se a coleta for recusada e `DeadlineExceeded` se o prazo terminar antes.
+        """
+        entry = await self._search_entry(term, fields, deadline_at, priority)
+        self._record_request(entry)
+        return self._dossie_from_entry(entry) if fields is None else self._selected_dossie(entry, fields)
+
+    async def search_company_json(self, term: str, fields: Optional[FieldSelection] = None,
+                                  deadline_at: Optional[float] = None,
+                                  priority: Priority = Priority.INTERACTIVE) -> bytes:
+        """
+        Como `search_company`, mas devolve o JSON final do dossiê, já serializado. Os bytes do dossiê
+        completo ficam memorizados na entrada da cache, pelo que os acertos seguintes não voltam a serializar.
+        """
+        entry = await self._search_entry(term, fields, deadline_at, priority)
+        self._record_request(entry)
+        return self._json_from_entry(entry) if fields is None else self._selected_json(entry, fields)
+
+    async def search_company_representation(self, term: str, fields: Optional[FieldSelection] = None,
+                                            deadline_at: Optional[float] = None,
+                                            priority: Priority = Priority.INTERACTIVE) -> DossieRepresentation:
+        """
+        Como `search_company_json`, mas devolve também a ETag do JSON e as suas versões comprimidas.
+        No dossiê completo, ambas ficam memorizadas na entrada da cache: um pedido condicional ou
+        comprimido a um dossiê que não mudou não volta a serializar, a calcular o hash nem a comprimir.
+        """
+        entry = await self._search_entry(term, fields, deadline_at, priority)
+        self._record_request(entry)
+        if fields is None:
+            return self._representation_from_entry(entry)
+        return DossieRepresentation(self._selected_json(entry, fields))
+
+    async def resolve_company(self, term: str) -> CompanyDTO:
+        """A empresa de um termo, tal como devolvida pela busca inicial (da cache ou de uma nova coleta)."""
+        initial_data = (await self._search_entry(term)).raw_data.get("initialData")
+        if initial_data is None:
+            # Sem cache, a entrada não guarda os dados brutos: vamos diretamente ao Scraper.
+            initial_data = (await self.scraper.scrape_company_data(term))["initialData"]
+        return initial_data if isinstance(initial_data, CompanyDTO) else CompanyDTO.model_validate_json(initial_data)
+
+    async def refresh_company(self, term: str) -> CachedDossie:
+        """
+        Coleta de novo um termo, mesmo que a cache ainda o tenha fresco, e deixa o dossiê, o seu JSON
+        e as versões comprimidas já montados na cache, para que o próximo `/search` os sirva sem esperar.
+        A coleta passa pelo controlo de admissão como um lote: lança `Overloaded` se for recusada.
+        """
+        key = await self._resolve_flight_key(term)
+        entry = await self._flight.do(key, lambda: self._admitted_fetch(key, term, None, Priority.BATCH))
+        representation = self._representation_from_entry(entry)
+        for encoding in COMPRESSORS:
+            representation.body(encoding)
+        return entry
+
+    async def search_many(self, terms: Iterable[str], concurrency: int = 8, as_json: bool = False,
+                          fields: Optional[FieldSelection] = None
+                          ) -> AsyncIterator[Tuple[str, Union[DossieEmpresaDTO, bytes, None], Optional[Exception]]]:
+        """
+        Busca vários termos com no máximo `concurrency` buscas em curso, e devolve
+        `(termo, dossiê, erro)` pela ordem em que cada busca termina. Os termos são consumidos
+        à medida que há vaga, pelo que a memória usada não depende do tamanho do lote.
+        Com `as_json`, o dossiê vem já serializado (como em `search_company_json`).
+        As coletas do lote entram na fila de admissão atrás das buscas interativas.
+        """
+        terms_iter = iter(terms)
+        pending: Set[asyncio.Task] = set()
+
+        async def run(term: str):
+            try:
+                if as_json:
+                    return term, await self.search_company_json(term, fields, priority=Priority.BATCH), None
+                return term, await self.search_company(term, fields, priority=Priority.BATCH), None
+            except Exception as e:
+                return term, None, e
+
+        def fill() -> None:
+            while len(pending) < concurrency:
+                term = next(terms_iter, None)
+                if term is None:
+                    return
+                pending.add(asyncio.create_task(run(term)))
+
+        fill()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+                for task in done:
+                    yield task.result()
+                fill()
+        finally:
+            # Se o consumidor desistir (ex: o cliente desligou), não deixamos buscas órfãs.
+            for task in pending:
+                task.cancel()
+
+    async def warm_up(self) -> None:
+        """
+        Faz em segundo plano o que o arranque a frio adiou: aquece uma sessão do upstream para a
+        primeira busca e lê o histórico de reputação guardado (importando o NumPy numa thread).
+        """
+        try:
+            # Primeiro a sessão, que é o que a primeira busca vai precisar.
+            await self.scraper.warm_up()
+            if self.snapshots is not None:
+                await asyncio.to_thread(self.snapshots.load)
+        except Exception as e:
+            # Sem aquecimento, a primeira busca faz o que falta: não há nada a propagar.
+            print(f"WARN:     Falha no aquecimento do arranque: {e}")
+
+    async def close(self) -> None:
+        for task in list(self._refreshing):
+            task.cancel()
+        await self.scraper.close()
+        if self.admission is not None:
+            REGISTRY.unregister_collector(self.admission.render_metrics)
+        if self.cache is not None:
+            REGISTRY.unregister_collector(self.cache.render_metrics)
+            self.cache.close()
+
+    async def _search_entry(self, term: str, fields: Optional[FieldSelection] = None,
+                            deadline_at: Optional[float] = None,
+                            priority: Priority = Priority.INTERACTIVE) -> CachedDossie:
+        """
+        Devolve a entrada de um termo, vinda da cache ou de uma nova coleta. Sem `fields`, a entrada
+        já traz o dossiê completo montado; com `fields`, o dossiê é montado pelo chamador.
+        """
+        if self.cache is not None:
+            with timed_stage("cache"):
+                entry, freshness = await self._cache_lookup(term, fields.sections if fields is not None else None)
+            if entry is not None and fields is not None and "profile" not in entry.raw_data and \
+                    "profile" not in self.cache.missing_sections(entry):
+                # Empresa sem perfil: a seleção pode precisar de outras secções (ver `FIELD_SECTIONS_WITHOUT_PROFILE`).
+                fallback = self.cache.freshness(entry, fields.sections_without_profile)
+                if fallback is Freshness.EXPIRED:
+                    entry = None
+                elif fallback is Freshness.STALE:
+                    freshness = fallback
+            if entry is not None:
+                if freshness is Freshness.STALE:
+                    self._schedule_refresh(term, fields)
+                if fields is None:
+                    self._dossie_from_entry(entry)
+                if self.admission is not None:
+                    self.admission.bypass()
+                return entry
+
+        key = await self._resolve_flight_key(term, fields)
+        if self.admission is not None:
+            if self._flight.in_flight(key):
+                # Junta-se a uma coleta já em curso: não ocupa outra vaga nem outro lugar na fila, mas, se
+                # a coleta ainda estiver à espera de vez, passa-lhe a sua prioridade (se for maior).
+                self.admission.bypass()
+                ticket = self._tickets.get(key)
+                if ticket is not None:
+                    self.admission.promote(ticket, priority)
+            else:
+                self.admission.check_deadline(deadline_at)
+        flight = self._flight.do(key, lambda: self._admitted_fetch(key, term, fields, priority))
+        if deadline_at is None:
+            return await flight
+        # O prazo só corta a espera desta busca: a coleta partilhada continua enquanto outra esperar por ela.
+        try:
+            return await asyncio.wait_for(flight, deadline_at - time.monotonic())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("O prazo do pedido terminou antes da coleta.")
+
+    async def _admitted_fetch(self, key: str, term: str, fields: Optional[FieldSelection],
+                              priority: Priority) -> CachedDossie:
+        # A admissão corre dentro do single-flight: quem se junta à coleta partilha a vaga (e a recusa).
+        if self.admission is None:
+            return await self._fetch_entry(term, fields)
+        ticket = self._tickets[key] = AdmissionTicket(priority)
+        try:
+            async with self.admission.admit(ticket=ticket):
+                self._tickets.pop(key, None)
+                return await self._fetch_entry(term, fields)
+        finally:
+            if self._tickets.get(key) is ticket:
+                del self._tickets[key]
+
+    def _merge_snapshots(self, raw_data: Dict[str, Any]) -> None:
+        try:
+            self.snapshots.merge_raw(raw_data["initialData"].id, raw_data["indexEvolution"])
+        except ValueError as e:
+            # Um histórico ilegível não impede o dossiê: a análise trata a secção à sua maneira.
+            print(f"WARN:     indexEvolution ignorado no histórico: {e}")
+
+    def _index_dossie(self, dossie: DossieEmpresaDTO) -> None:
+        if self.dossie_index is not None:
+            self.dossie_index.add(dossie)
+
+    def _record_request(self, entry: CachedDossie) -> None:
+        if self.watchlist is not None:
+            self.watchlist.record_request(entry.company_id)
+
+    async def _cache_lookup(self, term: str, sections: Optional[Iterable[str]]
+                            ) -> Tuple[Optional[CachedDossie], Freshness]:
+        if self.cache.in_memory(term):
+            return self.cache.lookup(term, sections)
+        # Fora do nível de memória, a cache lê o SQLite: numa thread, fora do event loop.
+        return await asyncio.to_thread(self.cache.lookup, term, sections)
+
+    async def _resolve_flight_key(self, term: str, fields: Optional[FieldSelection] = None) -> str:
+        if self.cache is None or self.cache.in_memory(term):
+            return self._flight_key(term, fields)
+        # O termo pode ter de ser resolvido no índice de termos em disco.
+        return await asyncio.to_thread(self._flight_key, term, fields)
+
+    def _flight_key(self, term: str, fields: Optional[FieldSelection] = None) -> str:
+        """
+        Chave de deduplicação: o id da empresa, se a cache já souber a que empresa o termo
+        corresponde; caso contrário, o próprio termo normalizado. Cada seleção de campos tem a sua.
+        """
+        company_id = self.cache.resolve_company_id(term) if self.cache is not None else None
+        key = f"id:{company_id}" if company_id is not None else f"term:{normalize_term(term)}"
+        return key if fields is None else f"{key}|{fields.key}"
+
+    async def _fetch_entry(self, term: str, fields: Optional[FieldSelection] = None) -> CachedDossie:
+        # Sempre com o prazo do Scraper: o resultado é partilhado e guardado, e não pode ficar
+        # com secções em falta só porque o prazo de um dos clientes terminou.
+        raw_data = await self.scraper.scrape_company_data(term, fields)
+        # As escritas em SQLite (histórico e cache) correm numa thread, fora do event loop.
+        if self.snapshots is not None and "indexEvolution" in raw_data:
+            await asyncio.to_thread(self._merge_snapshots, raw_data)
+        if self.cache is not None:
+            if fields is None:
+                entry = await asyncio.to_thread(self.cache.store, term, raw_data)
+                self._dossie_from_entry(entry)
+                return entry
+            return await asyncio.to_thread(self.cache.store, term, raw_data,
+                                           attempted_sections=fields.attempted_sections(raw_data))
+        if fields is not None:
+            # O dossiê de uma seleção é montado pelo chamador, a partir dos dados brutos.
+            return CachedDossie(company_id=raw_data["initialData"].id, raw_data=raw_data, fetched_at={})
+        # Sem cache, a entrada serve apenas para transportar o dossiê (e o seu JSON) até ao chamador.
+        initial_data = raw_data.pop("initialData")
+        with timed_stage("analysis"):
+            dossie = self.analyzer.generate(initial_data, raw_data)
+        self._index_dossie(dossie)
+        return CachedDossie(company_id=dossie.identificacao.id_reclame_aqui, raw_data={}, fetched_at={},
+                            dossie=dossie)
+
+    def _dossie_from_entry(self, entry: CachedDossie) -> DossieEmpresaDTO:
+        # O dossiê montado fica memorizado na própria entrada: os acertos seguintes não repetem a análise.
+        if entry.dossie is None:
+            raw_data = dict(entry.raw_data)
+            initial_data = raw_data.pop("initialData")
+            with timed_stage("analysis"):
+                entry.dossie = self.analyzer.generate(initial_data, raw_data)
+            self._index_dossie(entry.dossie)
+        if self.cache is not None:
+            # As secções envelhecem enquanto a entrada está em memória: só o JSON memorizado é refeito.
+            stale = self.cache.stale_sections(entry)
+            if stale != entry.dossie.secoes_desatualizadas:
+                entry.dossie.secoes_desatualizadas = stale
+                entry.dossie_json = None
+                entry.dossie_etag = None
+                entry.dossie_encoded = {}
+        return entry.dossie
+
+    def _json_from_entry(self, entry: CachedDossie) -> bytes:
+        if entry.dossie_json is None:
+            dossie = self._dossie_from_entry(entry)
+            with timed_stage("serialize"):
+                entry.dossie_json = self.analyzer.serialize(dossie)
+        return entry.dossie_json
+
+    def _representation_from_entry(self, entry: CachedDossie) -> DossieRepresentation:
+        dossie_json = self._json_from_entry(entry)
+        if entry.dossie_etag is None:
+            entry.dossie_etag = content_etag(dossie_json)
+        return DossieRepresentation(dossie_json, entry.dossie_etag, entry.dossie_encoded)
+
+    def _selected_dossie(self, entry: CachedDossie, fields: FieldSelection) -> DossieEmpresaDTO:
+        """
+        O dossiê de uma seleção de campos. Se a entrada já tiver o dossiê completo montado, é esse que
+        serve (a serialização corta os restantes campos); senão, só são lidas as secções da seleção.
+        """
+        if entry.dossie is not None:
+            dossie = self._dossie_from_entry(entry)
+            has_profile = "profile" in entry.raw_data
+            return dossie.model_copy(update={
+                "secoes_em_falta": fields.relevant(dossie.secoes_em_falta, has_profile),
+                "secoes_desatualizadas": fields.relevant(dossie.secoes_desatualizadas, has_profile)})
+        raw_data = dict(entry.raw_data)
+        initial_data = raw_data.pop("initialData")
+        with timed_stage("analysis"):
+            dossie = self.analyzer.generate(initial_data, raw_data, fields)
+        if self.cache is not None:
+            stale = self.cache.stale_sections(entry, fields.required_sections("profile" in raw_data))
+            dossie.secoes_desatualizadas = stale
+        return dossie
+
+    def _selected_json(self, entry: CachedDossie, fields: FieldSelection) -> bytes:
+        dossie = self._selected_dossie(entry, fields)
+        with timed_stage("serialize"):
+            return self.analyzer.serialize(dossie, fields)
+
+    def _schedule_refresh(self, term: str, fields: Optional[FieldSelection] = None) -> None:
+        # Só depois de um acerto da cache: o termo já está no nível de memória e a chave não lê a base.
+        key = self._flight_key(term, fields)
+        if self._flight.in_flight(key):
+            return
+        task = asyncio.create_task(self._refresh(key, term, fields))
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+
+    async def _refresh(self, key: str, term: str, fields: Optional[FieldSelection] = None) -> None:
+        try:
+            # A atualização entra no mesmo single-flight (uma busca que chegue entretanto espera por ela)
+            # e na fila de admissão atrás das buscas interativas.
+            await self._flight.do(key, lambda: self._admitted_fetch(key, term, fields, Priority.BATCH))
+            self.cache.record_refresh()
+        except Overloaded:
+            # Sem vaga: a entrada continua a ser servida e o próximo acerto volta a pedir a atualização.
+            pass
+        except Exception as e:
+            print(f"WARN:     Falha ao atualizar em segundo plano o termo {term}: {e}")
+
+
+# Instâncias únicas por processo, criadas no arranque da aplicação e partilhadas por todas as requisições.
+_company_index: Optional[CompanyIndex] = None
+_snapshot_store: Optional[SnapshotStore] = None
+_dossie_index: Optional[DossieIndex] = None
+_upstream_scheduler: Optional[UpstreamScheduler] = None
+_circuit_breakers: Optional[CircuitBreakers] = None
+_search_service: Optional[SearchService] = None
+_search_service_lock = threading.Lock()
+
+
+def get_company_index() -> CompanyIndex:
+    """Devolve o índice local de empresas do processo, carregando-o do disco na primeira chamada."""
+    global _company_index
+    with _search_service_lock:
+        if _company_index is None:
+            _company_index = CompanyIndex(db_path=os.environ.get("EXPOSEAQUI_INDEX_DB", "exposeaqui_index.db"))
+        return _company_index
+
+
+def close_company_index() -> None:
+    global _company_index
+    with _search_service_lock:
+        if _company_index is not None:
+            _company_index.close()
+            _company_index = None
+
+
+def get_snapshot_store() -> SnapshotStore:
+    """Devolve o histórico mensal de reputação do processo, carregando-o do disco na primeira chamada."""
+    global _snapshot_store
+    with _search_service_lock:
+        if _snapshot_store is None:
+            _snapshot_store = SnapshotStore(db_path=os.environ.get("EXPOSEAQUI_SNAPSHOTS_DB", "exposeaqui_snapshots.db"))
+        return _snapshot_store
+
+
+def close_snapshot_store() -> None:
+    global _snapshot_store
+    with _search_service_lock:
+        if _snapshot_store is not None:
+            _snapshot_store.close()
+            _snapshot_store = None
+
+
+def get_dossie_index() -> DossieIndex:
+    """Devolve o índice analítico dos dossiês produzidos pelo processo (só em memória)."""
+    global _dossie_index
+    with _search_service_lock:
+        if _dossie_index is None:
+            _dossie_index = DossieIndex()
+        return _dossie_index
+
+
+def get_upstream_scheduler() -> UpstreamScheduler:
+    """Devolve o escalonador de chamadas ao upstream, partilhado pelos serviços síncrono e assíncrono."""
+    global _upstream_scheduler
+    with _search_service_lock:
+        if _upstream_scheduler is None:
+            # O ritmo e o teto de concorrência por host podem ser ajustados sem mexer no código.
+            limits = HostLimits(
+                rate=float(os.environ.get("EXPOSEAQUI_UPSTREAM_RATE", HostLimits.rate)),
+                burst=int(os.environ.get("EXPOSEAQUI_UPSTREAM_BURST", HostLimits.burst)),
+                max_concurrency=int(os.environ.get("EXPOSEAQUI_UPSTREAM_MAX_CONCURRENCY", HostLimits.max_concurrency)))
+            _upstream_scheduler = UpstreamScheduler(limits)
+            REGISTRY.register_collector(_upstream_scheduler.render_metrics)
+        return _upstream_scheduler
+
+
+def get_circuit_breakers() -> CircuitBreakers:
+    """Devolve os disjuntores das APIs de perfil, partilhados pelos serviços síncrono e assíncrono."""
+    global _circuit_breakers
+    with _search_service_lock:
+        if _circuit_breakers is None:
+            _circuit_breakers = CircuitBreakers()
+            REGISTRY.register_collector(_circuit_breakers.render_metrics)
+        return _circuit_breakers
+
+
+def init_search_service() -> SearchService:
+    """Cria (uma única vez) o serviço de busca do processo, com o seu pool de sessões de longa duração."""
+    global _search_service
+    company_index = get_company_index()
+    scheduler = get_upstream_scheduler()
+    circuit_breakers = get_circuit_breakers()
+    with _search_service_lock:
+        if _search_service is None:
+            scraper = ReclameAquiScraper(session_pool=SessionPool(), company_index=company_index, scheduler=scheduler,
+                                         circuit_breakers=circuit_breakers)
+            analyzer = DossieGenerator()
+            _search_service = SearchService(scraper, analyzer, company_index=company_index)
+        return _search_service
+
+
+def close_search_service() -> None:
+    """Fecha o serviço do processo, se existir. Chamado no encerramento da aplicação."""
+    global _search_service
+    with _search_service_lock:
+        if _search_service is not None:
+            _search_service.close()
+            _search_service = None
+
+
+# Injeção de dependência "manual" para o FastAPI: devolve o serviço partilhado pelo processo
 def get_search_service() -> SearchService:
-    scraper = ReclameAquiScraper()
-    analyzer = DossieGenerator()
-    return SearchService(scraper, analyzer)
\ No newline at end of file
+    return _search_service or init_search_service()
+
+
+# Serviço assíncrono do processo, criado no arranque da aplicação (dentro do event loop do servidor).
+_async_search_service: Optional[AsyncSearchService] = None
+
+
+async def init_async_search_service() -> AsyncSearchService:
+    """Cria (uma única vez) o serviço de busca assíncrono, com o seu pool de `AsyncSession`."""
+    global _async_search_service
+    if _async_search_service is None:
+        scraper = AsyncReclameAquiScraper(session_pool=AsyncSessionPool(), company_index=get_company_index(),
+                                          scheduler=get_upstream_scheduler(),
+                                          circuit_breakers=get_circuit_breakers())
+        analyzer = DossieGenerator()
+        cache = DossieCache(db_path=os.environ.get("EXPOSEAQUI_CACHE_DB", "exposeaqui_cache.db"))
+        admission = AdmissionController(max_active=int(os.environ.get("EXPOSEAQUI_MAX_ACTIVE_SEARCHES", 32)),
+                                        max_queue=int(os.environ.get("EXPOSEAQUI_MAX_QUEUED_SEARCHES", 64)))
+        _async_search_service = AsyncSearchService(scraper, analyzer, cache, snapshots=get_snapshot_store(),
+                                                   dossie_index=get_dossie_index(), admission=admission)
+    return _async_search_service
+
+
+async def close_async_search_service() -> None:
+    """Fecha o serviço assíncrono do processo, se existir."""
+    global _async_search_service
+    if _async_search_service is not None:
+        service, _async_search_service = _async_search_service, None
+        await service.close()
+
+
+async def get_async_search_service() -> AsyncSearchService:
+    return _async_search_service or await init_async_search_service()
+
+
+# Atualização em segundo plano das empresas vigiadas, criada no arranque depois do serviço assíncrono.
+_watchlist_refresher: Optional[WatchlistRefresher] = None
+
+
+async def init_watchlist_refresher() -> WatchlistRefresher:
+    """Carrega a lista de vigilância e arranca o pool de workers que a mantém atualizada na cache."""
+    global _watchlist_refresher
+    if _watchlist_refresher is None:
+        service = await get_async_search_service()
+        watchlist = Watchlist(db_path=os.environ.get("EXPOSEAQUI_WATCHLIST_DB", "exposeaqui_watchlist.db"))
+        service.watchlist = watchlist
+        _watchlist_refresher = WatchlistRefresher(
+            watchlist, service.refresh_company, workers=int(os.environ.get("EXPOSEAQUI_WATCHLIST_WORKERS", 4)))
+        _watchlist_refresher.start()
+        REGISTRY.register_collector(_watchlist_refresher.render_metrics)
+    return _watchlist_refresher
+
+
+async def close_watchlist_refresher() -> None:
+    """Para os workers e fecha a lista de vigilância, se existirem. Chamado antes de fechar o serviço assíncrono."""
+    global _watchlist_refresher
+    if _watchlist_refresher is not None:
+        refresher, _watchlist_refresher = _watchlist_refresher, None
+        REGISTRY.unregister_collector(refresher.render_metrics)
+        await refresher.close()
+        if _async_search_service is not None:
+            _async_search_service.watchlist = None
+        refresher.watchlist.close()
+
+
+async def get_watchlist_refresher() -> WatchlistRefresher:
+    return _watchlist_refresher or await init_watchlist_refresher()
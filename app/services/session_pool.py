@@ -0,0 +1,279 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+"""
+Pool de sessões HTTP de longa duração.
+Em vez de abrir uma sessão nova (e um novo handshake TLS) a cada busca, o Scraper
+pede emprestada uma sessão já aquecida, usa-a e devolve-a ao pool. Cada sessão
+sabe há quanto tempo existe, quando foi aquecida e quantos erros seguidos teve,
+para que o pool a possa reciclar na altura certa.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Awaitable, Callable, Iterator, List, Optional, Union
+from app.lazy_imports import LazyModule
+
+requests = LazyModule("curl_cffi.requests")
+
+
+class PooledSession:
+    """Uma sessão curl_cffi (síncrona ou assíncrona) com o estado necessário para decidir quando aquecê-la ou reciclá-la."""
+
+    def __init__(self, session: Union[requests.Session, requests.AsyncSession]):
+        self.session = session
+        self.created_at = time.monotonic()
+        self.warmed_at: Optional[float] = None
+        self.consecutive_errors = 0
+        self.uses = 0
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+    def needs_warmup(self, warmup_ttl: float) -> bool:
+        """Indica se é preciso voltar a visitar a página inicial para renovar os cookies."""
+        if self.warmed_at is None or time.monotonic() - self.warmed_at > warmup_ttl:
+            return True
+        # Um cookie de desafio que expirou obriga a um novo aquecimento, mesmo dentro do TTL.
+        return any(cookie.is_expired() for cookie in self.session.cookies.jar)
+
+    def mark_warmed(self) -> None:
+        self.warmed_at = time.monotonic()
+
+    def record_success(self) -> None:
+        self.uses += 1
+        self.consecutive_errors = 0
+
+    def record_error(self) -> None:
+        self.uses += 1
+        self.consecutive_errors += 1
+        # Após um erro não confiamos mais nos cookies atuais.
+        self.warmed_at = None
+
+    def close(self) -> None:
+        try:
+            self.session.close()
+        except Exception as e:
+            print(f"WARN:     Erro ao fechar sessão: {e}")
+
+    async def aclose(self) -> None:
+        try:
+            await self.session.close()
+        except Exception as e:
+            print(f"WARN:     Erro ao fechar sessão: {e}")
+
+
+class _BaseSessionPool:
+    """Configuração e regras de reciclagem comuns aos pools síncrono e assíncrono."""
+
+    def __init__(self, max_size: int, max_age: float, warmup_ttl: float, max_errors: int,
+                 checkout_timeout: float, impersonate: str, timeout: float):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.warmup_ttl = warmup_ttl
+        self.max_errors = max_errors
+        self.checkout_timeout = checkout_timeout
+        self.impersonate = impersonate
+        self.timeout = timeout
+        self._idle: List[PooledSession] = []
+        self._size = 0
+        self._closed = False
+
+    def _should_recycle(self, pooled: PooledSession) -> bool:
+        return pooled.age > self.max_age or pooled.consecutive_errors >= self.max_errors
+
+
+class SessionPool(_BaseSessionPool):
+    """
+    Pool thread-safe de `PooledSession`. As sessões são criadas sob demanda até `max_size`
+    e reutilizadas em ordem LIFO, para que as mais quentes sejam as mais usadas.
+    """
+
+    def __init__(self, max_size: int = 16, max_age: float = 900.0, warmup_ttl: float = 300.0,
+                 max_errors: int = 3, checkout_timeout: float = 30.0,
+                 impersonate: str = "chrome110", timeout: float = 30.0):
+        super().__init__(max_size, max_age, warmup_ttl, max_errors, checkout_timeout, impersonate, timeout)
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def session(self) -> Iterator[PooledSession]:
+        """Empresta uma sessão durante o bloco `with` e devolve-a ao pool no fim."""
+        pooled = self.checkout()
+        try:
+            yield pooled
+        finally:
+            self.checkin(pooled)
+
+    def checkout(self) -> PooledSession:
+        """Retira uma sessão do pool, criando uma nova se houver espaço, ou espera que alguma seja devolvida."""
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("O pool de sessões está fechado.")
+                while self._idle:
+                    pooled = self._idle.pop()
+                    if not self._should_recycle(pooled):
+                        return pooled
+                    self._retire(pooled)
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Nenhuma sessão disponível no pool dentro do prazo.")
+                self._cond.wait(remaining)
+
+        # A criação da sessão fica fora do lock para não bloquear as devoluções.
+        try:
+            return PooledSession(requests.Session(impersonate=self.impersonate, timeout=self.timeout))
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def checkin(self, pooled: PooledSession) -> None:
+        """Devolve uma sessão ao pool, ou descarta-a se estiver velha ou com demasiados erros."""
+        with self._cond:
+            if self._closed or self._should_recycle(pooled):
+                self._retire(pooled)
+            else:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    def close(self) -> None:
+        """Fecha todas as sessões ociosas; as emprestadas são fechadas quando voltarem."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._retire(self._idle.pop())
+            self._cond.notify_all()
+
+    def _retire(self, pooled: PooledSession) -> None:
+        # Chamado sempre com o lock adquirido.
+        self._size -= 1
+        pooled.close()
+        self._cond.notify()
+
+
+class AsyncSessionPool(_BaseSessionPool):
+    """
+    Versão asyncio do `SessionPool`, com sessões `AsyncSession`. Cada sessão empresta
+    até `max_clients` handles curl, o suficiente para as chamadas paralelas de uma busca.
+    Deve ser usado sempre a partir do mesmo event loop.
+    """
+
+    def __init__(self, max_size: int = 256, max_age: float = 900.0, warmup_ttl: float = 300.0,
+                 max_errors: int = 3, checkout_timeout: float = 30.0,
+                 impersonate: str = "chrome110", timeout: float = 30.0, max_clients: int = 4,
+                 prewarm_wait: float = 2.0):
+        super().__init__(max_size, max_age, warmup_ttl, max_errors, checkout_timeout, impersonate, timeout)
+        self.max_clients = max_clients
+        # Quanto tempo uma busca espera pela sessão de `prewarm` antes de abrir (e aquecer) a sua.
+        self.prewarm_wait = prewarm_wait
+        self._cond = asyncio.Condition()
+        # Sessões a ser aquecidas por `prewarm`.
+        self._warming = 0
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[PooledSession]:
+        """Empresta uma sessão durante o bloco `async with` e devolve-a ao pool no fim."""
+        pooled = await self.checkout()
+        try:
+            yield pooled
+        finally:
+            await self.checkin(pooled)
+
+    async def checkout(self) -> PooledSession:
+        """Retira uma sessão do pool, criando uma nova se houver espaço, ou espera que alguma seja devolvida."""
+        async with self._cond:
+            if self._warming and not self._idle:
+                # Um aquecimento lento (ex: um desafio do Cloudflare) não pode prender as buscas: esperam
+                # por ele no máximo `prewarm_wait` segundos e, depois disso, abrem a sua própria sessão.
+                try:
+                    await asyncio.wait_for(self._cond.wait_for(self._prewarm_settled), self.prewarm_wait)
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                await asyncio.wait_for(self._cond.wait_for(self._can_checkout), self.checkout_timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError("Nenhuma sessão disponível no pool dentro do prazo.")
+            if self._closed:
+                raise RuntimeError("O pool de sessões está fechado.")
+            while self._idle:
+                pooled = self._idle.pop()
+                if not self._should_recycle(pooled):
+                    return pooled
+                await self._retire(pooled)
+            self._size += 1
+        # Criar uma AsyncSession não faz I/O: os handles curl só são abertos no primeiro pedido.
+        return PooledSession(requests.AsyncSession(impersonate=self.impersonate, timeout=self.timeout,
+                                                   max_clients=self.max_clients))
+
+    async def prewarm(self, warm: Callable[[PooledSession], Awaitable[None]]) -> None:
+        """
+        Cria uma sessão, aquece-a com `warm` fora de qualquer busca e deixa-a ociosa no pool.
+        Usado no arranque: a primeira busca encontra os cookies de desafio já obtidos (ou espera
+        por eles, se chegar a meio, até `prewarm_wait` segundos) em vez de pagar o aquecimento.
+        """
+        pooled = await self.checkout()
+        self._warming += 1
+        try:
+            await warm(pooled)
+        finally:
+            async with self._cond:
+                self._warming -= 1
+                self._cond.notify_all()
+            await self.checkin(pooled)
+
+    async def checkin(self, pooled: PooledSession) -> None:
+        """Devolve uma sessão ao pool, ou descarta-a se estiver velha ou com demasiados erros."""
+        async with self._cond:
+            if self._closed or self._should_recycle(pooled):
+                await self._retire(pooled)
+            else:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    async def close(self) -> None:
+        """Fecha todas as sessões ociosas; as emprestadas são fechadas quando voltarem."""
+        async with self._cond:
+            self._closed = True
+            while self._idle:
+                await self._retire(self._idle.pop())
+            self._cond.notify_all()
+
+    def _can_checkout(self) -> bool:
+        return self._closed or bool(self._idle) or self._size < self.max_size
+
+    def _prewarm_settled(self) -> bool:
+        return self._closed or bool(self._idle) or not self._warming
+
+    async def _retire(self, pooled: PooledSession) -> None:
+        # Chamado sempre com o lock adquirido.
+        self._size -= 1
+        await pooled.aclose()
+        self._cond.notify()
@@ -0,0 +1,120 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Deduplicação de trabalho concorrente ("single-flight").
+Quando várias requisições pedem a mesma coisa ao mesmo tempo, só a primeira executa
+o trabalho; as restantes esperam por ela e recebem o mesmo resultado (ou o mesmo erro).
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Versão para threads: as chamadas repetidas bloqueiam até a chamada original terminar."""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+
+class AsyncSingleFlight:
+    """
+    Versão asyncio. O trabalho corre numa task própria, pelo que o cancelamento de
+    uma das requisições (ex: o cliente desligou ou o seu prazo terminou) não cancela o trabalho
+    das outras. Quando todas desistem de esperar, o trabalho é cancelado: ninguém ficaria com ele.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        # Requisições à espera de cada trabalho ainda em curso.
+        self._waiters: Dict[asyncio.Task, int] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._leave(key, task)
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    def _leave(self, key: str, task: asyncio.Task) -> None:
+        if task.done():
+            return
+        self._waiters[task] -= 1
+        if self._waiters[task] == 0:
+            # A última requisição desistiu: quem chegar a seguir começa um trabalho novo.
+            if self._calls.get(key) is task:
+                del self._calls[key]
+            task.cancel()
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        self._waiters.pop(task, None)
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Marca a exceção como lida, caso todas as requisições tenham desistido de esperar.
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,272 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Histórico mensal de reputação (indexEvolution), em colunas.
+Cada coleta traz até dois anos de snapshots mensais por empresa; em vez de os deitar fora,
+fundimo-los num armazém `(empresa, mês) -> contadores`, guardado em arrays NumPy contíguos
+e ordenados por empresa e mês (as linhas de uma empresa são uma fatia). As tendências
+(taxas móveis, variações mês a mês e inclinação) são calculadas com operações vetoriais
+sobre os arrays inteiros, pelo que correm sobre milhares de empresas de uma só vez.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from app.lazy_imports import LazyModule
+from pydantic import TypeAdapter
+from app.dtos import EvolutionPayload, EvolutionSnapshotPayload
+
+# Só importado na primeira leitura do histórico (ou no aquecimento do arranque).
+np = LazyModule("numpy")
+
+# Colunas do armazém, pela ordem em que são guardadas. O mês é `ano * 12 + (mês - 1)`.
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("company", "int32"),
+    ("month", "int32"),
+    ("indexable", "int32"),
+    ("solved", "int32"),
+    ("evaluations", "int32"),
+    ("deal_again", "int32"),
+    ("status", "int16"),
+)
+# Separa as empresas na chave `empresa * KEY_STRIDE + mês` (folga muito acima de qualquer mês real).
+KEY_STRIDE = 1 << 20
+
+_EVOLUTION_ADAPTER = TypeAdapter(EvolutionPayload)
+
+
+def month_label(month: int) -> str:
+    return f"{month // 12}-{month % 12 + 1:02d}"
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """`numerator / denominator`, com NaN onde o denominador é zero."""
+    out = np.full(len(numerator), np.nan)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+
+def compute_trends(columns: Dict[str, np.ndarray], window: int = 6) -> Dict[str, np.ndarray]:
+    """
+    Calcula, para cada linha (empresa, mês) de `columns` (ordenadas por empresa e mês), as taxas
+    do mês e da janela móvel de `window` meses, as variações em relação ao mês anterior e a
+    inclinação da taxa de resolução na janela. As taxas vêm em percentagem, e NaN onde não há dados.
+    As janelas contam meses de calendário: um mês sem snapshot não puxa a janela para trás.
+    """
+    company = columns["company"].astype(np.int64)
+    month = columns["month"].astype(np.int64)
+    indexable = columns["indexable"].astype(np.float64)
+    solved = columns["solved"].astype(np.float64)
+    evaluations = columns["evaluations"].astype(np.float64)
+    deal_again = columns["deal_again"].astype(np.float64)
+    key = company * KEY_STRIDE + month
+    rows = np.arange(len(key))
+    # Primeira linha da janela de cada linha: o mesmo índice, `window - 1` meses antes (na mesma empresa).
+    start = np.searchsorted(key, key - (window - 1), side="left")
+
+    def rolling_sum(values: np.ndarray) -> np.ndarray:
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        return cumulative[rows + 1] - cumulative[start]
+
+    resolution = _ratio(solved, indexable) * 100
+    deal_again_rate = _ratio(deal_again, evaluations) * 100
+
+    # Variações só entre meses consecutivos da mesma empresa.
+    has_previous = np.zeros(len(key), dtype=bool)
+    has_previous[1:] = np.diff(key) == 1
+    previous = np.maximum(rows - 1, 0)
+
+    def delta(values: np.ndarray) -> np.ndarray:
+        return np.where(has_previous, values - values[previous], np.nan)
+
+    # Inclinação por mínimos quadrados na janela: somas móveis de x, y, xy e x² sobre os meses com taxa.
+    valid = ~np.isnan(resolution)
+    x = np.where(valid, month - (month.min() if len(month) else 0), 0).astype(np.float64)
+    y = np.where(valid, resolution, 0.0)
+    n = rolling_sum(valid.astype(np.float64))
+    sum_x, sum_y = rolling_sum(x), rolling_sum(y)
+    sum_xy, sum_xx = rolling_sum(x * y), rolling_sum(x * x)
+    slope = _ratio(n * sum_xy - sum_x * sum_y, np.where(n >= 2, n * sum_xx - sum_x * sum_x, 0.0))
+
+    return {
+        "resolution_rate": resolution,
+        "deal_again_rate": deal_again_rate,
+        "rolling_resolution_rate": _ratio(rolling_sum(solved), rolling_sum(indexable)) * 100,
+        "rolling_deal_again_rate": _ratio(rolling_sum(deal_again), rolling_sum(evaluations)) * 100,
+        "resolution_rate_delta": delta(resolution),
+        "deal_again_rate_delta": delta(deal_again_rate),
+        "complaints_change": np.where(has_previous, _ratio(delta(indexable), indexable[previous]) * 100, np.nan),
+        "resolution_slope": slope,
+    }
+
+
+class SnapshotStore:
+    """
+    Armazém thread-safe dos snapshots mensais de todas as empresas, com persistência opcional em SQLite.
+    As fusões ficam pendentes e só são aplicadas aos arrays na leitura seguinte: uma rajada de
+    coletas custa uma única reordenação.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._company_ids: List[str] = []
+        self._companies: Dict[str, int] = {}
+        # Código 0: sem status.
+        self._statuses: List[Optional[str]] = [None]
+        self._status_codes: Dict[str, int] = {}
+        # Os arrays só são criados na primeira compactação, e o histórico guardado só é lido no primeiro uso
+        # (ou em `load`, no aquecimento): o arranque do serviço não paga nem o NumPy nem a leitura da base.
+        self._columns: Optional[Dict[str, np.ndarray]] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._pending: List[Tuple[int, ...]] = []
+        self._loaded = not db_path
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS index_snapshots (
+                    company_id TEXT NOT NULL,
+                    month INTEGER NOT NULL,
+                    indexable INTEGER NOT NULL,
+                    solved INTEGER NOT NULL,
+                    evaluations INTEGER NOT NULL,
+                    deal_again INTEGER NOT NULL,
+                    status TEXT,
+                    PRIMARY KEY (company_id, month)
+                ) WITHOUT ROWID""")
+
+    def __len__(self) -> int:
+        """Número de empresas com histórico."""
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._company_ids)
+
+    def load(self) -> None:
+        """Lê o histórico guardado e constrói já os arrays, em vez de o fazer no primeiro uso."""
+        with self._lock:
+            self._ensure_loaded()
+            self._compact()
+
+    def merge(self, company_id: str, snapshots: Iterable[EvolutionSnapshotPayload]) -> int:
+        """Funde os snapshots de uma coleta no histórico da empresa (um mês repetido é substituído)."""
+        with self._lock:
+            company = self._company_code(company_id)
+            rows = [(company, snapshot["year"] * 12 + snapshot["month"] - 1, snapshot.get("totalIndexable") or 0,
+                     snapshot.get("totalSolved") or 0, snapshot.get("totalEvaluations") or 0,
+                     snapshot.get("totalDealAgain") or 0, self._status_code(snapshot.get("status")))
+                    for snapshot in snapshots if snapshot.get("year") and snapshot.get("month")]
+            if not rows:
+                return 0
+            self._pending += rows
+            if self._db is not None:
+                self._db.execute("BEGIN")
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO index_snapshots VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(company_id, *row[1:6], self._statuses[row[6]]) for row in rows])
+                self._db.execute("COMMIT")
+            return len(rows)
+
+    def merge_raw(self, company_id: str, body: Any) -> int:
+        """Como `merge`, a partir dos bytes da resposta do indexEvolution."""
+        return self.merge(company_id, _EVOLUTION_ADAPTER.validate_json(body).get("snapshots") or [])
+
+    def columns(self, company_ids: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """As colunas de todas as empresas, ou só das indicadas (continuam ordenadas por empresa e mês)."""
+        with self._lock:
+            self._ensure_loaded()
+            self._compact()
+            if company_ids is None:
+                return dict(self._columns)
+            codes = [self._companies[company_id] for company_id in company_ids if company_id in self._companies]
+            if not codes:
+                return {name: column[:0] for name, column in self._columns.items()}
+            rows = np.concatenate([np.arange(self._offsets[code], self._offsets[code + 1]) for code in sorted(codes)])
+            return {name: column[rows] for name, column in self._columns.items()}
+
+    def trends(self, company_ids: Optional[Sequence[str]] = None, window: int = 6) -> Dict[str, np.ndarray]:
+        """As colunas (das empresas indicadas, ou de todas) mais as tendências de `compute_trends`."""
+        columns = self.columns(company_ids)
+        return {**columns, **compute_trends(columns, window)}
+
+    def company_id(self, code: int) -> str:
+        return self._company_ids[code]
+
+    def status(self, code: int) -> Optional[str]:
+        return self._statuses[code]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # --- Internos (chamados com o lock adquirido) ---
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if self._db is not None:
+            # O histórico guardado fica antes das fusões entretanto pendentes, que são mais recentes.
+            self._pending[:0] = [(self._company_code(company_id), month, *counts, self._status_code(status))
+                                 for company_id, month, *counts, status in self._db.execute("SELECT * FROM index_snapshots")]
+
+    def _company_code(self, company_id: str) -> int:
+        code = self._companies.get(company_id)
+        if code is None:
+            code = self._companies[company_id] = len(self._company_ids)
+            self._company_ids.append(company_id)
+        return code
+
+    def _status_code(self, status: Optional[str]) -> int:
+        if not status:
+            return 0
+        code = self._status_codes.get(status)
+        if code is None:
+            code = self._status_codes[status] = len(self._statuses)
+            self._statuses.append(status)
+        return code
+
+    def _compact(self) -> None:
+        """Aplica as fusões pendentes: junta, reordena por (empresa, mês) e fica com a versão mais recente de cada mês."""
+        if self._columns is None:
+            self._columns = {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+            self._offsets = np.zeros(1, dtype=np.int64)
+        if not self._pending:
+            return
+        pending = np.array(self._pending, dtype=np.int64)
+        self._pending = []
+        merged = {name: np.concatenate([self._columns[name], pending[:, i].astype(dtype)])
+                  for i, (name, dtype) in enumerate(COLUMNS)}
+        # As linhas pendentes vêm depois das existentes (e entre si, pela ordem de chegada): com uma
+        # ordenação estável, a última de cada (empresa, mês) é a mais recente.
+        order = np.lexsort((merged["month"], merged["company"]))
+        merged = {name: column[order] for name, column in merged.items()}
+        key = merged["company"].astype(np.int64) * KEY_STRIDE + merged["month"]
+        keep = np.ones(len(key), dtype=bool)
+        keep[:-1] = key[1:] != key[:-1]
+        self._columns = {name: column[keep] for name, column in merged.items()}
+        self._offsets = np.searchsorted(self._columns["company"], np.arange(len(self._company_ids) + 1))
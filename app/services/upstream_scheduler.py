@@ -0,0 +1,423 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Escalonador central das chamadas ao ReclameAqui.
+Cada host do upstream (www, iosearch, iosite) tem o seu próprio orçamento: um balde de
+tokens que dita o ritmo de pedidos e um limite de concorrência. Ambos são adaptativos
+(AIMD): sobem devagar enquanto as respostas chegam rápidas e bem-sucedidas e caem para
+metade quando aparecem 429, 5xx, timeouts ou latências acima do alvo. Um 429 também
+pausa o host durante o `Retry-After` indicado. As chamadas que não
+cabem no orçamento esperam numa fila justa: cada busca (um "fluxo") é servida à vez,
+para que um lote grande não atrase as buscas individuais que chegam depois.
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, Dict, Hashable, Iterator, List, Optional
+from urllib.parse import urlsplit
+from app.metrics import timed_stage
+
+
+@dataclass(frozen=True)
+class HostLimits:
+    """Parâmetros do orçamento de um host."""
+    rate: float = 50.0                  # teto de pedidos por segundo
+    min_rate: float = 1.0
+    rate_increase: float = 10.0         # pedidos/s ganhos por cada segundo de respostas bem-sucedidas
+    burst: int = 20                     # pedidos que podem sair de uma vez com o balde cheio
+    initial_concurrency: int = 8
+    min_concurrency: int = 1
+    max_concurrency: int = 64
+    latency_target: float = 2.0         # acima disto (em segundos) a resposta conta como sinal de sobrecarga
+    backoff: float = 0.5                # fator da redução multiplicativa
+    cooldown: float = 1.0               # pausa após um 429/503 sem `Retry-After`
+    max_pause: float = 30.0
+
+
+class _Waiter(ABC):
+    """Uma chamada à espera de vez. `wake` só acorda quem espera; a vez é dada por `granted`."""
+    __slots__ = ("granted",)
+
+    def __init__(self):
+        self.granted = False
+
+    @abstractmethod
+    def wake(self) -> None:
+        pass
+
+
+class _ThreadWaiter(_Waiter):
+    __slots__ = ("event",)
+
+    def __init__(self):
+        super().__init__()
+        self.event = threading.Event()
+
+    def wake(self) -> None:
+        self.event.set()
+
+
+class _AsyncWaiter(_Waiter):
+    __slots__ = ("loop", "future")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        super().__init__()
+        self.loop = loop
+        self.future: asyncio.Future = loop.create_future()
+
+    def wake(self) -> None:
+        # Pode ser chamado de outra thread (o escalonador é partilhado pelos serviços síncrono e assíncrono).
+        self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class _HostBudget:
+    """Estado de um host. Todos os métodos são chamados com o lock do escalonador adquirido."""
+
+    def __init__(self, host: str, limits: HostLimits):
+        self.host = host
+        self.limits = limits
+        self.limit = float(limits.initial_concurrency)
+        self.rate = limits.rate
+        self.last_rate_decrease = 0.0
+        self.tokens = float(limits.burst)
+        self.refilled_at = time.monotonic()
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.waiting = 0
+        # Fila justa: um deque de chamadas por fluxo, servidos em round-robin pela ordem do OrderedDict.
+        self.queue: "OrderedDict[Hashable, Deque[_Waiter]]" = OrderedDict()
+        self.latency: Optional[float] = None
+        self.last_decrease = 0.0
+        self.stats = {"granted": 0, "throttled": 0, "errors": 0, "slow": 0}
+
+    def enqueue(self, flow: Hashable, waiter: _Waiter) -> None:
+        self.queue.setdefault(flow, deque()).append(waiter)
+        self.waiting += 1
+
+    def remove(self, flow: Hashable, waiter: _Waiter) -> None:
+        waiters = self.queue.get(flow)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        self.waiting -= 1
+        if not waiters:
+            del self.queue[flow]
+
+    def dispatch(self, now: float, caller: Optional[_Waiter] = None) -> Optional[float]:
+        """
+        Dá a vez às chamadas em espera enquanto houver concorrência e tokens livres.
+        Se a fila parar por falta de tokens (ou por uma pausa), devolve quanto tempo falta e
+        acorda a chamada da frente para que seja ela a voltar a tentar nessa altura.
+        """
+        while self.queue and self.in_flight < int(self.limit):
+            delay = self._token_delay(now)
+            if delay > 0:
+                head = next(iter(self.queue.values()))[0]
+                if head is not caller:
+                    head.wake()
+                return delay
+            flow, waiters = next(iter(self.queue.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                self.queue.move_to_end(flow)
+            else:
+                del self.queue[flow]
+            self.waiting -= 1
+            self.tokens -= 1
+            self.in_flight += 1
+            self.stats["granted"] += 1
+            waiter.granted = True
+            waiter.wake()
+        return None
+
+    def try_acquire(self, now: float) -> bool:
+        """Caminho rápido: sem fila à frente e com orçamento livre, a chamada sai logo."""
+        if self.queue or self.in_flight >= int(self.limit) or self._token_delay(now) > 0:
+            return False
+        self.tokens -= 1
+        self.in_flight += 1
+        self.stats["granted"] += 1
+        return True
+
+    def feedback(self, outcome: str, latency: float, retry_after: Optional[float], now: float) -> None:
+        """Ajusta o orçamento com o resultado de uma chamada (AIMD)."""
+        self.in_flight -= 1
+        limits = self.limits
+        if outcome == "ok":
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            if latency > limits.latency_target:
+                self.stats["slow"] += 1
+                self._decrease(now)
+            else:
+                # Aumento aditivo: cerca de +1 por cada "janela" completa de respostas e,
+                # no ritmo, cerca de `rate_increase` por cada segundo de respostas.
+                self.limit = min(float(limits.max_concurrency), self.limit + 1.0 / self.limit)
+                self.rate = min(limits.rate, self.rate + limits.rate_increase / self.rate)
+        elif outcome == "throttled":
+            self.stats["throttled"] += 1
+            pause = min(retry_after if retry_after is not None else limits.cooldown, limits.max_pause)
+            self.paused_until = max(self.paused_until, now + pause)
+            self._decrease(now)
+            # O upstream limita o ritmo, não só a concorrência. As respostas 429 chegam em rajada,
+            # por isso o ritmo só é reduzido uma vez por segundo.
+            if now - self.last_rate_decrease >= 1.0:
+                self.rate = max(limits.min_rate, self.rate * limits.backoff)
+                self.last_rate_decrease = now
+        elif outcome == "error":
+            self.stats["errors"] += 1
+            self._decrease(now)
+        # "cancelled": a chamada foi abandonada pelo nosso prazo; não diz nada sobre o upstream.
+
+    def _decrease(self, now: float) -> None:
+        # No máximo uma redução por tempo de resposta: as falhas de uma mesma rajada contam uma vez só.
+        if now - self.last_decrease < (self.latency or self.limits.latency_target):
+            return
+        self.limit = max(float(self.limits.min_concurrency), self.limit * self.limits.backoff)
+        self.last_decrease = now
+
+    def _token_delay(self, now: float) -> float:
+        if now < self.paused_until:
+            return self.paused_until - now
+        rate = self.rate
+        self.tokens = min(float(self.limits.burst), self.tokens + (now - self.refilled_at) * rate)
+        self.refilled_at = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / rate
+
+
+class Permit:
+    """
+    A vez de uma chamada, usada como `with scheduler.slot(url, flow) as permit:`.
+    O código chamador entrega a resposta com `permit.observe(resp)`; exceções contam como erro.
+    """
+    __slots__ = ("_scheduler", "_budget", "_start", "_status", "_retry_after")
+
+    def __init__(self, scheduler: "UpstreamScheduler", budget: _HostBudget):
+        self._scheduler = scheduler
+        self._budget = budget
+        self._start = time.monotonic()
+        self._status: Optional[int] = None
+        self._retry_after: Optional[float] = None
+
+    def observe(self, response) -> None:
+        self._status = response.status_code
+        self._retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+
+    @property
+    def retry_after(self) -> Optional[float]:
+        return self._retry_after
+
+    @property
+    def throttled(self) -> bool:
+        """Indica se o upstream recusou a chamada por excesso de pedidos (vale a pena repeti-la)."""
+        return self._outcome(None) == "throttled"
+
+    def _outcome(self, exc_type: Optional[type]) -> str:
+        if exc_type is not None:
+            return "cancelled" if exc_type.__name__ == "CancelledError" else "error"
+        status = self._status
+        if status is None:
+            return "cancelled"
+        if status == 429 or (status >= 500 and self._retry_after is not None):
+            return "throttled"
+        if status >= 500:
+            return "error"
+        # 404 (ex: perfil de uma empresa não verificada) é uma resposta normal do upstream.
+        return "ok"
+
+    def _finish(self, exc_type: Optional[type]) -> None:
+        self._scheduler._release(self._budget, self._outcome(exc_type), time.monotonic() - self._start,
+                                 self._retry_after)
+
+
+class UpstreamScheduler:
+    """
+    Escalonador partilhado por todos os coletores do processo (síncronos e assíncronos).
+    Thread-safe; as chamadas assíncronas podem vir de qualquer event loop.
+    """
+
+    def __init__(self, default_limits: Optional[HostLimits] = None,
+                 host_limits: Optional[Dict[str, HostLimits]] = None):
+        """
+        :param default_limits: orçamento aplicado a cada host sem configuração própria.
+        :param host_limits: orçamentos específicos, por host (ex: `{"iosearch.reclameaqui.com.br": HostLimits(...)}`).
+        """
+        self.default_limits = default_limits or HostLimits()
+        self.host_limits = dict(host_limits or {})
+        self._budgets: Dict[str, _HostBudget] = {}
+        self._lock = threading.Lock()
+        self._flows = itertools.count(1)
+
+    def new_flow(self) -> int:
+        """Identificador de uma busca, usado para repartir a fila de forma justa entre buscas."""
+        return next(self._flows)
+
+    @contextmanager
+    def slot(self, url: str, flow: Hashable, deadline_at: Optional[float] = None) -> Iterator[Permit]:
+        """
+        Espera pela vez de chamar `url` (bloqueando a thread) e mantém-na durante o bloco `with`.
+        Lança `TimeoutError` se a vez não chegar antes de `deadline_at` (em `time.monotonic()`).
+        """
+        budget = self._budget(url)
+        with self._lock:
+            granted = budget.try_acquire(time.monotonic())
+        if not granted:
+            with timed_stage("queue"):
+                self._wait_sync(budget, flow, deadline_at)
+        permit = Permit(self, budget)
+        try:
+            yield permit
+        except BaseException as e:
+            permit._finish(type(e))
+            raise
+        permit._finish(None)
+
+    @asynccontextmanager
+    async def aslot(self, url: str, flow: Hashable, deadline_at: Optional[float] = None) -> AsyncIterator[Permit]:
+        """Versão asyncio de `slot`: a espera não ocupa nenhuma thread."""
+        budget = self._budget(url)
+        with self._lock:
+            granted = budget.try_acquire(time.monotonic())
+        if not granted:
+            with timed_stage("queue"):
+                await self._wait_async(budget, flow, deadline_at)
+        permit = Permit(self, budget)
+        try:
+            yield permit
+        except BaseException as e:
+            permit._finish(type(e))
+            raise
+        permit._finish(None)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Estado atual de cada host (limite, chamadas em curso e em espera, latência média, contadores)."""
+        with self._lock:
+            return {host: {"concurrency_limit": round(budget.limit, 2), "rate": round(budget.rate, 2), "in_flight": budget.in_flight,
+                           "queued": budget.waiting, "latency_seconds": round(budget.latency or 0.0, 4),
+                           **budget.stats}
+                    for host, budget in self._budgets.items()}
+
+    def render_metrics(self) -> List[str]:
+        """Linhas no formato do Prometheus, para o coletor de `/metrics`."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, key, kind, documentation in (
+                ("exposeaqui_upstream_concurrency_limit", "concurrency_limit", "gauge",
+                 "Limite de concorrência adaptativo (AIMD), por host."),
+                ("exposeaqui_upstream_rate", "rate", "gauge", "Ritmo adaptativo (pedidos/s), por host."),
+                ("exposeaqui_upstream_scheduler_in_flight", "in_flight", "gauge",
+                 "Chamadas com vez concedida pelo escalonador, por host."),
+                ("exposeaqui_upstream_queued", "queued", "gauge", "Chamadas à espera de vez, por host."),
+                ("exposeaqui_upstream_throttled_total", "throttled", "counter",
+                 "Respostas 429 (ou 5xx com Retry-After) recebidas, por host.")):
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+            lines += [f'{name}{{host="{host}"}} {values[key]:g}' for host, values in snapshot.items()]
+        return lines
+
+    def _budget(self, url: str) -> _HostBudget:
+        host = urlsplit(url).netloc
+        budget = self._budgets.get(host)
+        if budget is None:
+            with self._lock:
+                budget = self._budgets.get(host)
+                if budget is None:
+                    budget = self._budgets[host] = _HostBudget(host, self.host_limits.get(host, self.default_limits))
+        return budget
+
+    def _wait_sync(self, budget: _HostBudget, flow: Hashable, deadline_at: Optional[float]) -> None:
+        waiter = _ThreadWaiter()
+        with self._lock:
+            budget.enqueue(flow, waiter)
+            delay = budget.dispatch(time.monotonic(), waiter)
+        while not waiter.granted:
+            timeout = self._wait_timeout(delay, deadline_at)
+            if timeout is not None and timeout <= 0:
+                with self._lock:
+                    if waiter.granted:
+                        return
+                    budget.remove(flow, waiter)
+                    budget.dispatch(time.monotonic())
+                raise TimeoutError(f"Prazo esgotado à espera de vez para {budget.host}.")
+            waiter.event.wait(timeout)
+            waiter.event.clear()
+            with self._lock:
+                if waiter.granted:
+                    return
+                delay = budget.dispatch(time.monotonic(), waiter)
+
+    async def _wait_async(self, budget: _HostBudget, flow: Hashable, deadline_at: Optional[float]) -> None:
+        waiter = _AsyncWaiter(asyncio.get_running_loop())
+        with self._lock:
+            budget.enqueue(flow, waiter)
+            delay = budget.dispatch(time.monotonic(), waiter)
+        try:
+            while not waiter.granted:
+                timeout = self._wait_timeout(delay, deadline_at)
+                if timeout is not None and timeout <= 0:
+                    raise TimeoutError(f"Prazo esgotado à espera de vez para {budget.host}.")
+                await asyncio.wait({waiter.future}, timeout=timeout)
+                waiter.future = waiter.loop.create_future()
+                with self._lock:
+                    if waiter.granted:
+                        return
+                    delay = budget.dispatch(time.monotonic(), waiter)
+        except BaseException:
+            # Cancelada ou sem prazo: sai da fila, ou devolve a vez se ela chegou entretanto.
+            with self._lock:
+                if waiter.granted:
+                    budget.feedback("cancelled", 0.0, None, time.monotonic())
+                else:
+                    budget.remove(flow, waiter)
+                budget.dispatch(time.monotonic())
+            raise
+
+    def _release(self, budget: _HostBudget, outcome: str, latency: float, retry_after: Optional[float]) -> None:
+        with self._lock:
+            now = time.monotonic()
+            budget.feedback(outcome, latency, retry_after, now)
+            budget.dispatch(now)
+
+    @staticmethod
+    def _wait_timeout(delay: Optional[float], deadline_at: Optional[float]) -> Optional[float]:
+        if deadline_at is None:
+            return delay
+        remaining = deadline_at - time.monotonic()
+        return remaining if delay is None else min(delay, remaining)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    # Só a forma em segundos; a forma com data é rara nestas APIs e cai no `cooldown` por omissão.
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
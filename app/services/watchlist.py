@@ -0,0 +1,325 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Lista de vigilância e atualização em segundo plano.
+As empresas da lista (id e shortname, cada uma com o seu intervalo de atualização) são
+coletadas de novo por um pool de workers assíncronos assim que vencem, e o resultado
+fica na cache de dossiês, de onde `/search` o serve de imediato. Quando há mais entradas
+vencidas do que workers, passam à frente as mais atrasadas (em relação ao seu intervalo)
+e as mais pedidas.
+"""
+
+import asyncio
+import heapq
+import math
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from .admission import Overloaded
+
+# Intervalo, em segundos, entre duas tentativas de uma entrada cuja atualização falhou.
+RETRY_INTERVAL = 60.0
+# Meia-vida, em segundos, da popularidade de uma entrada (número de pedidos recentes).
+POPULARITY_HALF_LIFE = 3600.0
+
+
+@dataclass
+class WatchlistEntry:
+    """Uma empresa vigiada e o estado da sua última atualização."""
+    company_id: str
+    shortname: str
+    interval: float
+    added_at: float
+    last_refreshed_at: Optional[float] = None
+    last_error: Optional[str] = None
+    # Momento em que a entrada vence; não é persistido (deriva da última atualização).
+    next_due: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class Watchlist:
+    """Lista de empresas vigiadas, thread-safe, em memória com persistência opcional em SQLite."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self._entries: Dict[str, WatchlistEntry] = {}
+        # Popularidade de cada entrada: (pontuação, momento da última atualização da pontuação).
+        self._popularity: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS watchlist (
+                    company_id TEXT PRIMARY KEY,
+                    shortname TEXT NOT NULL,
+                    interval REAL NOT NULL,
+                    added_at REAL NOT NULL,
+                    last_refreshed_at REAL,
+                    last_error TEXT
+                )""")
+            now = time.time()
+            for row in self._db.execute("SELECT company_id, shortname, interval, added_at, last_refreshed_at, "
+                                        "last_error FROM watchlist"):
+                entry = WatchlistEntry(*row)
+                entry.next_due = entry.last_refreshed_at + entry.interval if entry.last_refreshed_at else now
+                self._entries[entry.company_id] = entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, company_id: str) -> bool:
+        return company_id in self._entries
+
+    def get(self, company_id: str) -> Optional[WatchlistEntry]:
+        return self._entries.get(company_id)
+
+    def entries(self) -> List[WatchlistEntry]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def add(self, company_id: str, shortname: str, interval: float) -> WatchlistEntry:
+        """Acrescenta (ou atualiza o intervalo de) uma empresa. Uma empresa nova vence de imediato."""
+        with self._lock:
+            entry = self._entries.get(company_id)
+            if entry is None:
+                entry = WatchlistEntry(company_id=company_id, shortname=shortname, interval=interval,
+                                       added_at=time.time())
+                entry.next_due = entry.added_at
+                self._entries[company_id] = entry
+            else:
+                entry.shortname = shortname
+                entry.interval = interval
+                if entry.last_refreshed_at is not None:
+                    entry.next_due = entry.last_refreshed_at + interval
+            self._save(entry)
+            return entry
+
+    def remove(self, company_id: str) -> Optional[WatchlistEntry]:
+        with self._lock:
+            entry = self._entries.pop(company_id, None)
+            self._popularity.pop(company_id, None)
+            if entry is not None and self._db is not None:
+                self._db.execute("DELETE FROM watchlist WHERE company_id = ?", (company_id,))
+            return entry
+
+    def record_request(self, company_id: str) -> None:
+        """Conta um pedido a uma empresa vigiada (as restantes são ignoradas)."""
+        if company_id not in self._entries:
+            return
+        now = time.time()
+        with self._lock:
+            self._popularity[company_id] = (self._decayed_popularity(company_id, now) + 1, now)
+
+    def popularity(self, company_id: str, now: Optional[float] = None) -> float:
+        with self._lock:
+            return self._decayed_popularity(company_id, now or time.time())
+
+    def record_refresh(self, company_id: str, error: Optional[str] = None) -> Optional[WatchlistEntry]:
+        """Regista o fim de uma atualização e calcula o próximo vencimento da entrada."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(company_id)
+            if entry is None:
+                return None
+            entry.last_error = error
+            if error is None:
+                entry.last_refreshed_at = now
+                entry.next_due = now + entry.interval
+            else:
+                entry.next_due = now + min(entry.interval, RETRY_INTERVAL)
+            self._save(entry)
+            return entry
+
+    def postpone(self, company_id: str, delay: float) -> Optional[WatchlistEntry]:
+        """Adia o vencimento de uma entrada sem registar uma atualização (ex: o serviço estava sobrecarregado)."""
+        with self._lock:
+            entry = self._entries.get(company_id)
+            if entry is not None:
+                entry.next_due = time.time() + delay
+            return entry
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # --- Internos (chamados com o lock adquirido) ---
+
+    def _decayed_popularity(self, company_id: str, now: float) -> float:
+        score, updated_at = self._popularity.get(company_id, (0.0, now))
+        return score * 0.5 ** ((now - updated_at) / POPULARITY_HALF_LIFE)
+
+    def _save(self, entry: WatchlistEntry) -> None:
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO watchlist (company_id, shortname, interval, added_at, last_refreshed_at, "
+                "last_error) VALUES (?, ?, ?, ?, ?, ?)",
+                (entry.company_id, entry.shortname, entry.interval, entry.added_at, entry.last_refreshed_at,
+                 entry.last_error))
+
+
+class WatchlistRefresher:
+    """
+    Pool de workers asyncio que atualiza as entradas vencidas da `Watchlist`.
+    As entradas esperam num heap ordenado pelo vencimento; as vencidas passam para o backlog,
+    de onde cada worker tira a de maior prioridade: atraso relativo ao intervalo da entrada,
+    multiplicado por `1 + log(1 + popularidade)`.
+    """
+
+    def __init__(self, watchlist: Watchlist, refresh: Callable[[str], Awaitable[Any]], workers: int = 4):
+        """
+        :param refresh: a coleta de uma empresa, a partir do seu shortname; o resultado deve ficar
+            onde `/search` o encontra (ver `AsyncSearchService.refresh_company`). Um `Overloaded`
+            salta este ciclo: a entrada volta a vencer após o `retry_after`, sem contar como falha.
+        :param workers: número de atualizações em simultâneo.
+        """
+        self.watchlist = watchlist
+        self.refresh = refresh
+        self.workers = workers
+        self._heap: List[Tuple[float, str]] = []
+        self._backlog: Set[str] = set()
+        self._in_flight: Set[str] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self.stats: Dict[str, int] = {"refreshed": 0, "failed": 0, "skipped": 0}
+
+    def start(self) -> None:
+        """Arranca os workers (dentro do event loop do servidor)."""
+        self._wakeup = asyncio.Event()
+        for entry in self.watchlist.entries():
+            heapq.heappush(self._heap, (entry.next_due, entry.company_id))
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def schedule(self, entry: WatchlistEntry) -> None:
+        """Agenda (ou reagenda) uma entrada acrescentada ou alterada depois do arranque."""
+        heapq.heappush(self._heap, (entry.next_due, entry.company_id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Tamanho da lista, backlog (entradas vencidas à espera de um worker) e atraso."""
+        now = time.time()
+        # Não mexe no heap: também é chamado fora do event loop (ex: pela rota `/metrics`).
+        lags = [now - entry.next_due for entry in self.watchlist.entries()
+                if entry.next_due <= now and entry.company_id not in self._in_flight]
+        return {
+            "entries": len(self.watchlist),
+            "workers": self.workers,
+            "backlog": len(lags),
+            "inFlight": len(self._in_flight),
+            "maxLagSeconds": round(max(lags, default=0.0), 3),
+            "meanLagSeconds": round(sum(lags) / len(lags), 3) if lags else 0.0,
+            **self.stats,
+        }
+
+    def render_metrics(self) -> List[str]:
+        """O estado do pool no formato de texto do Prometheus (ver `app.metrics.Registry`)."""
+        snapshot = self.snapshot()
+        return [
+            "# HELP exposeaqui_watchlist_entries Empresas na lista de vigilância.",
+            "# TYPE exposeaqui_watchlist_entries gauge",
+            f"exposeaqui_watchlist_entries {snapshot['entries']}",
+            "# HELP exposeaqui_watchlist_backlog Entradas vencidas à espera de um worker.",
+            "# TYPE exposeaqui_watchlist_backlog gauge",
+            f"exposeaqui_watchlist_backlog {snapshot['backlog']}",
+            "# HELP exposeaqui_watchlist_lag_seconds Maior atraso de uma entrada vencida em relação ao seu vencimento.",
+            "# TYPE exposeaqui_watchlist_lag_seconds gauge",
+            f"exposeaqui_watchlist_lag_seconds {snapshot['maxLagSeconds']}",
+            "# HELP exposeaqui_watchlist_refreshes_total Atualizações feitas pelo pool, por resultado.",
+            "# TYPE exposeaqui_watchlist_refreshes_total counter",
+            f'exposeaqui_watchlist_refreshes_total{{outcome="ok"}} {snapshot["refreshed"]}',
+            f'exposeaqui_watchlist_refreshes_total{{outcome="error"}} {snapshot["failed"]}',
+            f'exposeaqui_watchlist_refreshes_total{{outcome="skipped"}} {snapshot["skipped"]}',
+        ]
+
+    # --- Internos ---
+
+    def _promote_due(self, now: float) -> None:
+        """Passa para o backlog as entradas do heap já vencidas (descartando as removidas ou reagendadas)."""
+        while self._heap and self._heap[0][0] <= now:
+            next_due, company_id = heapq.heappop(self._heap)
+            entry = self.watchlist.get(company_id)
+            if entry is None or entry.next_due != next_due or company_id in self._in_flight:
+                continue
+            self._backlog.add(company_id)
+
+    def _priority(self, entry: WatchlistEntry, now: float) -> float:
+        staleness = (now - entry.next_due + entry.interval) / entry.interval
+        return staleness * (1 + math.log1p(self.watchlist.popularity(entry.company_id, now)))
+
+    async def _take(self) -> WatchlistEntry:
+        """Espera por uma entrada vencida e devolve a de maior prioridade."""
+        while True:
+            now = time.time()
+            self._promote_due(now)
+            candidates = [entry for entry in map(self.watchlist.get, self._backlog) if entry is not None]
+            self._backlog.intersection_update(entry.company_id for entry in candidates)
+            if candidates:
+                entry = max(candidates, key=lambda candidate: self._priority(candidate, now))
+                self._backlog.discard(entry.company_id)
+                return entry
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self) -> None:
+        while True:
+            entry = await self._take()
+            self._in_flight.add(entry.company_id)
+            error = None
+            try:
+                await self.refresh(entry.shortname)
+                self.stats["refreshed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Overloaded as e:
+                # O serviço recusou a coleta: as buscas interativas têm a vez, tentamos no próximo ciclo.
+                self.stats["skipped"] += 1
+                postponed = self.watchlist.postpone(entry.company_id, e.retry_after)
+                if postponed is not None:
+                    self.schedule(postponed)
+                continue
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                self.stats["failed"] += 1
+                print(f"WARN:     Falha ao atualizar a empresa vigiada {entry.shortname}: {error}")
+            finally:
+                self._in_flight.discard(entry.company_id)
+            # Gravar o resultado é um commit em SQLite: numa thread, fora do event loop.
+            updated = await asyncio.to_thread(self.watchlist.record_refresh, entry.company_id, error)
+            if updated is not None:
+                self.schedule(updated)
@@ -0,0 +1,127 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Microbenchmark do caminho de parse/validação/serialização de um dossiê.
+Compara, para payloads de `indexEvolution` de vários tamanhos, o caminho antigo
+(texto -> json.loads -> model_validate peça a peça -> validação e serialização da
+resposta pelo FastAPI) com o caminho atual (bytes -> TypeAdapters pré-compilados
+-> bytes finais), e mostra o tempo de CPU poupado por dossiê.
+
+Uso:
+    python -m benchmarks.bench_dossie_parsing [--iterations 200]
+"""
+
+import argparse
+import json
+import time
+from pydantic import TypeAdapter
+from app.dtos import CompanyDTO, DossieEmpresaDTO, ProblemInfoDTO
+from app.services.analysis_strategy import DossieGenerator
+
+_RESPONSE_ADAPTER = TypeAdapter(DossieEmpresaDTO)
+
+
+def build_payloads(snapshots: int):
+    """Monta um conjunto de respostas brutas sintéticas, no formato das APIs do ReclameAqui."""
+    company = {"id": "42", "companyName": "Empresa Exemplo LTDA", "fantasyName": "Empresa Exemplo",
+               "shortname": "empresa-exemplo", "status": "ACTIVE", "documents": ["12345678000190"]}
+    profile = {
+        "id": "42", "companyName": "Empresa Exemplo LTDA", "fantasyName": "Empresa Exemplo",
+        "created": "2010-01-01", "address": {"city": "São Paulo", "state": "SP"},
+        "documents": [{"number": "12345678000190"}], "urlSite": "https://exemplo.com.br",
+        "mainSegment": {"title": "Varejo"}, "secondarySegments": [{"title": "E-commerce"}],
+        "status": "ACTIVE", "companyPageFlags": {"hasVerificada": True, "configurationType": "PRO"},
+        "panels": [{"index": {"type": t, "status": "BOM", "finalScore": 7.9, "totalComplains": 1000,
+                              "solvedPercentual": 91.2, "dealAgainPercentual": 70.1}}
+                   for t in ("SIX_MONTHS", "TWELVE_MONTHS", "LAST_YEAR", "FULL")],
+    }
+    problems = {"complainResult": {"complains": {"problems": [{"name": f"Problema {i}", "count": 500 - i}
+                                                              for i in range(30)]}}}
+    evolution = {"snapshots": [{"year": 2000 + i // 12, "month": i % 12 + 1, "totalIndexable": 1000 + i,
+                                "totalSolved": 900 + i, "totalEvaluations": 600, "totalDealAgain": 400,
+                                "finalScore": 7.5, "status": "BOM"} for i in range(snapshots)]}
+    raw = {"profile": profile, "mainProblems": problems, "problems6Months": problems, "indexEvolution": evolution}
+    return company, {key: json.dumps(value).encode() for key, value in raw.items()}
+
+
+def legacy_path(generator: DossieGenerator, company: CompanyDTO, raw_bytes) -> bytes:
+    """O fluxo anterior: JSON de ida e volta para a empresa, texto + json.loads e validação peça a peça."""
+    initial_data = CompanyDTO.model_validate_json(company.model_dump_json(by_alias=True))
+    sections = {key: json.loads(value.decode()) for key, value in raw_bytes.items()}
+    # O histórico só usava (e validava) os cinco primeiros problemas.
+    for key, used in (("mainProblems", 5), ("problems6Months", None)):
+        complains = sections[key]["complainResult"]["complains"]
+        complains["problems"] = [ProblemInfoDTO.model_validate(p) for p in complains["problems"][:used]]
+    dossie = generator._generate_dossie(initial_data, sections["profile"], sections["mainProblems"],
+                                        sections["problems6Months"], sections["indexEvolution"])
+    # O que o FastAPI fazia com o `response_model`: validar de novo, converter para tipos JSON e serializar.
+    validated = _RESPONSE_ADAPTER.validate_python(dossie)
+    return json.dumps(_RESPONSE_ADAPTER.dump_python(validated, mode="json", by_alias=True),
+                      ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def current_path(generator: DossieGenerator, company: CompanyDTO, raw_bytes) -> bytes:
+    return generator.serialize(generator.generate(company, raw_bytes))
+
+
+def check_unused_malformed_problem(generator: DossieGenerator) -> None:
+    """Um problema malformado que o dossiê não usa (depois do quinto, no histórico) não pode deitar fora a secção."""
+    company_json, raw_bytes = build_payloads(12)
+    problems = json.loads(raw_bytes["mainProblems"])
+    problems["complainResult"]["complains"]["problems"][10] = {"name": None}
+    raw_bytes["mainProblems"] = json.dumps(problems).encode()
+    dossie = generator.generate(CompanyDTO.model_validate(company_json), raw_bytes)
+    assert [p.nome for p in dossie.principais_problemas_historico] == [f"Problema {i}" for i in range(5)], \
+        "O histórico deve manter os cinco primeiros problemas."
+
+
+def cpu_per_call(fn, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    generator = DossieGenerator()
+    check_unused_malformed_problem(generator)
+    print(f"{'snapshots':>10} {'payload':>10} {'antigo (ms)':>12} {'atual (ms)':>12} {'poupado (ms)':>13} {'ganho':>7}")
+    for snapshots in (12, 120, 1200, 6000):
+        company_json, raw_bytes = build_payloads(snapshots)
+        company = CompanyDTO.model_validate(company_json)
+        assert json.loads(legacy_path(generator, company, raw_bytes)) == json.loads(
+            current_path(generator, company, raw_bytes)), "Os dois caminhos devem produzir o mesmo dossiê."
+
+        iterations = max(args.iterations * 12 // snapshots, 5) if snapshots > 120 else args.iterations
+        legacy = cpu_per_call(lambda: legacy_path(generator, company, raw_bytes), iterations)
+        current = cpu_per_call(lambda: current_path(generator, company, raw_bytes), iterations)
+        size = sum(len(value) for value in raw_bytes.values())
+        print(f"{snapshots:>10} {size / 1024:>8.0f}KB {legacy * 1000:>12.3f} {current * 1000:>12.3f} "
+              f"{(legacy - current) * 1000:>13.3f} {legacy / current:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
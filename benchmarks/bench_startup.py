@@ -0,0 +1,162 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Benchmark do arranque a frio.
+Mede, em processos novos e com bases de dados vazias, o tempo de `import app.main` e o tempo
+até à primeira resposta de `/search`: desde o lançamento do uvicorn até a API responder em `/`
+(imports e arranque do lifespan) e, a seguir, a duração dessa primeira busca (sessão, aquecimento
+e coleta no servidor stand-in). Os resultados ficam em `benchmarks/results/` e são comparados com
+a execução anterior.
+
+Uso:
+    python -m benchmarks.bench_startup --runs 5 --latency-ms 40
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.run_replay import RESULTS_DIR, free_port, git_revision, start_process
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def import_time(env: Dict[str, str]) -> float:
+    """Segundos de `import app.main` num interpretador novo."""
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], env={**os.environ, **env}, check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def first_search(env: Dict[str, str], term: str) -> Dict[str, float]:
+    """Lança a API e mede o tempo até responder em `/` e a duração da primeira `/search/{term}`."""
+    from curl_cffi import requests
+
+    port = free_port()
+    api_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                                "--log-level", "warning", "--no-access-log"], env={**os.environ, **env},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError("A API terminou antes de ficar pronta.")
+            try:
+                requests.get(f"{api_url}/", timeout=1)
+                break
+            except Exception:
+                time.sleep(0.005)
+            if time.perf_counter() - started > 60:
+                raise RuntimeError("A API não respondeu em 60s.")
+        ready = time.perf_counter()
+        response = requests.get(f"{api_url}/search/{term}", timeout=60)
+        response.raise_for_status()
+        done = time.perf_counter()
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return {"ready_ms": (ready - started) * 1000, "first_search_ms": (done - ready) * 1000,
+            "time_to_first_search_ms": (done - started) * 1000}
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {"median": round(statistics.median(samples), 1), "min": round(min(samples), 1),
+            "max": round(max(samples), 1)}
+
+
+def print_report(result: Dict, previous: Dict) -> None:
+    print(f"\n{'métrica (mediana)':<28} {'atual':>10} {'anterior':>10} {'variação':>10}")
+    for key in ("import_ms", "ready_ms", "first_search_ms", "time_to_first_search_ms"):
+        current = result["startup"][key]["median"]
+        before = (previous or {}).get("startup", {}).get(key, {}).get("median")
+        delta = f"{(current - before) / before * 100:+.1f}%" if before else "-"
+        print(f"{key:<28} {current:>10} {before if before is not None else '-':>10} {delta:>10}")
+    if previous:
+        print(f"(comparado com {previous.get('timestamp')} @ {previous.get('git_revision')})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="arranques medidos (cada um num processo novo)")
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="latência média do stand-in")
+    parser.add_argument("--label", default="", help="etiqueta livre guardada com os resultados")
+    parser.add_argument("--compare", default=None, help="ficheiro de resultados a usar como referência")
+    parser.add_argument("--no-save", action="store_true", help="não gravar os resultados")
+    args = parser.parse_args()
+
+    standin_port = free_port()
+    standin_url = f"http://127.0.0.1:{standin_port}"
+    standin = start_process(["-m", "benchmarks.standin_server", "--port", str(standin_port),
+                             "--latency-ms", str(args.latency_ms), "--jitter-ms", "0"], {}, standin_url)
+    samples: Dict[str, List[float]] = {"import_ms": [], "ready_ms": [], "first_search_ms": [],
+                                       "time_to_first_search_ms": []}
+    try:
+        for run in range(args.runs):
+            # Cada arranque começa sem cache, sem índice e sem lista de vigilância, como um contentor novo.
+            with tempfile.TemporaryDirectory(prefix="exposeaqui-startup-") as workdir:
+                env = {
+                    "EXPOSEAQUI_BASE_URL": standin_url,
+                    "EXPOSEAQUI_API_SEARCH_URL": f"{standin_url}/search",
+                    "EXPOSEAQUI_API_SITE_URL": f"{standin_url}/site",
+                    **{f"EXPOSEAQUI_{name}_DB": str(Path(workdir) / f"{name.lower()}.db")
+                       for name in ("CACHE", "INDEX", "WATCHLIST", "SNAPSHOTS")},
+                }
+                samples["import_ms"].append(import_time(env) * 1000)
+                for key, value in first_search(env, f"{run + 1:014d}").items():
+                    samples[key].append(value)
+    finally:
+        standin.terminate()
+        standin.wait(timeout=10)
+
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "label": args.label,
+        "python": sys.version.split()[0],
+        "config": {"runs": args.runs, "latency_ms": args.latency_ms},
+        "startup": {key: summarize(values) for key, values in samples.items()},
+    }
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text("utf-8"))
+    else:
+        runs = sorted(RESULTS_DIR.glob("startup-*.json"))
+        previous = json.loads(runs[-1].read_text("utf-8")) if runs else None
+    print_report(result, previous)
+
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        path = RESULTS_DIR / f"startup-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        path.write_text(json.dumps(result, indent=2), "utf-8")
+        print(f"INFO:     Resultados gravados em {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+"""
+Microbenchmark das tendências do histórico de reputação.
+Mede o cálculo vetorial de `compute_trends` sobre milhares de empresas de uma só vez e
+compara-o com um cálculo equivalente, empresa a empresa e mês a mês, em Python puro.
+
+Uso:
+    python -m benchmarks.bench_trends [--companies 5000 --months 24 --window 6]
+"""
+
+import argparse
+import math
+import random
+import time
+import numpy as np
+from app.services.snapshot_store import SnapshotStore, compute_trends
+
+
+def build_store(companies: int, months: int) -> SnapshotStore:
+    """Um armazém em memória com `months` meses de histórico sintético para cada empresa."""
+    rng = random.Random(42)
+    store = SnapshotStore()
+    for company in range(companies):
+        snapshots = []
+        for i in range(months):
+            indexable = rng.randint(0, 4000)
+            evaluations = rng.randint(0, indexable)
+            snapshots.append({"year": 2020 + i // 12, "month": i % 12 + 1, "totalIndexable": indexable,
+                              "totalSolved": rng.randint(0, indexable), "totalEvaluations": evaluations,
+                              "totalDealAgain": rng.randint(0, evaluations), "status": "GOOD"})
+        store.merge(str(company), snapshots)
+    return store
+
+
+def python_rolling_resolution(columns, window: int):
+    """Taxa de resolução móvel, linha a linha, como seria sem NumPy."""
+    company, month = columns["company"].tolist(), columns["month"].tolist()
+    solved, indexable = columns["solved"].tolist(), columns["indexable"].tolist()
+    result = []
+    for i in range(len(month)):
+        total_solved = total_indexable = 0
+        j = i
+        while j >= 0 and company[j] == company[i] and month[j] > month[i] - window:
+            total_solved += solved[j]
+            total_indexable += indexable[j]
+            j -= 1
+        result.append(total_solved / total_indexable * 100 if total_indexable else math.nan)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--companies", type=int, default=5000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--window", type=int, default=6)
+    args = parser.parse_args()
+
+    store = build_store(args.companies, args.months)
+    columns = store.columns()
+
+    start = time.perf_counter()
+    trends = compute_trends(columns, args.window)
+    vectorized = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = python_rolling_resolution(columns, args.window)
+    python = time.perf_counter() - start
+    assert np.allclose(trends["rolling_resolution_rate"], expected, equal_nan=True), \
+        "O cálculo vetorial deve coincidir com o cálculo linha a linha."
+
+    rows = len(columns["month"])
+    print(f"{args.companies} empresas, {rows} linhas, janela de {args.window} meses")
+    print(f"  vetorial (todas as tendências): {vectorized * 1000:9.2f} ms")
+    print(f"  python (só a taxa móvel):       {python * 1000:9.2f} ms  ({python / vectorized:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
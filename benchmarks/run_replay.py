@@ -0,0 +1,282 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Benchmark de replay offline.
+Arranca o servidor stand-in do ReclameAqui (`benchmarks/standin_server.py`) e a API
+num servidor uvicorn local apontado para ele, dispara `/search` com a concorrência
+pedida e mede p50/p95/p99 e requisições por segundo. Mede também o débito isolado do
+`DossieGenerator.generate` para empresas verificadas (com perfil) e não verificadas
+(só indexEvolution). Os resultados ficam em `benchmarks/results/` e são comparados
+com a execução anterior.
+
+Uso:
+    python -m benchmarks.run_replay --requests 2000 --concurrency 64 --latency-ms 40 --jitter-ms 15
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.standin_server import load_fixtures, render_fixture
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    from curl_cffi import requests
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"O processo {process.args} terminou antes de ficar pronto.")
+        try:
+            requests.get(url, timeout=1)
+            return
+        except Exception:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} não respondeu em {timeout:.0f}s.")
+
+
+def start_process(args: List[str], env: Dict[str, str], ready_url: str) -> subprocess.Popen:
+    """Arranca um processo filho (silenciado) e espera que responda em `ready_url`."""
+    process = subprocess.Popen([sys.executable, *args], env={**os.environ, **env},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(ready_url, process)
+    except Exception:
+        process.kill()
+        raise
+    return process
+
+
+async def load_search(api_url: str, terms: List[str], concurrency: int) -> Dict:
+    """Dispara `/search/{term}` para cada termo, com no máximo `concurrency` requisições em curso."""
+    from curl_cffi import requests
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    complete = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for term in terms:
+        queue.put_nowait(term)
+
+    async def worker(session):
+        nonlocal complete
+        while True:
+            try:
+                term = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                response = await session.get(f"{api_url}/search/{term}", timeout=60)
+                status = str(response.status_code)
+                if response.status_code == 200 and is_complete(response.json()):
+                    complete += 1
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    async with requests.AsyncSession(max_clients=concurrency) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(session) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(terms),
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(terms) / elapsed, 1),
+        "complete_per_s": round(complete / elapsed, 1),
+        "complete_ratio": round(complete / len(terms), 4),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "statuses": statuses,
+    }
+
+
+def is_complete(dossie: Dict) -> bool:
+    """Um dossiê está completo quando todas as secções do upstream chegaram (o perfil só existe nas verificadas)."""
+    return all(dossie.get(key) is not None for key in
+               ("reputacaoPorPeriodo", "principaisProblemasHistorico", "principaisProblemas6Meses",
+                "evolucaoMensalDetalhada"))
+
+
+def generator_throughput(seconds: float) -> Dict[str, float]:
+    """Dossiês por segundo do `DossieGenerator.generate`, sem rede, para os dois tipos de empresa."""
+    from app.dtos import CompanyDTO
+    from app.services.analysis_strategy import DossieGenerator
+
+    generator = DossieGenerator()
+    fixtures = load_fixtures()
+    results = {}
+    for kind, company_id in (("verified", 42), ("unverified", 43)):
+        sections = {section: render_fixture(template, company_id) for section, template in fixtures[kind].items()}
+        company = CompanyDTO.model_validate(json.loads(sections.pop("search"))["companies"][0])
+        raw_data = {section: body.encode("utf-8") for section, body in sections.items()}
+
+        count = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while time.perf_counter() < deadline:
+            generator.generate(company, raw_data)
+            count += 1
+        results[f"{kind}_per_s"] = round(count / (time.perf_counter() - start), 1)
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def previous_result(compare: Optional[str]) -> Optional[Dict]:
+    if compare:
+        return json.loads(Path(compare).read_text("utf-8"))
+    runs = sorted(RESULTS_DIR.glob("replay-*.json"))
+    return json.loads(runs[-1].read_text("utf-8")) if runs else None
+
+
+def print_report(result: Dict, previous: Optional[Dict]) -> None:
+    rows = [("search", key) for key in ("rps", "complete_per_s", "complete_ratio", "p50_ms", "p95_ms", "p99_ms", "mean_ms")]
+    rows += [("generator", key) for key in ("verified_per_s", "unverified_per_s")]
+    print(f"\n{'métrica':<28} {'atual':>12} {'anterior':>12} {'variação':>10}")
+    for group, key in rows:
+        current = result[group].get(key)
+        if current is None:
+            continue
+        before = (previous or {}).get(group, {}).get(key)
+        delta = f"{(current - before) / before * 100:+.1f}%" if before else "-"
+        print(f"{group + '.' + key:<28} {current:>12} {before if before is not None else '-':>12} {delta:>10}")
+    print(f"{'search.statuses':<28} {json.dumps(result['search']['statuses'])}")
+    if previous:
+        print(f"(comparado com {previous.get('timestamp')} @ {previous.get('git_revision')})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="número de requisições a /search")
+    parser.add_argument("--concurrency", type=int, default=32, help="requisições /search em simultâneo")
+    parser.add_argument("--distinct", type=int, default=None,
+                        help="empresas distintas entre os termos (por omissão, todas distintas: sem acertos de cache)")
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="latência média do stand-in")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="variação (+/-) da latência do stand-in")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de respostas de erro do stand-in")
+    parser.add_argument("--max-rps", type=float, default=0.0,
+                        help="limite de pedidos/s do stand-in, acima do qual responde 429 (0 = sem limite)")
+    parser.add_argument("--hang-section", default=None,
+                        help="secção que o stand-in deixa pendurada (ex: problems6Months), para medir os disjuntores")
+    parser.add_argument("--upstream-rate", type=float, default=1000.0,
+                        help="pedidos/s por host no escalonador da API (o stand-in junta os três hosts num só)")
+    parser.add_argument("--generator-seconds", type=float, default=2.0, help="duração de cada medição do gerador")
+    parser.add_argument("--label", default="", help="etiqueta livre guardada com os resultados")
+    parser.add_argument("--compare", default=None, help="ficheiro de resultados a usar como referência")
+    parser.add_argument("--no-save", action="store_true", help="não gravar os resultados")
+    args = parser.parse_args()
+
+    # O stand-in, a API e o gerador de carga correm em processos separados, para não disputarem o GIL.
+    standin_port, api_port = free_port(), free_port()
+    standin_url = f"http://127.0.0.1:{standin_port}"
+    standin = start_process(["-m", "benchmarks.standin_server", "--port", str(standin_port),
+                             "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+                             "--error-rate", str(args.error_rate), "--max-rps", str(args.max_rps)]
+                            + (["--hang-section", args.hang_section] if args.hang_section else []), {}, standin_url)
+    workdir = tempfile.TemporaryDirectory(prefix="exposeaqui-bench-")
+    api_env = {
+        "EXPOSEAQUI_BASE_URL": standin_url,
+        "EXPOSEAQUI_API_SEARCH_URL": f"{standin_url}/search",
+        "EXPOSEAQUI_API_SITE_URL": f"{standin_url}/site",
+        "EXPOSEAQUI_CACHE_DB": str(Path(workdir.name) / "cache.db"),
+        "EXPOSEAQUI_INDEX_DB": str(Path(workdir.name) / "index.db"),
+        "EXPOSEAQUI_UPSTREAM_RATE": str(args.upstream_rate),
+        "EXPOSEAQUI_UPSTREAM_BURST": str(max(20, int(args.upstream_rate // 10))),
+    }
+
+    distinct = args.distinct or args.requests
+    terms = [f"{(i % distinct) + 1:014d}" for i in range(args.requests)]
+    print(f"INFO:     {args.requests} buscas, concorrência {args.concurrency}, {distinct} empresas distintas; "
+          f"stand-in com {args.latency_ms}±{args.jitter_ms} ms e {args.error_rate:.1%} de erros.")
+
+    try:
+        api = start_process(["-m", "uvicorn", "app.main:app", "--port", str(api_port), "--log-level", "warning",
+                             "--no-access-log"], api_env, f"http://127.0.0.1:{api_port}/")
+        try:
+            search = asyncio.run(load_search(f"http://127.0.0.1:{api_port}", terms, args.concurrency))
+        finally:
+            api.terminate()
+            api.wait(timeout=10)
+    finally:
+        standin.terminate()
+        standin.wait(timeout=10)
+        workdir.cleanup()
+
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "label": args.label,
+        "python": sys.version.split()[0],
+        "config": {key: getattr(args, key) for key in ("requests", "concurrency", "latency_ms", "jitter_ms",
+                                                       "error_rate", "max_rps", "hang_section", "upstream_rate",
+                                                       "generator_seconds")} | {"distinct": distinct},
+        "search": search,
+        "generator": generator_throughput(args.generator_seconds),
+    }
+    previous = previous_result(args.compare)
+    print_report(result, previous)
+
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        path = RESULTS_DIR / f"replay-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        path.write_text(json.dumps(result, indent=2), "utf-8")
+        print(f"INFO:     Resultados gravados em {path}")
+
+
+if __name__ == "__main__":
+    main()
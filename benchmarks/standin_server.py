@@ -0,0 +1,239 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+
+"""
+Servidor local que faz as vezes do ReclameAqui nos benchmarks.
+Serve as respostas gravadas em `benchmarks/fixtures/` nas mesmas rotas das APIs reais
+(busca, perfil, problemas e indexEvolution), com latência, jitter e injeção de erros
+configuráveis, uma secção que pode ficar "pendurada" (para simular uma API degradada),
+e um limite opcional de pedidos por segundo acima do qual responde
+429 com `Retry-After`, como o upstream faz sob carga. As empresas com id par são "verificadas" (têm perfil); as de id ímpar
+não têm perfil e só devolvem os dados de evolução.
+
+Uso isolado:
+    python -m benchmarks.standin_server --port 9100 --latency-ms 40 --jitter-ms 15 --error-rate 0.01
+e depois arranque a API com:
+    EXPOSEAQUI_BASE_URL=http://127.0.0.1:9100 \\
+    EXPOSEAQUI_API_SEARCH_URL=http://127.0.0.1:9100/search \\
+    EXPOSEAQUI_API_SITE_URL=http://127.0.0.1:9100/site \\
+    uvicorn app.main:app
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# Rota -> (secção da fixture, grupo da expressão que identifica a empresa).
+ROUTES = [
+    (re.compile(r"^/search/companies/modern-search/(?P<key>[^/?]+)"), "search"),
+    (re.compile(r"^/site/company/shortname/(?P<key>[^/?]+)"), "profile"),
+    (re.compile(r"^/search/query/companyMainProblems/(?P<key>[^/?]+)"), "mainProblems"),
+    (re.compile(r"^/search/query/companyPerformanceProblems6Months/(?P<key>[^/?]+)"), "problems6Months"),
+    (re.compile(r"^/site/company/indexevolution/(?P<key>[^/?]+)"), "indexEvolution"),
+]
+
+
+def load_fixtures() -> Dict[str, Dict[str, str]]:
+    """Carrega as fixtures como modelos de texto, com `{id}`, `{shortname}` e `{document}` por substituir."""
+    return {kind: {section: json.dumps(body, ensure_ascii=False)
+                   for section, body in json.loads((FIXTURES_DIR / f"{kind}.json").read_text("utf-8")).items()}
+            for kind in ("verified", "unverified")}
+
+
+def render_fixture(template: str, company_id: int) -> str:
+    """Preenche um modelo de fixture com os dados de uma empresa sintética."""
+    return (template.replace("{id}", str(company_id))
+            .replace("{shortname}", f"empresa-{company_id}")
+            .replace("{document}", f"{company_id:014d}"))
+
+
+def company_id_for(key: str) -> int:
+    """Converte o termo/shortname/id de uma rota no id numérico de uma empresa sintética."""
+    match = re.search(r"(\d+)$", key)
+    if match:
+        return int(match.group(1).lstrip("0") or 0)
+    return zlib.crc32(key.encode()) % 1_000_000
+
+
+class StandInConfig:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, seed: Optional[int] = None, max_rps: float = 0.0,
+                 hang_section: Optional[str] = None, hang_ms: float = 60000.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.max_rps = max_rps
+        self.hang_section = hang_section
+        self.hang_ms = hang_ms
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+        # Balde de tokens do limite de pedidos (com uma folga de meio segundo de rajada).
+        self._tokens = max_rps / 2
+        self._refilled_at = time.monotonic()
+
+    def admit(self) -> bool:
+        """Indica se o pedido cabe no limite de pedidos por segundo. Chamado com o lock adquirido."""
+        if not self.max_rps:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.max_rps / 2, self._tokens + (now - self._refilled_at) * self.max_rps)
+        self._refilled_at = now
+        if self._tokens < 1:
+            self.throttled += 1
+            return False
+        self._tokens -= 1
+        return True
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Cabeçalhos e corpo são escritos em separado; sem isto, o Nagle acrescenta ~40 ms por resposta.
+    disable_nagle_algorithm = True
+    fixtures: Dict[str, Dict[str, str]] = {}
+    config = StandInConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        config = self.config
+        with config.lock:
+            config.requests += 1
+            admitted = config.admit()
+            delay = max(config.latency_ms + config.random.uniform(-config.jitter_ms, config.jitter_ms), 0.0)
+            fail = config.random.random() < config.error_rate
+            if fail:
+                config.errors += 1
+        if delay:
+            time.sleep(delay / 1000)
+
+        if self.path == "/" or self.path.startswith("/?"):
+            self._reply(200, b"<html><body>stand-in</body></html>", "text/html")
+            return
+        if not admitted:
+            self._reply(429, b'{"error":"too many requests"}', headers={"Retry-After": "1"})
+            return
+        if fail:
+            self._reply(config.error_status, b'{"error":"injected"}')
+            return
+
+        status, body = self._route()
+        self._reply(status, body)
+
+    def _route(self) -> Tuple[int, bytes]:
+        for pattern, section in ROUTES:
+            match = pattern.match(self.path)
+            if match is None:
+                continue
+            if section == self.config.hang_section:
+                time.sleep(self.config.hang_ms / 1000)
+            company_id = company_id_for(match.group("key"))
+            kind = "verified" if company_id % 2 == 0 else "unverified"
+            template = self.fixtures[kind].get(section)
+            if template is None:
+                return 404, b'{"error":"not found"}'
+            return 200, render_fixture(template, company_id).encode("utf-8")
+        return 404, b'{"error":"unknown route"}'
+
+    def _reply(self, status: int, body: bytes, content_type: str = "application/json",
+               headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandInServer:
+    """Arranca o servidor numa thread própria; `base_url`, `search_url` e `site_url` apontam para ele."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[StandInConfig] = None):
+        handler = type("ConfiguredStandInHandler", (StandInHandler,),
+                       {"fixtures": load_fixtures(), "config": config or StandInConfig()})
+        self.config = handler.config
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.request_queue_size = 1024
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+        self.search_url = f"{self.base_url}/search"
+        self.site_url = f"{self.base_url}/site"
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="standin-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def environ(self) -> Dict[str, str]:
+        """Variáveis de ambiente que apontam a API para este servidor."""
+        return {"EXPOSEAQUI_BASE_URL": self.base_url, "EXPOSEAQUI_API_SEARCH_URL": self.search_url,
+                "EXPOSEAQUI_API_SITE_URL": self.site_url}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--max-rps", type=float, default=0.0, help="pedidos/s acima dos quais responde 429 (0 = sem limite)")
+    parser.add_argument("--hang-section", default=None, help="secção que demora --hang-ms a responder (ex: problems6Months)")
+    parser.add_argument("--hang-ms", type=float, default=60000.0)
+    args = parser.parse_args()
+
+    server = StandInServer(args.host, args.port, StandInConfig(args.latency_ms, args.jitter_ms,
+                                                              args.error_rate, args.error_status,
+                                                              max_rps=args.max_rps, hang_section=args.hang_section,
+                                                              hang_ms=args.hang_ms))
+    print(f"INFO:     Stand-in do ReclameAqui em {server.base_url}")
+    for name, value in server.environ().items():
+        print(f"          {name}={value}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
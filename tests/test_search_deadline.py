@@ -0,0 +1,73 @@
+#
+# ExposeAqui | Um projeto de scraping e análise de dados do ReclameAqui
+# -----------------------------------------------------------------------------
+# Copyright (C) 2025 Milena Madsen. Todos os direitos reservados.
+#
+# Autor: Milena Madsen
+# Contacto: milena.madsen@aol.com
+# GitHub: https://github.com/madmilena
+#
+# AVISO LEGAL:
+# Este software foi desenvolvido para fins de estudo e pesquisa. O seu objetivo
+# é demonstrar técnicas de coleta e análise de dados de fontes públicas.
+# O uso indevido deste software para violar os Termos de Serviço de qualquer
+# site, incluindo, mas não se limitando a reclameaqui.com.br e cloudflare.com,
+# é estritamente proibido.
+#
+# A autora não se responsabiliza por qualquer uso indevido deste código ou por
+# quaisquer consequências legais ou financeiras decorrentes de tal uso.
+#
+
+"""
+Prazos das buscas partilhadas, contra o servidor stand-in dos benchmarks.
+Corre com `python -m pytest tests` (ou `python -m unittest discover tests`) a partir da raiz do projeto.
+"""
+
+import asyncio
+import time
+import unittest
+
+from app.services.admission import AdmissionController, DeadlineExceeded
+from app.services.analysis_strategy import DossieGenerator
+from app.services.dossie_cache import DossieCache
+from app.services.scraper_strategy import AsyncReclameAquiScraper
+from app.services.search_service import AsyncSearchService
+from benchmarks.standin_server import StandInConfig, StandInServer
+
+TERM = "00000000000014"
+
+
+class AbandonedSharedFetchTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # Cada chamada ao stand-in demora 300 ms: a coleta completa não cabe nos prazos abaixo.
+        self.server = StandInServer(config=StandInConfig(latency_ms=300)).start()
+        scraper = AsyncReclameAquiScraper(base_url=self.server.base_url, api_search_url=self.server.search_url,
+                                          api_site_url=self.server.site_url)
+        self.service = AsyncSearchService(scraper, DossieGenerator(), DossieCache(),
+                                          admission=AdmissionController())
+
+    async def asyncTearDown(self):
+        await self.service.close()
+
+    def tearDown(self):
+        self.server.stop()
+
+    async def test_fetch_stops_when_every_waiter_times_out(self):
+        async def search(budget: float) -> None:
+            await self.service.search_company_json(TERM, deadline_at=time.monotonic() + budget)
+
+        results = await asyncio.gather(search(0.4), search(0.6), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, DeadlineExceeded) for result in results), results)
+
+        # As chamadas já enviadas ainda chegam ao stand-in; depois disso, não pode haver mais nenhuma.
+        await asyncio.sleep(0.1)
+        requests = self.server.config.requests
+        await asyncio.sleep(1.5)
+        self.assertEqual(self.server.config.requests, requests)
+        self.assertFalse(self.service._flight.in_flight(self.service._flight_key(TERM)))
+        entry, _ = self.service.cache.lookup(TERM)
+        self.assertIsNone(entry)
+
+
+if __name__ == "__main__":
+    unittest.main()